@@ -0,0 +1,57 @@
+"""
+Benchmark building API clients from large OpenAPI documents.
+
+Reports the time and retained memory of constructing an `APIClient` from a
+decoded document, which parses endpoints without resolving their schemas,
+and of then resolving every request body, parameter list and response, as
+the eager parser did up front.
+
+Usage:
+    python -m benchmarks.bench_client_build [--operations 1000 10000 50000]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.specs import openapi_spec
+from resolver.servicerouter.client_generator import APIClient
+
+
+def resolve_all(client: APIClient) -> None:
+    for endpoint in client.endpoints:
+        endpoint.request_body
+        endpoint.query_params
+        endpoint.responses
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--operations", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = argparser.parse_args()
+
+    print(f"{'operations':>10} {'spec MB':>8} {'build ms':>9} {'build MB':>9} {'resolve ms':>11} {'resolved MB':>12}")
+    for operations in args.operations:
+        text = json.dumps(openapi_spec(operations))
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        client = APIClient(json.loads(text))
+        build = (time.perf_counter() - start) * 1e3
+        gc.collect()
+        built = tracemalloc.get_traced_memory()[0] / 2 ** 20
+
+        start = time.perf_counter()
+        resolve_all(client)
+        resolve = (time.perf_counter() - start) * 1e3
+        resolved = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+
+        print(f"{len(client.endpoints):>10} {len(text) / 2 ** 20:>8.1f} {build:>9.1f} {built:>9.1f} "
+              f"{resolve:>11.1f} {resolved:>12.1f}")
+        del client
+
+
+if __name__ == "__main__":
+    main()
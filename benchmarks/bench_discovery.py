@@ -0,0 +1,56 @@
+"""
+Benchmark service discovery against a local stand-in registry.
+
+Starts the stand-in registry and schema server from `tests/stand_in_registry.py`
+with a configurable number of services and per-schema latency, optionally with
+failing and hanging services, and reports how long `generate_clients` takes
+for sequential (`--workers 1`) and concurrent fetching, followed by a refresh
+of the unchanged network, which is answered with 304s and reuses the clients.
+
+Usage:
+    python -m benchmarks.bench_discovery [--services 50] [--latency 0.05]
+        [--workers 1 4 16] [--failing 0] [--hanging 0] [--read-timeout 1] [--deadline 30]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from resolver.servicerouter.artefacts import ArtefactStore
+from resolver.servicerouter.service_discovery import ServiceDiscovery
+from tests.stand_in_registry import StandInRegistry
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--services", type=int, default=50)
+    argparser.add_argument("--latency", type=float, default=0.05, help="Seconds per schema response")
+    argparser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    argparser.add_argument("--failing", type=int, default=0, help="Services answering with status 500")
+    argparser.add_argument("--hanging", type=int, default=0, help="Services never answering")
+    argparser.add_argument("--read-timeout", type=float, default=1.0)
+    argparser.add_argument("--deadline", type=float, default=30.0)
+    args = argparser.parse_args()
+
+    failures = {index: 500 for index in range(args.failing)}
+    hang = set(range(args.failing, args.failing + args.hanging))
+    workdir = tempfile.mkdtemp()
+
+    print(f"{'workers':>8} {'seconds':>8} {'refresh':>8} {'clients':>8} {'errors':>8}")
+    with StandInRegistry(args.services, latency=args.latency, failures=failures, hang=hang) as registry:
+        for workers in args.workers:
+            discovery = ServiceDiscovery(registry.registry_endpoint, read_timeout=args.read_timeout,
+                                         deadline=args.deadline, max_workers=workers,
+                                         store=ArtefactStore(os.path.join(workdir, str(workers))))
+            services = discovery.fetch_services()
+            start = time.perf_counter()
+            clients = discovery.generate_clients(services)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            discovery.generate_clients(discovery.fetch_services())
+            refresh = time.perf_counter() - start
+            print(f"{workers:>8} {elapsed:>8.2f} {refresh:>8.2f} {len(clients):>8} {len(discovery.errors):>8}")
+
+
+if __name__ == "__main__":
+    main()
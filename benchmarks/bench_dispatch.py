@@ -0,0 +1,89 @@
+"""
+Benchmark the tagstyle dispatch index against a linear scan.
+
+Usage:
+    python -m benchmarks.bench_dispatch [--sizes 10 1000 10000] [--tags 2000]
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from resolver.tagparser.dbm import RegexPattern, Tagstyle
+from resolver.tagparser.snapshot import TagstyleSnapshot
+
+
+def synthetic_tagstyles(count: int, seed: int = 0) -> List[Tagstyle]:
+    """Generate partner tagstyles mixing digital link URLs and bare identifiers."""
+    rng = random.Random(seed)
+    tagstyles = []
+    for index in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            pattern = rf"https://id\.partner{index}\.example/01/\d{{14}}(/21/[^/]+)?"
+        elif kind < 0.9:
+            pattern = rf"P{index:05d}-\d{{6}}"
+        else:
+            pattern = rf"urn:partner{index}:[A-Z]{{2}}\d{{8}}"
+        tagstyles.append(Tagstyle(
+            entire_pattern=RegexPattern(name=f"partner {index}", pattern=pattern),
+            contents=[],
+        ))
+    return tagstyles
+
+
+def synthetic_tag(tagstyle: Tagstyle, rng: random.Random) -> str:
+    """Generate a tag matching one of the synthetic tagstyles."""
+    pattern = tagstyle.entire_pattern.pattern
+    index = int(tagstyle.entire_pattern.name.split()[-1])
+    if pattern.startswith("https"):
+        return f"https://id.partner{index}.example/01/{rng.randrange(10 ** 14):014d}/21/{rng.randrange(10 ** 6)}"
+    if pattern.startswith("P"):
+        return f"P{index:05d}-{rng.randrange(10 ** 6):06d}"
+    return f"urn:partner{index}:AB{rng.randrange(10 ** 8):08d}"
+
+
+def linear_match(snapshot: TagstyleSnapshot, tag: str) -> Dict[str, int]:
+    """The matching strategy used before the dispatch index existed."""
+    matches = {}
+    for tagstyle in snapshot.tagstyles:
+        if tagstyle.entire_pattern.fullmatch(tag):
+            matches[tagstyle.name] = tagstyle.id
+    return matches
+
+
+def measure(function, snapshot: TagstyleSnapshot, tags: List[str]) -> float:
+    """Return the mean latency of a matching function in microseconds."""
+    start = time.perf_counter()
+    for tag in tags:
+        function(snapshot, tag)
+    return (time.perf_counter() - start) / len(tags) * 1e6
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    argparser.add_argument("--tags", type=int, default=2000)
+    args = argparser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'tagstyles':>10} {'build ms':>10} {'linear us':>12} {'indexed us':>12} {'speedup':>8}")
+    for size in args.sizes:
+        tagstyles = synthetic_tagstyles(size)
+        start = time.perf_counter()
+        snapshot = TagstyleSnapshot(enumerate(tagstyles, start=1))
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        tags = [synthetic_tag(rng.choice(tagstyles), rng) for _ in range(args.tags)]
+        for tag in tags[:100]:
+            assert snapshot.match_entire_pattern(tag) == linear_match(snapshot, tag)
+
+        # Keep the linear scan affordable for large stores
+        linear_tags = tags[:max(20, args.tags * 10 // max(size, 10))]
+        linear_us = measure(linear_match, snapshot, linear_tags)
+        indexed_us = measure(TagstyleSnapshot.match_entire_pattern, snapshot, tags)
+        print(f"{size:>10} {build_ms:>10.1f} {linear_us:>12.1f} {indexed_us:>12.1f} {linear_us / indexed_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
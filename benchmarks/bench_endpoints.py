@@ -0,0 +1,93 @@
+"""
+Benchmark endpoint lookup of API clients on large OpenAPI documents.
+
+Compares `filter_endpoints` answered from the endpoint indexes against the
+linear scan it replaced, for tag, method and path criteria and their
+combinations, and times `match_path` on concrete request paths.
+
+Usage:
+    python -m benchmarks.bench_endpoints [--operations 100 1000 10000] [--queries 2000]
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from benchmarks.specs import RESOURCE_NAMES, openapi_spec
+from resolver.servicerouter.client_generator import APIClient, Endpoint, EndpointFilterCriteria
+
+
+def filter_endpoints_linear(endpoints: List[Endpoint], criteria: EndpointFilterCriteria) -> List[Endpoint]:
+    """The scan `filter_endpoints` used before the indexes, kept as the reference."""
+    filtered_endpoints = endpoints
+    for key, value in criteria.model_dump(exclude_unset=True).items():
+        if isinstance(value, list):
+            new_filtered_endpoints = []
+            for endpoint in filtered_endpoints:
+                for filter_val in value:
+                    if filter_val in getattr(endpoint, key):
+                        new_filtered_endpoints.append(endpoint)
+                        break
+            filtered_endpoints = new_filtered_endpoints
+        else:
+            filtered_endpoints = [endpoint for endpoint in filtered_endpoints if value in getattr(endpoint, key)]
+    return filtered_endpoints
+
+
+def make_criteria(client: APIClient, count: int, seed: int = 0) -> List[EndpointFilterCriteria]:
+    rng = random.Random(seed)
+    paths = [endpoint.path for endpoint in client.endpoints]
+    criteria = []
+    for _ in range(count):
+        kind = rng.randrange(5)
+        if kind == 0:
+            criteria.append(EndpointFilterCriteria(tags=rng.choice(RESOURCE_NAMES)))
+        elif kind == 1:
+            criteria.append(EndpointFilterCriteria(method=rng.choice(["get", "post", "put", "delete"])))
+        elif kind == 2:
+            criteria.append(EndpointFilterCriteria(path=rng.choice(paths)))
+        elif kind == 3:
+            criteria.append(EndpointFilterCriteria(path=rng.choice(paths).split("/")[1], method="get"))
+        else:
+            criteria.append(EndpointFilterCriteria(tags=["write", "history"], path="{id}"))
+    return criteria
+
+
+def timed(function: Callable, calls: List) -> float:
+    start = time.perf_counter()
+    for call in calls:
+        function(call)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--operations", type=int, nargs="+", default=[100, 1000, 10000])
+    argparser.add_argument("--queries", type=int, default=2000)
+    args = argparser.parse_args()
+
+    print(f"{'operations':>10} {'build ms':>9} {'scan us':>9} {'index us':>9} {'speedup':>8} {'match us':>9}")
+    for operations in args.operations:
+        spec = openapi_spec(operations)
+        client = APIClient(spec)
+        start = time.perf_counter()
+        client.endpoint_index
+        build = (time.perf_counter() - start) * 1e3
+
+        criteria = make_criteria(client, args.queries)
+        for query in criteria[:100]:
+            assert client.filter_endpoints(query) == filter_endpoints_linear(client.endpoints, query)
+        scan = timed(lambda query: filter_endpoints_linear(client.endpoints, query), criteria)
+        indexed = timed(client.filter_endpoints, criteria)
+
+        rng = random.Random(1)
+        requests = [endpoint.path.replace("{id}", str(rng.randrange(10 ** 6))) for endpoint in client.endpoints]
+        requests = [rng.choice(requests) for _ in range(args.queries)]
+        match = timed(client.match_path, requests)
+
+        print(f"{len(client.endpoints):>10} {build:>9.1f} {scan:>9.1f} {indexed:>9.1f} "
+              f"{scan / indexed:>7.1f}x {match:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
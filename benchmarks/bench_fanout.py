@@ -0,0 +1,61 @@
+"""
+Benchmark multi-provider data requests against a local stand-in network.
+
+Starts the stand-in from `tests/stand_in_registry.py` with `--services`
+providers answering after a random delay of up to `--latency` seconds, and
+times a lookup calling the providers one after the other against
+`QueryEngine.formulate_data_request` in each mode.
+
+Usage:
+    python -m benchmarks.bench_fanout [--services 8] [--latency 0.2] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+from resolver.query_services import QueryEngine
+from resolver.tagparser.tagparser import ParsedTag
+from tests.stand_in_registry import StandInRegistry
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--services", type=int, default=8)
+    argparser.add_argument("--latency", type=float, default=0.2, help="Maximum seconds per provider answer")
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    rng = random.Random(0)
+    os.chdir(tempfile.mkdtemp())
+    parser = MagicMock()
+    parser.parse_tag_fields.return_value = ParsedTag("items", {"serial": "42"})
+
+    with StandInRegistry(args.services) as registry:
+        registry.echo_delays.update({index: rng.uniform(0, args.latency) for index in range(args.services)})
+        # Answers are not cacheable, so every lookup reaches all providers
+        registry.cache_control.update({index: "no-store" for index in range(args.services)})
+        engine = QueryEngine(registry.registry_endpoint, parser=parser)
+        print(f"slowest provider {max(registry.echo_delays.values()):.3f}s, "
+              f"sum of providers {sum(registry.echo_delays.values()):.3f}s")
+
+        def sequential():
+            parsed, calls = engine.data_calls("tag-42")
+            return [engine._request_data(call, parsed.contents) for call in calls]
+
+        lookups = [("sequential", sequential)] + [
+            (mode, lambda mode=mode: engine.formulate_data_request(None, "tag-42", mode=mode, quorum=args.services // 2))
+            for mode in ["first", "quorum", "all"]
+        ]
+        print(f"{'lookup':>10} {'seconds':>8}")
+        for name, lookup in lookups:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                lookup()
+            print(f"{name:>10} {(time.perf_counter() - start) / args.repeat:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
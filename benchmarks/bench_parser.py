@@ -0,0 +1,211 @@
+"""
+Benchmark the tag parser against a real SQLite tagstyle store.
+
+Generates synthetic catalogues in the `tagstyles.json` format and tag corpora
+mixing hits, misses and ambiguous tags, then measures throughput and latency
+percentiles of `parse_tag` (with and without the parse cache),
+`match_entire_pattern` and `match_contents`. Results are written to JSON and
+compared against a stored baseline; the run exits with status 1 if any
+operation regressed by more than the tolerance.
+
+Baselines are machine specific. Refresh the stored one with `--update-baseline`
+on the machine that gates deploys.
+
+Usage:
+    python -m benchmarks.bench_parser [--sizes 10 100 1000] [--tags 5000]
+        [--hit-ratio 0.9] [--ambiguous-ratio 0.02] [--output bench_parser.json]
+        [--baseline benchmarks/baseline_parser.json] [--tolerance 0.25]
+        [--update-baseline] [--catalogue-dir DIR]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import Corpus
+from resolver.tagparser.dbm import DatabaseManagement, tagstyles_from_catalogue
+from resolver.tagparser.tagparser import AmbiguousTagError, InvalidTagError, Parser
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_parser.json")
+
+
+def percentile(ordered: List[int], fraction: float) -> float:
+    """Return a percentile of sorted nanosecond samples in microseconds."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] / 1e3
+
+
+def measure(function: Callable, calls: List[tuple], rounds: int) -> Dict[str, float]:
+    """
+    Time every call individually and report the fastest round.
+
+    Args:
+        function (Callable): The operation to measure.
+        calls (List[tuple]): Argument tuples, one per call.
+        rounds (int): Number of passes over the calls.
+
+    Returns:
+        Dict[str, float]: Throughput in calls per second and latency percentiles in microseconds.
+    """
+    best = None
+    clock = time.perf_counter_ns
+    for _ in range(rounds):
+        samples = []
+        for args in calls:
+            start = clock()
+            try:
+                function(*args)
+            except (InvalidTagError, AmbiguousTagError):
+                pass
+            samples.append(clock() - start)
+        total = sum(samples)
+        if best is None or total < best[0]:
+            best = (total, sorted(samples))
+    total, ordered = best
+    return {
+        "calls": len(ordered),
+        "ops_per_sec": round(len(ordered) / (total / 1e9), 1),
+        "p50_us": round(percentile(ordered, 0.50), 2),
+        "p90_us": round(percentile(ordered, 0.90), 2),
+        "p99_us": round(percentile(ordered, 0.99), 2),
+    }
+
+
+def bench_size(size: int, args, workdir: str) -> Dict:
+    """Run every operation against a freshly populated store of `size` tagstyles."""
+    corpus = Corpus(size)
+    if args.catalogue_dir:
+        os.makedirs(args.catalogue_dir, exist_ok=True)
+        with open(os.path.join(args.catalogue_dir, f"tagstyles_{size}.json"), "w") as file:
+            json.dump(corpus.catalogue, file, indent=4)
+    tags = corpus.tags(args.tags, hit_ratio=args.hit_ratio, ambiguous_ratio=args.ambiguous_ratio)
+
+    db = DatabaseManagement(os.path.join(workdir, f"tagstyles_{size}.db"))
+    db.initialize_db()
+    db.add_tags(tagstyles_from_catalogue(corpus.catalogue))
+
+    uncached = Parser(db, cache_size=0)
+    cached = Parser(db, cache_size=len(tags))
+    uncached.snapshot()
+
+    outcomes = {"hit": 0, "miss": 0, "ambiguous": 0}
+    hits = []
+    for tag in tags:
+        matches = uncached.match_entire_pattern(tag)
+        if len(matches) == 1:
+            outcomes["hit"] += 1
+            hits.append((next(iter(matches.values())), tag))
+        elif matches:
+            outcomes["ambiguous"] += 1
+        else:
+            outcomes["miss"] += 1
+
+    # Warm the cache so the cached run measures lookups only
+    for tag in tags:
+        try:
+            cached.parse_tag(tag)
+        except (InvalidTagError, AmbiguousTagError):
+            pass
+
+    calls = [(tag,) for tag in tags]
+    operations = {
+        "parse_tag": measure(uncached.parse_tag, calls, args.rounds),
+        "parse_tag_cached": measure(cached.parse_tag, calls, args.rounds),
+        "match_entire_pattern": measure(uncached.match_entire_pattern, calls, args.rounds),
+        "match_contents": measure(uncached.match_contents, hits, args.rounds),
+    }
+    db.close()
+    return {"tagstyles": len(corpus.catalogue), "outcomes": outcomes, "operations": operations}
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Throughput and median latency are gated; tail percentiles are reported
+    but too noisy on shared machines to fail a run on.
+
+    Args:
+        results (Dict): The current results.
+        baseline (Dict): The stored baseline results.
+        tolerance (float): Allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        List[str]: One message per regressed metric.
+    """
+    regressions = []
+    for size, current in results["sizes"].items():
+        reference = baseline.get("sizes", {}).get(size)
+        if reference is None:
+            continue
+        for operation, metrics in current["operations"].items():
+            expected = reference["operations"].get(operation)
+            if expected is None:
+                continue
+            if metrics["ops_per_sec"] * (1 + tolerance) < expected["ops_per_sec"]:
+                regressions.append(f"{operation} @ {size}: {metrics['ops_per_sec']:.0f} ops/s "
+                                   f"vs baseline {expected['ops_per_sec']:.0f} ops/s")
+            if metrics["p50_us"] > expected["p50_us"] * (1 + tolerance):
+                regressions.append(f"{operation} @ {size}: p50 {metrics['p50_us']:.1f} us "
+                                   f"vs baseline {expected['p50_us']:.1f} us")
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    argparser.add_argument("--tags", type=int, default=5000)
+    argparser.add_argument("--hit-ratio", type=float, default=0.9)
+    argparser.add_argument("--ambiguous-ratio", type=float, default=0.02)
+    argparser.add_argument("--rounds", type=int, default=3)
+    argparser.add_argument("--output", default="bench_parser.json")
+    argparser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    argparser.add_argument("--tolerance", type=float, default=0.25)
+    argparser.add_argument("--update-baseline", action="store_true")
+    argparser.add_argument("--catalogue-dir", help="Also write the generated catalogues here")
+    args = argparser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tags": args.tags,
+        "hit_ratio": args.hit_ratio,
+        "ambiguous_ratio": args.ambiguous_ratio,
+        "sizes": {},
+    }
+    print(f"{'tagstyles':>10} {'operation':>22} {'ops/s':>10} {'p50 us':>8} {'p90 us':>8} {'p99 us':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            result = bench_size(size, args, workdir)
+            results["sizes"][str(size)] = result
+            for operation, metrics in result["operations"].items():
+                print(f"{size:>10} {operation:>22} {metrics['ops_per_sec']:>10.0f} {metrics['p50_us']:>8.1f} "
+                      f"{metrics['p90_us']:>8.1f} {metrics['p99_us']:>8.1f}")
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline, "r") as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
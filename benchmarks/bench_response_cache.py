@@ -0,0 +1,58 @@
+"""
+Benchmark the response cache of API clients against a local stand-in provider.
+
+Sends a burst of requests from concurrent threads, drawn from a small set of
+hot identifiers, to the stand-in from `tests/stand_in_registry.py` whose
+responses take `--latency` seconds. Reports the wall time, mean latency and
+number of upstream calls without caching (`Cache-Control: no-store`, so only
+in-flight requests are coalesced) and with `max-age`.
+
+Usage:
+    python -m benchmarks.bench_response_cache [--requests 2000] [--threads 32] [--identifiers 20] [--latency 0.02]
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resolver.servicerouter.client_generator import APIClient, ClientConfig, Endpoint
+from tests.stand_in_registry import StandInRegistry, openapi_document
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--requests", type=int, default=2000)
+    argparser.add_argument("--threads", type=int, default=32)
+    argparser.add_argument("--identifiers", type=int, default=20)
+    argparser.add_argument("--latency", type=float, default=0.02, help="Seconds per provider response")
+    args = argparser.parse_args()
+
+    rng = random.Random(0)
+    serials = [str(rng.randrange(args.identifiers)) for _ in range(args.requests)]
+    endpoint = Endpoint(path="/items/0", method="get", tags=[])
+
+    print(f"{'cache-control':>14} {'seconds':>8} {'mean ms':>8} {'upstream':>9}")
+    with StandInRegistry(services=1) as registry:
+        registry.echo_delay = args.latency
+        for header in ["no-store", "max-age=60"]:
+            registry.cache_control[0] = header
+            registry.echoes = 0
+            client = APIClient(openapi_document(0), client_id=0, root_address=f"{registry.url}/services/0",
+                               config=ClientConfig(pool_maxsize=args.threads))
+
+            def call(serial):
+                start = time.perf_counter()
+                client.make_request(None, endpoint, serial=serial)
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                latencies = list(executor.map(call, serials))
+            elapsed = time.perf_counter() - start
+            client.close()
+            mean = sum(latencies) / len(latencies) * 1e3
+            print(f"{header:>14} {elapsed:>8.2f} {mean:>8.2f} {registry.echoes:>9}")
+
+
+if __name__ == "__main__":
+    main()
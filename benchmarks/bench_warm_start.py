@@ -0,0 +1,54 @@
+"""
+Benchmark how long a `QueryEngine` takes to become ready to serve.
+
+Against the stand-in registry from `tests/stand_in_registry.py`, compares a
+cold start discovering every service over the network with warm starts from
+the compact network snapshot and from the per-service files of the artefact
+store, and reports the size of both on disk.
+
+Usage:
+    python -m benchmarks.bench_warm_start [--services 50] [--latency 0.05]
+"""
+import argparse
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+from resolver.query_services import QueryEngine
+from tests.stand_in_registry import StandInRegistry
+
+
+def directory_size(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(root) for name in names)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--services", type=int, default=50)
+    argparser.add_argument("--latency", type=float, default=0.05, help="Seconds per schema response")
+    args = argparser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    snapshot_path = os.path.abspath("network.snapshot")
+    parser = MagicMock()
+
+    with StandInRegistry(args.services, latency=args.latency) as registry:
+        starts = [
+            ("cold", dict(snapshot_path=snapshot_path)),
+            ("snapshot", dict(snapshot_path=snapshot_path, warm_start=True)),
+            ("files", dict(warm_start=True)),
+        ]
+        print(f"{'start':>9} {'seconds':>8} {'clients':>8}")
+        for name, options in starts:
+            start = time.perf_counter()
+            engine = QueryEngine(registry.registry_endpoint, parser=parser, **options)
+            print(f"{name:>9} {time.perf_counter() - start:>8.3f} {len(engine.clients):>8}")
+
+    print(f"snapshot {os.path.getsize(snapshot_path)} bytes, "
+          f"artefact store {directory_size('resolver/data/discovery')} bytes")
+
+
+if __name__ == "__main__":
+    main()
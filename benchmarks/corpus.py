@@ -0,0 +1,132 @@
+"""
+Synthetic tagstyle catalogues and tag corpora for parser benchmarks.
+
+Catalogues use the `resolver/data/tagstyles.json` format. Every tagstyle
+belongs to a family with a generator for tags it matches, so corpora can
+mix hits, misses and ambiguous tags in configurable ratios.
+"""
+import random
+import re
+from typing import Callable, Dict, List, Tuple
+
+Catalogue = Dict[str, Dict]
+
+GTIN_CONTENTS = {
+    "GTIN": r"01/(\d{13})",
+    "consumer_product_variant": r"22/([^/|$]+)",
+    "batch or lot number": r"10/([^/|$]+)",
+    "serial_number": r"21/([^/|$]+)",
+}
+
+
+def _digital_link(index: int) -> Tuple[Dict, Callable[[random.Random], str]]:
+    host = f"id.partner{index}.example"
+    definition = {
+        "ENTIRE_PATTERN": rf"https?://{re.escape(host)}/.*/\d{{2}}/.*",
+        "contents": dict(GTIN_CONTENTS),
+    }
+
+    def tag(rng: random.Random) -> str:
+        path = f"/01/{rng.randrange(10 ** 14):014d}"
+        if rng.random() < 0.5:
+            path += f"/10/LOT{rng.randrange(10 ** 4)}"
+        return f"https://{host}{path}/21/{rng.randrange(10 ** 8)}"
+
+    return definition, tag
+
+
+def _serial_number(index: int) -> Tuple[Dict, Callable[[random.Random], str]]:
+    prefix = f"SN{index:06d}"
+    definition = {
+        "ENTIRE_PATTERN": rf"({prefix})--(\d{{2}}E\d{{6}})",
+        "contents": {
+            "product_model_number": rf"({prefix})",
+            "serial_number": r"(\d{2}E\d{6})",
+        },
+    }
+
+    def tag(rng: random.Random) -> str:
+        return f"{prefix}--{rng.randrange(100):02d}E{rng.randrange(10 ** 6):06d}"
+
+    return definition, tag
+
+
+def _urn(index: int) -> Tuple[Dict, Callable[[random.Random], str]]:
+    definition = {
+        "ENTIRE_PATTERN": rf"urn:partner{index}:([A-Z]{{2}})(\d{{8}})",
+        "contents": {"class": r":([A-Z]{2})\d", "number": r"(\d{8})$"},
+    }
+
+    def tag(rng: random.Random) -> str:
+        return f"urn:partner{index}:{chr(65 + rng.randrange(26))}{chr(65 + rng.randrange(26))}{rng.randrange(10 ** 8):08d}"
+
+    return definition, tag
+
+
+FAMILIES = (_digital_link, _serial_number, _urn)
+
+
+class Corpus:
+    """A synthetic catalogue together with generators for matching tags."""
+
+    def __init__(self, size: int, ambiguous_pairs: int = None, seed: int = 0):
+        """
+        Generate a catalogue of `size` tagstyles.
+
+        Args:
+            size (int): Number of tagstyles.
+            ambiguous_pairs (int, optional): Number of tagstyles that get a second,
+                overlapping tagstyle; tags for them raise AmbiguousTagError.
+                Defaults to 1% of the catalogue, at least one.
+            seed (int): Seed of the generator.
+        """
+        rng = random.Random(seed)
+        if ambiguous_pairs is None:
+            ambiguous_pairs = max(1, size // 100)
+        ambiguous_pairs = min(ambiguous_pairs, size // 2)
+
+        self.catalogue: Catalogue = {}
+        self.unique: List[Callable[[random.Random], str]] = []
+        self.ambiguous: List[Callable[[random.Random], str]] = []
+
+        index = 0
+        while len(self.catalogue) < size:
+            definition, tag = rng.choice(FAMILIES)(index)
+            self.catalogue[f"style {index}"] = definition
+            if len(self.ambiguous) < ambiguous_pairs and len(self.catalogue) < size:
+                # A looser duplicate of the entire pattern overlapping every tag of the original
+                duplicate = dict(definition, ENTIRE_PATTERN=definition["ENTIRE_PATTERN"] + "|.{1,2}")
+                self.catalogue[f"style {index} overlap"] = duplicate
+                self.ambiguous.append(tag)
+            else:
+                self.unique.append(tag)
+            index += 1
+
+    def tags(self, count: int, hit_ratio: float = 0.9, ambiguous_ratio: float = 0.02,
+             seed: int = 1) -> List[str]:
+        """
+        Generate a tag corpus.
+
+        Args:
+            count (int): Number of tags.
+            hit_ratio (float): Share of tags matching exactly one tagstyle.
+            ambiguous_ratio (float): Share of tags matching two tagstyles.
+                The remainder matches no tagstyle.
+            seed (int): Seed of the generator.
+
+        Returns:
+            List[str]: The tags in random order.
+        """
+        if hit_ratio + ambiguous_ratio > 1:
+            raise ValueError("hit_ratio and ambiguous_ratio must not exceed 1 together")
+        rng = random.Random(seed)
+        tags = []
+        for _ in range(count):
+            draw = rng.random()
+            if draw < hit_ratio and self.unique:
+                tags.append(rng.choice(self.unique)(rng))
+            elif draw < hit_ratio + ambiguous_ratio and self.ambiguous:
+                tags.append(rng.choice(self.ambiguous)(rng))
+            else:
+                tags.append(f"https://unknown{rng.randrange(10 ** 6)}.example/01/{rng.randrange(10 ** 14):014d}")
+        return tags
@@ -0,0 +1,113 @@
+"""
+Load test comparing blocking and executor-backed tagstyle access in async handlers.
+
+Runs concurrent readers (like GET /tags/{tag_id}) next to a writer importing
+large catalogues and reports read latency and event loop lag percentiles.
+
+Usage:
+    python -m benchmarks.load_async_db [--duration 5] [--readers 32] [--batch 5000] [--pool 4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from resolver.tagparser.async_dbm import AsyncDatabaseManagement
+from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Return p50/p99/max of latency samples in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "p50": statistics.median(ordered) * 1e3,
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e3,
+        "max": ordered[-1] * 1e3,
+    }
+
+
+def make_tags(count: int) -> List[Tagstyle]:
+    return [
+        Tagstyle(
+            entire_pattern=RegexPattern(name=f"style {index}", pattern=rf"P{index}-\d+"),
+            contents=[RegexPattern(name="serial", pattern=r"-(\d+)")],
+        )
+        for index in range(count)
+    ]
+
+
+async def run(mode: str, manager: DatabaseManagement, args) -> Dict[str, Dict[str, float]]:
+    async_db = AsyncDatabaseManagement(manager, max_readers=args.pool)
+    if mode == "blocking":
+        async def read(tagid):
+            return manager.retrieve_tag_by_id(tagid)
+
+        async def write(tags):
+            manager.delete_all_tags()
+            return manager.add_tags(tags)
+    else:
+        async def read(tagid):
+            return await async_db.retrieve_tag_by_id(tagid)
+
+        async def write(tags):
+            await async_db.delete_all_tags()
+            return await async_db.add_tags(tags)
+
+    deadline = time.perf_counter() + args.duration
+    tags = make_tags(args.batch)
+    read_latencies: List[float] = []
+    loop_lag: List[float] = []
+
+    async def writer():
+        while time.perf_counter() < deadline:
+            await write(tags)
+            await asyncio.sleep(0.01)
+
+    async def reader():
+        # Open loop: latency is measured from when a request is due, so time
+        # spent waiting for a blocked event loop counts against it.
+        rng = random.Random()
+        due = time.perf_counter() + rng.random() * args.interval
+        while due < deadline:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await read(rng.randint(1, args.batch))
+            read_latencies.append(time.perf_counter() - due)
+            due += args.interval
+
+    async def ticker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            loop_lag.append(time.perf_counter() - start - 0.005)
+
+    await asyncio.gather(writer(), ticker(), *(reader() for _ in range(args.readers)))
+    async_db.shutdown()
+    return {"read": percentiles(read_latencies), "loop lag": percentiles(loop_lag)}
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--duration", type=float, default=5.0)
+    argparser.add_argument("--readers", type=int, default=32)
+    argparser.add_argument("--batch", type=int, default=5000)
+    argparser.add_argument("--pool", type=int, default=4)
+    argparser.add_argument("--interval", type=float, default=0.02, help="seconds between reads per reader")
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manager = DatabaseManagement(os.path.join(directory, "tagstyles.db"))
+        manager.initialize_db()
+        manager.add_tags(make_tags(args.batch))
+
+        print(f"{'mode':>10} {'metric':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for mode in ("blocking", "executor"):
+            for metric, values in asyncio.run(run(mode, manager, args)).items():
+                print(f"{mode:>10} {metric:>10} {values['p50']:>9.2f} {values['p99']:>9.2f} {values['max']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
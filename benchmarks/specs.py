@@ -0,0 +1,88 @@
+"""
+Synthetic OpenAPI documents for service router benchmarks.
+
+Documents are built from resources with collection, item and nested
+sub-resource paths, so they mix literal and parameterised segments, several
+methods per path, shared tags, and request and response bodies referencing
+components that nest further, and recursive, references.
+"""
+import random
+from typing import Dict, List
+
+RESOURCE_NAMES = ("products", "components", "materials", "batches", "repairs", "events", "owners", "sites")
+SUB_RESOURCES = ("history", "documents", "passports", "certificates")
+
+# Schemas referenced from every resource; `Part` is recursive
+SHARED_SCHEMAS = {
+    "Address": {"type": "object", "properties": {"street": {"type": "string"}, "city": {"type": "string"},
+                                                 "country": {"type": "string"}}},
+    "Owner": {"type": "object", "properties": {"name": {"type": "string"},
+                                               "address": {"$ref": "#/components/schemas/Address"}}},
+    "Part": {"type": "object", "properties": {"gtin": {"type": "string"},
+                                              "subparts": {"type": "array",
+                                                           "items": {"$ref": "#/components/schemas/Part"}}}},
+}
+
+
+def openapi_spec(operations: int, seed: int = 0) -> Dict:
+    """
+    Generate an OpenAPI 3 document with roughly the given number of operations.
+
+    Args:
+        operations (int): Number of operations (path and method pairs) to generate.
+        seed (int): Seed of the generator.
+
+    Returns:
+        Dict: The OpenAPI document.
+    """
+    rng = random.Random(seed)
+    paths: Dict[str, Dict] = {}
+    schemas: Dict[str, Dict] = {}
+    count = 0
+    index = 0
+    while count < operations:
+        resource = f"{RESOURCE_NAMES[index % len(RESOURCE_NAMES)]}{index // len(RESOURCE_NAMES)}"
+        tag = RESOURCE_NAMES[index % len(RESOURCE_NAMES)]
+        schema = f"{resource.capitalize()}"
+        schemas[schema] = {
+            "type": "object",
+            "description": f"A {tag[:-1]} of the circular economy network. " * 4,
+            "properties": {
+                "id": {"type": "string"},
+                "name": {"type": "string"},
+                "owner": {"$ref": "#/components/schemas/Owner"},
+                "parts": {"type": "array", "items": {"$ref": "#/components/schemas/Part"}},
+            },
+        }
+        body = {"content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{schema}"}}}}
+        responses = {
+            "200": {"description": "The resource.", "content": {"application/json": {
+                "schema": {"$ref": f"#/components/schemas/{schema}"}}}},
+            "404": {"description": "Not found."},
+        }
+        id_param = [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}]
+
+        templates: List = [
+            (f"/{resource}", {
+                "get": {"tags": [tag], "summary": f"List {resource}", "responses": responses},
+                "post": {"tags": [tag, "write"], "requestBody": body, "responses": responses},
+            }),
+            (f"/{resource}/{{id}}", {
+                "get": {"tags": [tag], "parameters": id_param, "responses": responses},
+                "put": {"tags": [tag, "write"], "parameters": id_param, "requestBody": body, "responses": responses},
+                "delete": {"tags": [tag, "write"], "parameters": id_param},
+            }),
+        ]
+        for sub in rng.sample(SUB_RESOURCES, 2):
+            templates.append((f"/{resource}/{{id}}/{sub}", {"get": {"tags": [tag, sub], "parameters": id_param}}))
+        for path, methods in templates:
+            paths[path] = methods
+            count += len(methods)
+        index += 1
+
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": f"Synthetic API with {count} operations", "version": "1.0.0"},
+        "paths": paths,
+        "components": {"schemas": {**schemas, **SHARED_SCHEMAS}},
+    }
@@ -1,8 +1,25 @@
+import asyncio
+import gc
+import json
+import os
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional
+
+import anyio
+
 from pydantic import BaseModel, HttpUrl
 from fastapi import FastAPI, HTTPException, Request, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.requests import ClientDisconnect
 
-from resolver.tagparser.dbm import DatabaseManagement, Tagstyle
+from resolver.query_services import QueryEngine
+from resolver.tagparser.async_dbm import AsyncDatabaseManagement
+from resolver.tagparser.dbm import DatabaseManagement, Tagstyle, TagstyleDefinition, tagstyles_from_catalogue
+from resolver.tagparser.safety import MAX_TAG_LENGTH, UnsafePatternError
+from resolver.tagparser.storage import create_storage
 from resolver.tagparser.tagparser import Parser, Tagstyle, AmbiguousTagError, InvalidTagError
 import sqlite3
 
@@ -17,64 +34,352 @@ It outputs a parametrized URL which points to the information providers API.
 """
 
 
+# Shared instances so connections and the compiled tagstyle snapshot survive across requests.
+# The tagstyle backend is chosen through RESOLVER_TAGSTYLE_BACKEND (sqlite or memory).
+db = create_storage()
+async_db = AsyncDatabaseManagement(db)
+parser = Parser(db)
+query_engine: Optional[QueryEngine] = None
+
+
+def warm_up() -> None:
+    """
+    Set up the tagstyle store and build the compiled tagstyle snapshot and the service catalogue once.
+
+    A snapshot that is still current, such as one inherited from the gunicorn
+    master under `--preload`, is kept, so workers go on sharing its pages.
+    Otherwise it is adopted from `RESOLVER_SNAPSHOT_PATH` if that file matches
+    the store, else compiled and written there for the next process. The
+    `QueryEngine` is only built if `RESOLVER_REGISTRY_ENDPOINT` is set; an
+    unreachable registry leaves it unset instead of failing the start. With
+    `RESOLVER_NETWORK_SNAPSHOT_PATH` set, its catalogue is warm-started from
+    that file and saved there after every change.
+    """
+    global query_engine
+    snapshot_path = os.environ.get("RESOLVER_SNAPSHOT_PATH")
+    if not parser.has_current_snapshot():
+        parser.manager.initialize_db()
+        if snapshot_path and not parser.load_snapshot(snapshot_path):
+            try:
+                parser.save_snapshot(snapshot_path)
+            except OSError as e:
+                print(f"An error occurred while saving the tagstyle snapshot: {e}")
+        parser.snapshot()
+
+    registry_endpoint = os.environ.get("RESOLVER_REGISTRY_ENDPOINT")
+    network_snapshot_path = os.environ.get("RESOLVER_NETWORK_SNAPSHOT_PATH")
+    if registry_endpoint and query_engine is None:
+        try:
+            query_engine = QueryEngine(registry_endpoint, parser=parser, snapshot_path=network_snapshot_path,
+                                       warm_start=bool(network_snapshot_path))
+        except Exception as e:
+            print(f"An error occurred while building the service catalogue: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Under gunicorn --preload the state was built before the fork and this only revalidates it
+    await run_in_threadpool(warm_up)
+    # Threads do not survive the fork, so every worker revalidates a warm-started
+    # catalogue and runs its own refresher.
+    # RESOLVER_REFRESH_INTERVAL is in seconds; 0 disables background refreshes.
+    interval = float(os.environ.get("RESOLVER_REFRESH_INTERVAL", "300"))
+    if query_engine is not None and query_engine.warm:
+        query_engine.revalidate_in_background()
+    if query_engine is not None and interval > 0:
+        query_engine.start_refresher(interval)
+    try:
+        yield
+    finally:
+        if query_engine is not None:
+            query_engine.stop_refresher()
+
+
+if os.environ.get("RESOLVER_PRELOAD"):
+    # Build in the gunicorn master so workers share the state copy-on-write,
+    # and move it out of the garbage collector's reach so collections in the
+    # workers do not touch, and thereby copy, the shared pages.
+    warm_up()
+    gc.freeze()
+
+
 app = FastAPI(swagger_ui_parameters={"tryItOutEnabled": True},
-              description=description)
+              description=description, lifespan=lifespan)
 
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Dependency
 def get_db():
-    db = DatabaseManagement()
     yield db
 
+def get_async_db():
+    yield async_db
+
 def get_parser():
-    parser = Parser()
     yield parser
 
+def get_query_engine():
+    yield query_engine
+
 
 @app.post("/tags/", tags=["identifier"])
-async def add_tag(tag: Tagstyle, db: DatabaseManagement = Depends(get_db)):
+async def add_tag(tag: Tagstyle, db: AsyncDatabaseManagement = Depends(get_async_db)):
     try:
-        if db.add_tag(tag):
+        if await db.add_tag(tag):
             return {"status": "Tag added successfully"}
+    except UnsafePatternError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail="An error occurred while adding the tag")
 
+@app.post("/tags/import", tags=["identifier"])
+async def import_tags(catalogue: Dict[str, TagstyleDefinition], db: AsyncDatabaseManagement = Depends(get_async_db)):
+    """Import a catalogue of tag styles in the `tagstyles.json` format in one transaction."""
+    tagstyles = tagstyles_from_catalogue(catalogue)
+    try:
+        if await db.add_tags(tagstyles):
+            return {"status": "Tags imported successfully", "count": len(tagstyles)}
+    except UnsafePatternError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail="An error occurred while importing the tags")
+
 @app.get("/tags/{tag_id}", response_model=Tagstyle, tags=["identifier"])
-async def get_tag(tag_id: int, db: DatabaseManagement = Depends(get_db)):
-    tag = db.retrieve_tag_by_id(tag_id)
+async def get_tag(tag_id: int, db: AsyncDatabaseManagement = Depends(get_async_db)):
+    tag = await db.retrieve_tag_by_id(tag_id)
     if tag:
         return tag
     raise HTTPException(status_code=404, detail="Tag not found")
 
 @app.put("/tags/{tag_id}", tags=["identifier"])
-async def update_tag(tag_id: int, updated_tag: Tagstyle, db: DatabaseManagement = Depends(get_db)):
+async def update_tag(tag_id: int, updated_tag: Tagstyle, db: AsyncDatabaseManagement = Depends(get_async_db)):
     try:
-        if db.update_tag_by_name(tag_id, updated_tag):
+        if await db.update_tag_by_name(tag_id, updated_tag):
             return {"status": "Tag updated successfully"}
+    except UnsafePatternError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail="An error occurred while updating the tag")
 
 @app.delete("/tags/{tag_id}", tags=["identifier"])
-async def delete_tag(tag_id: int, db: DatabaseManagement = Depends(get_db)):
+async def delete_tag(tag_id: int, db: AsyncDatabaseManagement = Depends(get_async_db)):
     try:
-        if db.delete_tag_by_id(tag_id):
+        if await db.delete_tag_by_id(tag_id):
             return {"status": "Tag deleted successfully"}
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail="An error occurred while deleting the tag")
 
 @app.delete("/tags", tags=["identifier"])
-async def delete_all_tags(db: DatabaseManagement = Depends(get_db)):
+async def delete_all_tags(db: AsyncDatabaseManagement = Depends(get_async_db)):
     try:
-        if db.delete_all_tags():
+        if await db.delete_all_tags():
             return {"status": "All tags deleted successfully"}
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail="An error occurred while deleting all tags")
 
+BATCH_CHUNK_SIZE = 256
+# Longest NDJSON line accepted: a tag of MAX_TAG_LENGTH characters all escaped
+# as `\uXXXX`, plus its quotes and surrounding whitespace
+MAX_NDJSON_LINE = 6 * MAX_TAG_LENGTH + 64
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response that leaves the request body to its content iterator.
+
+    StreamingResponse listens for client disconnects on `receive` from the
+    start, which would compete with reading a request body that is still
+    being uploaded. This response only listens once `body_received` is set
+    and stops streaming when the client disconnects after that. A disconnect
+    during the upload ends the content iterator with `ClientDisconnect`,
+    which stops the response as well.
+
+    The status line is only sent along with the first chunk, so an
+    HTTPException raised by the content iterator before that is sent as a
+    plain error response. Raised later, it ends the stream with a last
+    line holding the error.
+    """
+
+    def __init__(self, content, body_received: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_received = body_received
+
+    async def __call__(self, scope, receive, send):
+        async with anyio.create_task_group() as task_group:
+            async def wrap(func) -> None:
+                try:
+                    await func()
+                except ClientDisconnect:
+                    pass
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(wrap, partial(self.stream_response, send))
+            await wrap(partial(self.listen_for_disconnect, receive))
+        if self.background is not None:
+            await self.background()
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body_received.wait()
+        await super().listen_for_disconnect(receive)
+
+    async def stream_response(self, send) -> None:
+        started = False
+
+        async def start(status_code: int, headers) -> None:
+            nonlocal started
+            started = True
+            await send({"type": "http.response.start", "status": status_code, "headers": headers})
+
+        try:
+            async for chunk in self.body_iterator:
+                if not started:
+                    await start(self.status_code, self.raw_headers)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        except HTTPException as e:
+            error = {"detail": e.detail}
+            if not started:
+                body = json.dumps(error).encode()
+                await start(e.status_code, [(b"content-type", b"application/json"),
+                                            (b"content-length", str(len(body)).encode())])
+                await send({"type": "http.response.body", "body": body})
+                return
+            error = {"error": {"type": "HTTPException", "status": e.status_code, **error}}
+            await send({"type": "http.response.body", "body": (json.dumps(error) + "\n").encode(), "more_body": True})
+        if not started:
+            await start(self.status_code, self.raw_headers)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class _BatchItemError(Exception):
+    """Placeholder result for batch items that are not a tag string."""
+
+
+def _batch_record(index: int, tag, result) -> bytes:
+    """Serialize a single batch parse result as one NDJSON line."""
+    record = {"index": index, "tag": tag}
+    if isinstance(result, Tagstyle):
+        record["result"] = result.model_dump()
+    else:
+        error_type = "InvalidItemError" if isinstance(result, _BatchItemError) else type(result).__name__
+        record["error"] = {"type": error_type, "detail": str(result)}
+    return (json.dumps(record) + "\n").encode()
+
+
+async def _ndjson_items(request: Request, body_received: asyncio.Event) -> AsyncIterator:
+    """
+    Decode an NDJSON request body line by line while it is received, setting `body_received` at its end.
+
+    Raises:
+        HTTPException: 413 if a line exceeds `MAX_NDJSON_LINE` bytes, before it is buffered whole.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            _check_ndjson_line(line)
+            if line.strip():
+                yield _decode_ndjson_line(line)
+        _check_ndjson_line(buffer)
+    body_received.set()
+    if buffer.strip():
+        yield _decode_ndjson_line(buffer)
+
+
+def _check_ndjson_line(line: bytes) -> None:
+    if len(line) > MAX_NDJSON_LINE:
+        raise HTTPException(status_code=413, detail=f"NDJSON lines must not exceed {MAX_NDJSON_LINE} bytes")
+
+
+def _decode_ndjson_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _BatchItemError(f"Invalid JSON line: {e}")
+
+
+async def _iterate(items) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+def _parse_chunk(parser: Parser, snapshot, chunk: List, start: int) -> bytes:
+    """Parse one chunk of batch items and serialize the results in input order."""
+    parsed = parser.parse_tags([item for item in chunk if isinstance(item, str)], snapshot=snapshot)
+    lines = []
+    for offset, item in enumerate(chunk):
+        if isinstance(item, str):
+            tag, result = next(parsed)
+        elif isinstance(item, _BatchItemError):
+            tag, result = None, item
+        else:
+            tag, result = item, _BatchItemError("Batch items must be strings")
+        lines.append(_batch_record(start + offset, tag, result))
+    return b"".join(lines)
+
+
+async def _stream_batch(items: AsyncIterator, parser: Parser, snapshot) -> AsyncIterator[bytes]:
+    """Parse batch items in chunks against one snapshot, off the event loop, and stream the results."""
+    start = 0
+    chunk: List = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield await run_in_threadpool(_parse_chunk, parser, snapshot, chunk, start)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield await run_in_threadpool(_parse_chunk, parser, snapshot, chunk, start)
+
+
+@app.post("/tags/parse/batch", tags=["identifier"])
+async def parse_tags_batch(request: Request, parser: Parser = Depends(get_parser)):
+    """
+    Parse many tags at once and stream the results back as NDJSON.
+
+    The body is either a JSON array of tags or, with an
+    `application/x-ndjson` content type, one JSON string per line.
+    Every tag produces one output line holding either its `result` or
+    an `error`, so a bad tag does not fail the rest of the batch.
+
+    A JSON array is received and decoded whole before the first result is
+    sent, so its size is bounded by memory; NDJSON bodies are parsed while
+    they are uploaded. Parsing stops when the client disconnects.
+
+    An NDJSON line longer than `MAX_NDJSON_LINE` bytes fails the request
+    with status 413, or ends the stream with an error line if results
+    were already sent.
+    """
+    body_received = asyncio.Event()
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = _ndjson_items(request, body_received)
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=422, detail="Request body must be a JSON array of tags")
+        items = _iterate(body)
+        body_received.set()
+
+    try:
+        snapshot = await run_in_threadpool(parser.snapshot)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail="An error occurred while loading the tagstyles")
+
+    return DuplexStreamingResponse(_stream_batch(items, parser, snapshot), body_received,
+                                   media_type="application/x-ndjson")
+
 @app.get("/resolver/", response_model=ResolverResponse, tags=["resolver"])
 async def retrieve_url_to_data_endpoint(identifier_content: str, term: str=None, role: str=None, token: str=None):
     return "This method is still work in progress"
 
+@app.get("/parser/cache", tags=['utils'])
+async def get_parser_cache_stats(parser: Parser = Depends(get_parser)):
+    """Report hit, miss and eviction counters of the parse result cache."""
+    return parser.cache_info()
+
 @app.get("/healthcheck/", tags=['utils'])
 async def conduct_internal_healthcheck():
     return "This method is still work in progress"
@@ -1,36 +1,506 @@
-from resolver.servicerouter.service_discovery import ServiceDiscovery
-from resolver.tagparser.tagparser import Parser
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+from pydantic import BaseModel
+from resolver.servicerouter.client_generator import BaseAPIClient, Endpoint, EndpointFilterCriteria
+from resolver.servicerouter.health import CircuitOpenError, hedged_call
+from resolver.servicerouter.service_discovery import (
+    ServiceAPI, ServiceDiscovery, ServiceFetchError, ServiceFilterCriteria,
+)
+from resolver.tagparser.tagparser import ParsedTag, Parser
+
+PATH_PARAMETER = re.compile(r"\{([^}/]+)\}")
+
+
+class ServiceCatalogue(NamedTuple):
+    """An immutable view of the network: the registered services and the clients built for them."""
+    services: List[ServiceAPI]
+    clients: List[BaseAPIClient]
+    clients_by_id: Dict[int, BaseAPIClient]
+    errors: List[ServiceFetchError]
+    refreshed_at: float
+
+
+EMPTY_CATALOGUE = ServiceCatalogue([], [], {}, [], 0.0)
+
+
+def service_fingerprint(service: ServiceAPI) -> Tuple:
+    """The fields whose change requires rebuilding a service's client."""
+    return (service.version, service.lastUpdated, service.apiDocumentationAdress, service.rootAddress)
+
+
+FIRST = "first"
+ALL = "all"
+QUORUM = "quorum"
+DATA_REQUEST_MODES = (FIRST, ALL, QUORUM)
+
+
+class DataCall(NamedTuple):
+    """A provider endpoint to request data from."""
+    service: ServiceAPI
+    client: BaseAPIClient
+    endpoint: Endpoint
+
+
+class ProviderResult(BaseModel):
+    """
+    The answer of one provider endpoint to a data request, or the error it failed with.
+    """
+    serviceName: str
+    id: int
+    path: str
+    data: Any = None
+    error: Optional[str] = None
+    elapsed: float
+
+
+class DataResponse(BaseModel):
+    """
+    The outcome of a data request fanned out to several providers.
+
+    `complete` tells whether the mode was satisfied: an answer in `first`
+    mode, `quorum` answers in `quorum` mode, and every provider answering in
+    `all` mode.
+    """
+    identifier: str
+    tagstyle: str
+    mode: str
+    complete: bool
+    data: Any = None
+    results: List[ProviderResult]
+    errors: List[ProviderResult]
+
+
+def fill_path(endpoint: Endpoint, contents: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Substitute the contents of an identifier into the `{parameters}` of an endpoint path.
+
+    Values are percent-encoded as a single path segment, so a content holding
+    `/`, `..`, `?` or `#` cannot reach another resource or add query parameters.
+    The endpoint itself keeps its path template, which response caching and
+    results are keyed by.
+
+    Args:
+        endpoint (Endpoint): The endpoint to call.
+        contents (Dict[str, str]): The contents extracted from the identifier.
+
+    Returns:
+        Tuple[str, Dict[str, str]]: The concrete path to request, and the contents
+        not used in it, to be sent as query parameters.
+    """
+    names = set(PATH_PARAMETER.findall(endpoint.path)) & contents.keys()
+    if not names:
+        return endpoint.path, contents
+    path = PATH_PARAMETER.sub(lambda match: quote(contents[match.group(1)], safe="")
+                              if match.group(1) in names else match.group(0), endpoint.path)
+    return path, {name: value for name, value in contents.items() if name not in names}
+
+
+def merge_data(answers: List[Any]) -> Any:
+    """Merge provider answers: dictionaries key by key in order, anything else into a list."""
+    if not answers:
+        return None
+    if len(answers) == 1:
+        return answers[0]
+    if all(isinstance(answer, dict) for answer in answers):
+        merged: Dict[str, Any] = {}
+        for answer in answers:
+            for key, value in answer.items():
+                merged.setdefault(key, value)
+        return merged
+    return answers
+
+
+class NetworkRefresher:
+    """
+    Background thread refreshing a `QueryEngine` periodically.
+
+    Each wait is the interval plus up to `jitter` of it at random, so workers
+    started together do not all hit the registry at the same moment. Errors
+    are printed and the next refresh is attempted as scheduled.
+
+    Args:
+        engine (QueryEngine): The engine to refresh.
+        interval (float): Seconds between refreshes.
+        jitter (float): Fraction of the interval added at random to every wait.
+    """
+
+    def __init__(self, engine: "QueryEngine", interval: float, jitter: float = 0.1):
+        self.engine = engine
+        self.interval = interval
+        self.jitter = jitter
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="network-refresher", daemon=True)
+
+    def start(self) -> "NetworkRefresher":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval * (1 + random.uniform(0, self.jitter))):
+            try:
+                self.engine.update_network()
+            except Exception as e:
+                print(f"Error refreshing the service network: {e}")
+
 
 class QueryEngine:
-    def __init__(self, registry_endpoint):
+    """
+    Routes requests to the services of the network.
+
+    The services and their clients are published together as one
+    `ServiceCatalogue`, replaced by a single assignment on every refresh, so
+    readers always see a consistent pair without taking a lock.
+
+    With `warm_start`, the catalogue is restored from `snapshot_path`, or
+    from the per-service files of the artefact store if there is no usable
+    snapshot, and the engine can serve without reaching the registry. It is
+    marked `warm` until `update_network` revalidates it, typically through
+    `revalidate_in_background`. Only if nothing is stored does the
+    constructor block on discovery.
+
+    Args:
+        registry_endpoint (str): URL of the registry listing all services.
+        parser (Parser, optional): Parses the identifiers of data requests.
+        request_deadline (float): Default seconds a data request waits for its providers.
+        max_workers (int): Number of providers a data request calls concurrently.
+        snapshot_path (str, optional): File the catalogue is saved to after every change.
+        warm_start (bool): Whether to restore the catalogue from disk instead of discovering it.
+    """
+
+    def __init__(self, registry_endpoint, parser: Optional[Parser] = None, request_deadline: float = 10.0,
+                 max_workers: int = 16, snapshot_path: Optional[str] = None, warm_start: bool = False):
         self.registry_endpoint = registry_endpoint
-        self.update_network()
+        self.parser = parser if parser is not None else Parser()
+        self.request_deadline = request_deadline
+        self.max_workers = max_workers
+        self.snapshot_path = snapshot_path
+        # Kept across refreshes so unchanged schemas cost a 304 and reuse their clients
+        self.discovery = ServiceDiscovery(self.registry_endpoint)
+        self.catalogue = EMPTY_CATALOGUE
+        self.warm = False
+        self.refresher: Optional[NetworkRefresher] = None
+        self._refresh_lock = threading.Lock()
+        if not (warm_start and self.load_network()):
+            self.update_network()
+
+    @property
+    def services(self) -> List[ServiceAPI]:
+        return self.catalogue.services
+
+    @property
+    def clients(self) -> List[BaseAPIClient]:
+        return self.catalogue.clients
+
+    @property
+    def discovery_errors(self) -> List[ServiceFetchError]:
+        return self.catalogue.errors
+
+    def update_network(self) -> bool:
+        """
+        Refresh the catalogue incrementally from the registry.
+
+        Services are compared with the current catalogue by `id` and by their
+        `version`, `lastUpdated` and addresses. Clients are only built for new
+        and changed services, and for services whose client failed before;
+        unchanged services keep their client without any request.
+
+        Returns:
+            bool: True once the new catalogue is published.
+        """
+        with self._refresh_lock:
+            current = self.catalogue
+            services = self.discovery.fetch_services()
+            known = {service.id: service_fingerprint(service) for service in current.services}
+            stale = [service for service in services
+                     if known.get(service.id) != service_fingerprint(service)
+                     or service.id not in current.clients_by_id]
 
-    def update_network(self) -> bool:  # This will be triggered regularly via a chron job
-        discovery = ServiceDiscovery(self.registry_endpoint)
-        self.services = discovery.fetch_services()
-        self.clients = discovery.generate_clients(self.services)
+            stale_ids = {service.id for service in stale}
+            rebuilt = {client.client_id: client for client in self.discovery.generate_clients(stale)} if stale else {}
+            errors = list(self.discovery.errors) if stale else []
+
+            clients_by_id = {}
+            for service in services:
+                client = rebuilt.get(service.id)
+                if client is None and service.id not in stale_ids:
+                    client = current.clients_by_id.get(service.id)
+                if client is not None:
+                    clients_by_id[service.id] = client
+
+            self.catalogue = ServiceCatalogue(services, list(clients_by_id.values()), clients_by_id, errors,
+                                              time.time())
+            self.warm = False
+            if self.snapshot_path and (stale or services is not current.services
+                                       or not os.path.exists(self.snapshot_path)):
+                try:
+                    self.discovery.save_snapshot(self.snapshot_path, services)
+                except OSError as e:
+                    print(f"An error occurred while saving the network snapshot: {e}")
+        return True
+
+    def load_network(self) -> bool:
+        """
+        Publish the catalogue stored by a previous process, without network access.
+
+        The snapshot at `snapshot_path` is preferred; without one, the registry
+        and schema files of the artefact store are read.
+
+        Returns:
+            bool: Whether a stored catalogue was published.
+        """
+        with self._refresh_lock:
+            restored = self.discovery.load_snapshot(self.snapshot_path) if self.snapshot_path else None
+            if restored is None:
+                restored = self.discovery.load_stored()
+            if restored is None or not restored.services:
+                return False
+            clients_by_id = {client.client_id: client for client in restored.clients}
+            self.catalogue = ServiceCatalogue(restored.services, restored.clients, clients_by_id,
+                                              list(self.discovery.errors), restored.saved_at)
+            self.warm = True
         return True
-    
-    def formulate_data_request(self, role, identifier, term=None):
-        if term == None:
-            # get request
-            pass
-        else:
-            pass
-            # Callback to vocabulary if term exists and if model level or individual level
-            # filter service type "data provider" and result of callback
-            # 
-        # filter potential providers
 
+    def revalidate_in_background(self) -> threading.Thread:
+        """
+        Refresh the network once on a daemon thread, e.g. after a warm start.
+
+        Readers keep the current catalogue until the refreshed one is published.
+        Errors are printed, leaving the current catalogue in place.
+
+        Returns:
+            threading.Thread: The started thread.
+        """
+        def revalidate():
+            try:
+                self.update_network()
+            except Exception as e:
+                print(f"Error refreshing the service network: {e}")
+
+        thread = threading.Thread(target=revalidate, name="network-revalidation", daemon=True)
+        thread.start()
+        return thread
+
+    def call_provider(self, services: List[ServiceAPI], call: Callable[[BaseAPIClient], Any],
+                      hedge: bool = True) -> Any:
+        """
+        Make a call through the healthiest of several providers of the same data.
+
+        Providers are tried in the order of `ServiceDiscovery.rank_services`,
+        skipping those whose circuit is open. The next one is tried when a call
+        fails and, with `hedge`, also raced against the first once it takes
+        longer than its p95 latency, so one degraded provider does not hold up
+        the answer. The call must be safe to repeat.
+
+        Args:
+            services (List[ServiceAPI]): The candidate providers.
+            call (Callable[[BaseAPIClient], Any]): Makes the request through a provider's client.
+            hedge (bool): Whether to race a second provider against a slow first one.
+
+        Returns:
+            Any: The result of the first call to succeed.
+
+        Raises:
+            CircuitOpenError: If no candidate provider is available.
+        """
+        catalogue = self.catalogue
+        health = self.discovery.health
+        clients = [catalogue.clients_by_id[service.id] for service in self.discovery.rank_services(services)
+                   if service.id in catalogue.clients_by_id and health.available(service.rootAddress)]
+        if not clients:
+            raise CircuitOpenError("No available provider")
+        delay = health.hedge_delay(clients[0].root_address) if hedge else None
+        return hedged_call([lambda client=client: call(client) for client in clients], delay)
+
+    def start_refresher(self, interval: float, jitter: float = 0.1) -> NetworkRefresher:
+        """
+        Refresh the network in the background every `interval` seconds.
+
+        Args:
+            interval (float): Seconds between refreshes.
+            jitter (float): Fraction of the interval added at random to every wait.
+
+        Returns:
+            NetworkRefresher: The started refresher.
+        """
+        self.stop_refresher()
+        self.refresher = NetworkRefresher(self, interval, jitter).start()
+        return self.refresher
+
+    def stop_refresher(self) -> None:
+        """Stop the background refresher, if any."""
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher = None
+
+    def data_calls(self, identifier: str, term: Optional[str] = None) -> Tuple[ParsedTag, List[DataCall]]:
+        """
+        Determine which provider endpoints to ask for the data of an identifier.
+
+        The identifier is parsed into its tagstyle and contents. Candidates are
+        the GET endpoints of "data provider" services tagged with the term, or
+        with the tagstyle name if no term is given, ranked by provider health.
+        Providers whose circuit is open are left out.
+
+        Args:
+            identifier (str): The tag identifying the asset.
+            term (str, optional): The vocabulary term requested.
+
+        Returns:
+            Tuple[ParsedTag, List[DataCall]]: The parsed identifier and the calls to make.
+
+        Raises:
+            AmbiguousTagError: If multiple tagstyles match the identifier.
+            InvalidTagError: If no tagstyle matches the identifier.
+        """
+        parsed = self.parser.parse_tag_fields(identifier)
+        catalogue = self.catalogue
+        health = self.discovery.health
+        providers = self.discovery.filter_services(catalogue.services, ServiceFilterCriteria(serviceType="data provider"))
+        criteria = EndpointFilterCriteria(tags=term if term is not None else parsed.tagstyle, method="get")
+
+        calls = []
+        for service in self.discovery.rank_services(providers):
+            client = catalogue.clients_by_id.get(service.id)
+            if client is None or not health.available(service.rootAddress):
+                continue
+            calls.extend(DataCall(service, client, endpoint) for endpoint in client.filter_endpoints(criteria))
+        return parsed, calls
+
+    def stream_data_request(self, role, identifier: str, term: Optional[str] = None,
+                            deadline: Optional[float] = None) -> Iterator[ProviderResult]:
+        """
+        Request the data of an identifier from all candidate providers at once.
+
+        Results are yielded as they arrive. Calls still outstanding when the
+        deadline passes are cancelled and yielded as errors. When the caller
+        stops iterating early and closes the iterator, the remaining calls are
+        cancelled silently, without results. A call already on the wire cannot
+        be interrupted and is abandoned, bounded by the client's read timeout.
+
+        Args:
+            role: The role of the requester.
+            identifier (str): The tag identifying the asset.
+            term (str, optional): The vocabulary term requested.
+            deadline (float, optional): Seconds to wait for all providers, defaults to `self.request_deadline`.
+
+        Returns:
+            Iterator[ProviderResult]: The answer or the error of each provider endpoint, in order of arrival.
+
+        Raises:
+            AmbiguousTagError: If multiple tagstyles match the identifier.
+            InvalidTagError: If no tagstyle matches the identifier.
+        """
+        parsed, calls = self.data_calls(identifier, term)
+        return self._fan_out(calls, parsed.contents, deadline)
+
+    def _fan_out(self, calls: List[DataCall], contents: Dict[str, str],
+                 deadline: Optional[float]) -> Iterator[ProviderResult]:
+        if not calls:
+            return
+        deadline = self.request_deadline if deadline is None else deadline
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls)),
+                                      thread_name_prefix="data-request")
+        futures = {executor.submit(self._request_data, call, contents): call for call in calls}
+        try:
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    yield future.result()
+            except FuturesTimeoutError:
+                for future, call in futures.items():
+                    if not future.done():
+                        yield self._provider_result(call, error=f"Deadline of {deadline}s exceeded", elapsed=deadline)
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def formulate_data_request(self, role, identifier: str, term: Optional[str] = None, mode: str = FIRST,
+                               quorum: Optional[int] = None, deadline: Optional[float] = None) -> DataResponse:
+        """
+        Request the data of an identifier from the candidate providers concurrently.
+
+        All providers are asked at once, so a lookup takes as long as its
+        slowest provider rather than the sum of all of them, and never longer
+        than the deadline. The mode decides when to stop waiting:
+
+        - `first`: the first successful answer; the other calls are cancelled.
+        - `all`: every answer received before the deadline, merged.
+        - `quorum`: the first `quorum` successful answers, merged.
+
+        Dictionaries are merged in arrival order, later providers filling in
+        missing keys only; other answers are returned as a list.
+
+        Args:
+            role: The role of the requester.
+            identifier (str): The tag identifying the asset.
+            term (str, optional): The vocabulary term requested.
+            mode (str): `first`, `all` or `quorum`.
+            quorum (int, optional): Successful answers required in `quorum` mode.
+            deadline (float, optional): Seconds to wait for the providers, defaults to `self.request_deadline`.
+
+        Returns:
+            DataResponse: The merged data with the individual results and errors.
+
+        Raises:
+            ValueError: If the mode is unknown or the quorum is missing.
+        """
+        if mode not in DATA_REQUEST_MODES:
+            raise ValueError(f"Unknown data request mode: {mode}")
+        if mode == FIRST:
+            quorum = 1
+        elif mode == QUORUM and (quorum is None or quorum < 1):
+            raise ValueError("Quorum mode requires a quorum of at least 1")
+
+        parsed, calls = self.data_calls(identifier, term)
+        results: List[ProviderResult] = []
+        errors: List[ProviderResult] = []
+        stream = self._fan_out(calls, parsed.contents, deadline)
+        try:
+            for result in stream:
+                (errors if result.error is not None else results).append(result)
+                if mode != ALL and len(results) >= quorum:
+                    break
+        finally:
+            stream.close()
+
+        complete = bool(results) and (mode == ALL and not errors or mode != ALL and len(results) >= quorum)
+        return DataResponse(identifier=identifier, tagstyle=parsed.tagstyle, mode=mode, complete=complete,
+                            data=merge_data([result.data for result in results]), results=results, errors=errors)
+
+    def _request_data(self, call: DataCall, contents: Dict[str, str]) -> ProviderResult:
+        start = time.monotonic()
+        path, params = fill_path(call.endpoint, contents)
+        try:
+            response = call.client.make_request(None, call.endpoint, url_path=path, **params)
+            try:
+                data = response.json()
+            except ValueError:
+                data = response.text
+            return self._provider_result(call, data=data, elapsed=time.monotonic() - start)
+        except Exception as e:
+            return self._provider_result(call, error=str(e), elapsed=time.monotonic() - start)
 
+    @staticmethod
+    def _provider_result(call: DataCall, data=None, error: Optional[str] = None, elapsed: float = 0.0) -> ProviderResult:
+        return ProviderResult(serviceName=call.service.serviceName, id=call.service.id, path=call.endpoint.path,
+                              data=data, error=error, elapsed=elapsed)
 
     def request_recommendation():
         pass
 
     def parse_tag(self, tag):
-        parser = Parser()
-        tag = parser.parse_tag(tag)
+        return self.parser.parse_tag(tag)
 
 
 class Callback:
@@ -1,2 +1,6 @@
-from .client_generator import Endpoint, EndpointFilterCriteria, APIClient
-from .service_discovery import ServiceAPI, ServiceFilterCriteria, ServiceDiscovery
\ No newline at end of file
+from .client_generator import Endpoint, EndpointFilterCriteria, BaseAPIClient, APIClient, ClientConfig
+from .service_discovery import ServiceAPI, ServiceFetchError, ServiceFilterCriteria, ServiceDiscovery
+from .response_cache import ResponseCache
+from .health import CircuitOpenError, HealthRegistry, hedged_call, ahedged_call
+from .async_client import AsyncAPIClient, create_http_client
+from .async_discovery import AsyncServiceDiscovery
\ No newline at end of file
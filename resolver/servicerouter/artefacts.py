@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import requests
+
+META_FILE = "meta.json"
+
+
+class Artefact(NamedTuple):
+    """The stored content of a discovery artefact and whether the last fetch changed it."""
+    content: bytes
+    digest: str
+    changed: bool
+
+
+class ArtefactStore:
+    """
+    Discovery artefacts on disk together with their content hashes and HTTP validators.
+
+    Every directory holds a `meta.json` mapping each artefact file to the SHA-256
+    of its content and the `ETag`/`Last-Modified` headers it was served with.
+    Fetches send these back as `If-None-Match`/`If-Modified-Since`, so an
+    unchanged document costs a 304 and is read from disk, and files are only
+    rewritten when their content hash changes.
+
+    Args:
+        root (str): Directory under which artefacts are stored.
+    """
+
+    def __init__(self, root: str = "./resolver/data/discovery"):
+        self.root = os.path.abspath(root)
+        self._meta: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, *parts: str) -> str:
+        """Return the absolute path of an artefact below the root."""
+        return os.path.join(self.root, *parts)
+
+    def fetch(self, url: str, path: str, timeout: Optional[Tuple[float, float]] = None) -> Artefact:
+        """
+        Conditionally download a document and store it if its content changed.
+
+        Args:
+            url (str): The document URL.
+            path (str): Where the document is stored.
+            timeout (Tuple[float, float], optional): Connect and read timeouts.
+
+        Returns:
+            Artefact: The current content, its hash, and whether it differs from the stored one.
+
+        Raises:
+            requests.RequestException: If the request fails or returns an error status.
+        """
+        headers = self.conditional_headers(path)
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code != 304 or not headers:
+            response.raise_for_status()
+        return self.resolve(path, response.status_code, response.content, response.headers.get("ETag"),
+                            response.headers.get("Last-Modified"), conditional=bool(headers))
+
+    def conditional_headers(self, path: str) -> Dict[str, str]:
+        """Return the `If-None-Match`/`If-Modified-Since` headers for a stored artefact, if any."""
+        entry = self.entry(path)
+        headers = {}
+        if entry and os.path.exists(path):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def resolve(self, path: str, status_code: int, content: bytes, etag: Optional[str] = None,
+                last_modified: Optional[str] = None, conditional: bool = False) -> Artefact:
+        """
+        Turn a successful response into the current artefact.
+
+        A 304 to a conditional request is answered from disk; any other
+        response is stored if its content changed.
+
+        Args:
+            path (str): Where the artefact is stored.
+            status_code (int): The response status.
+            content (bytes): The response body.
+            etag (str, optional): The `ETag` response header.
+            last_modified (str, optional): The `Last-Modified` response header.
+            conditional (bool): Whether the request carried `conditional_headers`.
+
+        Returns:
+            Artefact: The current content, its hash, and whether it differs from the stored one.
+        """
+        if status_code == 304 and conditional:
+            with open(path, "rb") as file:
+                return Artefact(file.read(), self.entry(path)["sha256"], False)
+        return self.store(path, content, etag=etag, last_modified=last_modified)
+
+    def store(self, path: str, content: bytes, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> Artefact:
+        """
+        Write an artefact unless a file with the same content hash is already stored.
+
+        Args:
+            path (str): Where the artefact is stored.
+            content (bytes): The artefact content.
+            etag (str, optional): The `ETag` the content was served with.
+            last_modified (str, optional): The `Last-Modified` date the content was served with.
+
+        Returns:
+            Artefact: The content, its hash, and whether the stored file was rewritten.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        entry = self.entry(path)
+        changed = entry is None or entry.get("sha256") != digest or not os.path.exists(path)
+        if changed:
+            self._write(path, content)
+        new_entry = {"sha256": digest, "etag": etag, "last_modified": last_modified}
+        if new_entry != entry:
+            self._set_entry(path, new_entry)
+        return Artefact(content, digest, changed)
+
+    def entry(self, path: str) -> Optional[dict]:
+        """Return the stored hash and validators of an artefact, if any."""
+        directory, name = os.path.split(path)
+        return self._directory_meta(directory).get(name)
+
+    def _directory_meta(self, directory: str) -> Dict[str, dict]:
+        with self._lock:
+            meta = self._meta.get(directory)
+            if meta is None:
+                try:
+                    with open(os.path.join(directory, META_FILE), "r") as file:
+                        meta = json.load(file)
+                except (OSError, ValueError):
+                    meta = {}
+                self._meta[directory] = meta
+            return meta
+
+    def _set_entry(self, path: str, entry: dict) -> None:
+        directory, name = os.path.split(path)
+        meta = self._directory_meta(directory)
+        with self._lock:
+            meta[name] = entry
+            self._write(os.path.join(directory, META_FILE), json.dumps(meta, indent=2).encode())
+
+    @staticmethod
+    def _write(path: str, content: bytes) -> None:
+        # Replace atomically so readers never see a partially written artefact
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from typing import Optional
+import httpx
+from resolver.servicerouter.client_generator import BaseAPIClient, ClientConfig, Endpoint
+from resolver.servicerouter.health import HealthRegistry
+from resolver.servicerouter.response_cache import CACHEABLE_METHODS, request_key
+
+
+def create_http_client(config: Optional[ClientConfig] = None) -> httpx.AsyncClient:
+    """
+    Create an `httpx.AsyncClient` with the connection limits and timeouts of a client config.
+
+    One such client is meant to be shared by all asynchronous API clients, so
+    `max_connections` bounds the upstream connections of the whole process.
+
+    Args:
+        config (ClientConfig, optional): The settings to use, defaults to `ClientConfig()`.
+
+    Returns:
+        httpx.AsyncClient: The HTTP client.
+    """
+    config = config if config is not None else ClientConfig()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=config.max_connections,
+                            max_keepalive_connections=config.max_keepalive_connections),
+        timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+    )
+
+
+class AsyncAPIClient(BaseAPIClient):
+    """
+    Asynchronous client for an API described by an OpenAPI schema.
+
+    Uses the same `Endpoint` model and filtering as `APIClient`, but sends
+    requests with `httpx` so callers on the event loop never block. Retries
+    follow the `ClientConfig` policy: idempotent methods are retried on the
+    configured statuses and on transport errors, any method if the connection
+    could not be opened. Identical GET and HEAD requests are coalesced and
+    cached as by `APIClient`.
+
+    Args:
+        openapi_schema (dict): The OpenAPI schema of the API.
+        client_id (int, optional): The id of the service.
+        root_address (str, optional): The default base URL of requests.
+        config (ClientConfig, optional): Timeout and retry settings.
+        http_client (httpx.AsyncClient, optional): A shared HTTP client. If omitted,
+            the client creates its own on first use and closes it in `aclose`.
+        health (HealthRegistry, optional): Where calls are recorded, shared between clients.
+    """
+
+    def __init__(self, openapi_schema: dict, client_id: int = None, root_address: str = None,
+                 config: Optional[ClientConfig] = None, http_client: Optional[httpx.AsyncClient] = None,
+                 health: Optional[HealthRegistry] = None):
+        super().__init__(openapi_schema, client_id=client_id, root_address=root_address, config=config,
+                         health=health)
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = create_http_client(self.config)
+        return self._http_client
+
+    async def make_request(self, root_url: Optional[str], endpoint: Endpoint, *, url_path: Optional[str] = None,
+                           **kwargs) -> httpx.Response:
+        """
+        Make an HTTP request to an endpoint.
+
+        Responses are cached by URL, with the lifetimes configured for the
+        endpoint's path template.
+
+        Args:
+            root_url (str, optional): The base URL of the API, defaults to the client's root address.
+            endpoint (Endpoint): The endpoint to make the request to.
+            url_path (str, optional): The path to request with its `{parameters}` filled in,
+                defaults to the endpoint's path.
+            **kwargs: Additional arguments for the request, see `prepare_request`.
+
+        Returns:
+            httpx.Response: The HTTP response.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit breaker is open.
+            SystemError: If the request failed.
+        """
+        method, url, arguments = self.prepare_request(root_url, endpoint, kwargs, url_path)
+        root = root_url or self.root_address
+        if method not in CACHEABLE_METHODS:
+            return await self._send(root, method, url, arguments)
+        return await self.response_cache.aget(request_key(method, url, arguments), endpoint.path,
+                                              lambda: self._send(root, method, url, arguments))
+
+    async def _send(self, root: str, method: str, url: str, arguments: dict) -> httpx.Response:
+        self.health.admit(root)
+        idempotent = method in {allowed.upper() for allowed in self.config.retry_methods}
+        retry = 0
+        start = time.monotonic()
+        failed = True
+        try:
+            while True:
+                try:
+                    response = await self.http_client.request(method, url, **arguments)
+                    failed = response.status_code >= 500
+                    if (idempotent and retry < self.config.retries
+                            and response.status_code in self.config.retry_statuses):
+                        retry += 1
+                        await response.aclose()
+                        await asyncio.sleep(self.__delay(retry, response))
+                        continue
+                    response.raise_for_status()  # Raise HTTPStatusError for bad responses
+                    return response
+                except httpx.TransportError as e:
+                    failed = True
+                    connect_failed = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                    if retry < self.config.retries and (idempotent or connect_failed):
+                        retry += 1
+                        await asyncio.sleep(self.config.backoff(retry))
+                        continue
+                    raise SystemError(f"Request to {url} failed: {e}")
+                except httpx.HTTPError as e:
+                    raise SystemError(f"Request to {url} failed: {e}")
+        finally:
+            self.health.record(root, time.monotonic() - start, failed)
+
+    def __delay(self, retry: int, response: httpx.Response) -> float:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), self.config.backoff_max)
+        return self.config.backoff(retry)
+
+    async def aclose(self) -> None:
+        """Close the HTTP client if it was created by this client."""
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import json
+from typing import List, Optional
+import httpx
+from resolver.servicerouter.artefacts import Artefact, ArtefactStore
+from resolver.servicerouter.async_client import AsyncAPIClient, create_http_client
+from resolver.servicerouter.client_generator import ClientConfig
+from resolver.servicerouter.health import HealthRegistry
+from resolver.servicerouter.service_discovery import (
+    ServiceAPI, ServiceDiscovery, ServiceFetchError, ServiceFilterCriteria,
+)
+
+
+class AsyncServiceDiscovery:
+    """
+    Asynchronous service discovery on a shared `httpx.AsyncClient`.
+
+    Mirrors `ServiceDiscovery`, whose artefact caching, client reuse and error
+    reporting it shares through a wrapped instance, but fetches on the event
+    loop. Schemas are fetched concurrently up to `max_concurrency`, and the
+    generated `AsyncAPIClient`s share the same HTTP client and connection pool.
+
+    Args:
+        get_all_registered_services_endpoint (str, optional): URL of the registry listing all services.
+        connect_timeout (float): Seconds to wait for a connection to a registry or service.
+        read_timeout (float): Seconds to wait between bytes of a response.
+        deadline (float): Seconds after which `generate_clients` stops waiting for outstanding schemas.
+        max_concurrency (int): Number of schemas fetched concurrently.
+        store (ArtefactStore, optional): Where registry and schema documents are cached.
+        client_config (ClientConfig, optional): Connection limits, timeouts and retries of generated clients.
+        http_client (httpx.AsyncClient, optional): The HTTP client to use, created from `client_config` if omitted.
+        health (HealthRegistry, optional): Provider health shared by all generated clients.
+    """
+
+    def __init__(self, get_all_registered_services_endpoint: str = None, connect_timeout: float = 3.05,
+                 read_timeout: float = 10.0, deadline: float = 30.0, max_concurrency: int = 64,
+                 store: Optional[ArtefactStore] = None, client_config: Optional[ClientConfig] = None,
+                 http_client: Optional[httpx.AsyncClient] = None, health: Optional[HealthRegistry] = None):
+        self.discovery = ServiceDiscovery(get_all_registered_services_endpoint, connect_timeout=connect_timeout,
+                                          read_timeout=read_timeout, deadline=deadline,
+                                          max_workers=max_concurrency, store=store, client_config=client_config,
+                                          health=health)
+        self.max_concurrency = max_concurrency
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._owns_http_client = http_client is None
+        self.http_client = http_client if http_client is not None else create_http_client(self.discovery.client_config)
+
+    @property
+    def errors(self) -> List[ServiceFetchError]:
+        return self.discovery.errors
+
+    @property
+    def health(self) -> HealthRegistry:
+        return self.discovery.health
+
+    def rank_services(self, services: List[ServiceAPI]) -> List[ServiceAPI]:
+        """Order services by the observed health of their providers, see `ServiceDiscovery.rank_services`."""
+        return self.discovery.rank_services(services)
+
+    async def _fetch(self, url: str, path: str) -> Artefact:
+        store = self.discovery.store
+        headers = store.conditional_headers(path)
+        response = await self.http_client.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code != 304 or not headers:
+            response.raise_for_status()
+        # Reading and writing artefacts is file I/O; keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            store.resolve, path, response.status_code, response.content,
+            response.headers.get("ETag"), response.headers.get("Last-Modified"), bool(headers),
+        ))
+
+    async def fetch_services(self) -> List[ServiceAPI]:
+        """
+        Fetch services from the registry server.
+
+        Returns:
+            List[ServiceAPI]: A list of discovered services.
+        """
+        try:
+            artefact = await self._fetch(self.discovery.registry_server, self.discovery.store.path("registry.json"))
+            return await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self.discovery._adopt_services, artefact))
+        except httpx.HTTPError as e:
+            print(f"Error fetching service endpoints from registry: {e}")
+            raise e
+
+    async def fetch_openapi_schema(self, service: ServiceAPI) -> dict:
+        """
+        Fetch the OpenAPI schema for a given service.
+
+        Args:
+            service (ServiceAPI): The service for which to fetch the OpenAPI schema.
+
+        Returns:
+            dict: The OpenAPI schema.
+        """
+        return json.loads((await self.__fetch_openapi_artefact(service)).content)
+
+    async def __fetch_openapi_artefact(self, service: ServiceAPI) -> Artefact:
+        try:
+            return await self._fetch(service.apiDocumentationAdress,
+                                     self.discovery._service_path(service, "openapi.json"))
+        except httpx.HTTPError as e:
+            print(f"Error fetching OpenAPI schema from {service.apiDocumentationAdress}: {e}")
+            raise e
+
+    def filter_services(self, services: List[ServiceAPI], criteria: ServiceFilterCriteria) -> List[ServiceAPI]:
+        """Filter services based on given criteria, see `ServiceDiscovery.filter_services`."""
+        return self.discovery.filter_services(services, criteria)
+
+    async def generate_clients(self, services: List[ServiceAPI]) -> List[AsyncAPIClient]:
+        """
+        Generate asynchronous API clients from the OpenAPI schemas of the given services.
+
+        Services that fail, or are still outstanding when the deadline passes,
+        are left out of the result and recorded in `self.errors`.
+
+        Args:
+            services (List[ServiceAPI]): The list of services to generate clients for.
+
+        Returns:
+            List[AsyncAPIClient]: The generated API clients, in the order of `services`.
+        """
+        self.discovery.errors = []
+        if not services:
+            return []
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def generate(service: ServiceAPI):
+            async with semaphore:
+                start = loop.time()
+                try:
+                    artefact = await self.__fetch_openapi_artefact(service)
+                    # Decoding and parsing the schema is CPU-bound; keep it off the event loop
+                    entry = await loop.run_in_executor(None, functools.partial(
+                        self.discovery._client_for, service, artefact, AsyncAPIClient,
+                        http_client=self.http_client))
+                    return entry, None, loop.time() - start
+                except Exception as e:
+                    return None, str(e), loop.time() - start
+
+        tasks = [asyncio.ensure_future(generate(service)) for service in services]
+        await asyncio.wait(tasks, timeout=self.discovery.deadline)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return self.discovery._collect_clients(
+            services, [None if task.cancelled() else task.result() for task in tasks])
+
+    async def aclose(self) -> None:
+        """Close the HTTP client if it was created by this discovery."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def __aenter__(self) -> "AsyncServiceDiscovery":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
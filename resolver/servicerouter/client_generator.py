@@ -1,20 +1,97 @@
 import json
+import random
+import threading
+import time
 import requests
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from resolver.servicerouter.endpoint_index import EndpointIndex
+from resolver.servicerouter.health import HealthRegistry
+from resolver.servicerouter.refs import RefResolver
+from resolver.servicerouter.response_cache import CACHEABLE_METHODS, ResponseCache, request_key
+
+# Methods sending their arguments as a JSON body rather than as query parameters
+BODY_METHODS = frozenset({"post", "put", "patch"})
+SUPPORTED_METHODS = frozenset({"get", "head", "options", "delete"}) | BODY_METHODS
+
+
+# Keys of a path item that describe operations; the others (parameters, summary, ...) are shared
+HTTP_METHODS = frozenset({"get", "put", "post", "delete", "options", "head", "patch", "trace"})
+_UNRESOLVED = object()
 
 
 class Endpoint:
     """
     Represents an API endpoint with its path, method, tags, request body schema, and query parameters.
+
+    Endpoints parsed from a schema keep a reference to their operation and
+    resolve the request body, query parameters and responses, with nested `$ref`s
+    inlined, on first access. The operation is released once all three are resolved.
     """
+    __slots__ = ("path", "method", "tags", "_operation", "_resolver", "_request_body", "_query_params", "_responses")
 
-    def __init__(self, path: str, method: str, tags: List[str], request_body: dict = None, query_params: list = None):
+    def __init__(self, path: str, method: str, tags: List[str], request_body: dict = None, query_params: list = None,
+                 operation: Optional[dict] = None, resolver: Optional[RefResolver] = None):
         self.path = path
         self.method = method
-        self.request_body = request_body
-        self.query_params = query_params
         self.tags = tags
+        self._operation = operation
+        self._resolver = resolver
+        self._request_body = request_body if operation is None else _UNRESOLVED
+        self._query_params = query_params if operation is None else _UNRESOLVED
+        self._responses = None if operation is None else _UNRESOLVED
+
+    def _inline(self, node):
+        return node if self._resolver is None else self._resolver.expand(node)
+
+    def _json_schema(self, node: Optional[dict]) -> Optional[dict]:
+        # Schema of the application/json content of a request body or response
+        if not node:
+            return None
+        if "$ref" in node and self._resolver is not None:
+            node = self._resolver.resolve(node["$ref"])
+        return self._inline(node.get("content", {}).get("application/json", {}).get("schema"))
+
+    @property
+    def request_body(self) -> Optional[dict]:
+        """The JSON schema of the request body."""
+        if self._request_body is _UNRESOLVED:
+            self._request_body = self._json_schema(self._operation.get("requestBody"))
+            self._release()
+        return self._request_body
+
+    @request_body.setter
+    def request_body(self, value: Optional[dict]) -> None:
+        self._request_body = value
+
+    @property
+    def query_params(self) -> Optional[list]:
+        """The parameters of the operation, including those shared by its path."""
+        if self._query_params is _UNRESOLVED:
+            parameters = self._operation.get("parameters")
+            self._query_params = None if parameters is None else [self._inline(parameter) for parameter in parameters]
+            self._release()
+        return self._query_params
+
+    @query_params.setter
+    def query_params(self, value: Optional[list]) -> None:
+        self._query_params = value
+
+    @property
+    def responses(self) -> Dict[str, Optional[dict]]:
+        """The JSON schema of each response by status code, None for responses without JSON content."""
+        if self._responses is _UNRESOLVED:
+            self._responses = {str(status): self._json_schema(response)
+                               for status, response in (self._operation.get("responses") or {}).items()}
+            self._release()
+        return self._responses or {}
+
+    def _release(self) -> None:
+        if _UNRESOLVED not in (self._request_body, self._query_params, self._responses):
+            self._operation = None
 
 
 class EndpointFilterCriteria(BaseModel):
@@ -26,18 +103,85 @@ class EndpointFilterCriteria(BaseModel):
     tags: Optional[Union[str, List[str]]] = None
 
 
-class APIClient:
+class ClientConfig(BaseModel):
+    """
+    Connection pooling, timeout, retry and response cache settings of an API client.
+
+    Retries back off exponentially with random jitter and are only made for
+    idempotent methods, or for any method if the connection could not be opened.
+    Responses to GET and HEAD are cached for as long as their `Cache-Control`
+    allows, `cache_ttls` overriding it per endpoint path template.
+    """
+    pool_connections: int = 4
+    pool_maxsize: int = 16
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    retries: int = 3
+    backoff_factor: float = 0.2
+    backoff_jitter: float = 0.1
+    backoff_max: float = 5.0
+    retry_statuses: List[int] = [502, 503, 504]
+    retry_methods: List[str] = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+    # Limits of the shared connection pool of asynchronous clients
+    max_connections: int = 200
+    max_keepalive_connections: int = 50
+    # Response cache; 0 entries disables caching but not the coalescing of identical calls
+    cache_maxsize: int = 1024
+    cache_ttl: float = 0.0
+    cache_stale: float = 0.0
+    cache_ttls: Dict[str, float] = {}
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def backoff(self, retry: int) -> float:
+        """Seconds to wait before the given retry, counted from 1, including jitter."""
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** (retry - 1)))
+        return delay + random.uniform(0, self.backoff_jitter)
+
+    def retry(self) -> Retry:
+        """Build the urllib3 retry policy for these settings."""
+        return Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            backoff_max=self.backoff_max,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset(method.upper() for method in self.retry_methods),
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+
+    def response_cache(self) -> ResponseCache:
+        """Build a response cache for these settings."""
+        return ResponseCache(maxsize=self.cache_maxsize, ttl=self.cache_ttl, stale=self.cache_stale,
+                             ttls=self.cache_ttls)
+
+
+class BaseAPIClient:
     """
     Client for interacting with an API based on its OpenAPI schema.
     Parses the OpenAPI schema to extract endpoint information and provides methods
-    to make requests and filter endpoints based on criteria.
+    to filter endpoints based on criteria. Subclasses make the requests and
+    record their latency and outcome in `health`, whose circuit breaker
+    refuses calls to a failing provider.
     """
 
-    def __init__(self, openapi_schema: dict, client_id: int = None):
+    def __init__(self, openapi_schema: dict, client_id: int = None, root_address: str = None,
+                 config: Optional[ClientConfig] = None, health: Optional[HealthRegistry] = None):
         self.client_id = client_id
+        self.root_address = root_address
+        self.config = config if config is not None else ClientConfig()
+        self.health = health if health is not None else HealthRegistry()
+        self.response_cache = self.config.response_cache()
         self.openapi_version = openapi_schema.get("openapi", {})
-        self.openapi_schema = openapi_schema
+        # `paths` is only needed to build the endpoints, which keep what they use of it;
+        # the rest stays for resolving references
+        self.openapi_schema = {key: value for key, value in openapi_schema.items() if key != "paths"}
+        self.ref_resolver = RefResolver(self.openapi_schema)
         self.endpoints = self.parse_openapi_schema(openapi_schema)
+        self._endpoint_index: Optional[EndpointIndex] = None
 
     def resolve_ref(self, ref: str) -> dict:
         """
@@ -49,19 +193,15 @@ class APIClient:
         Returns:
             dict: The resolved schema.
         """
-        try:
-            ref_path = ref.split('/')[1:]  # Split and remove the initial '#'
-            schema = self.openapi_schema
-            for part in ref_path:
-                schema = schema[part]
-            return schema
-        except KeyError:
-            raise ValueError(f"Invalid reference: {ref}")
+        return self.ref_resolver.resolve(ref)
 
     def parse_openapi_schema(self, openapi_schema: dict) -> List[Endpoint]:
         """
         Parse the OpenAPI schema to extract endpoint information.
 
+        Only paths, methods and tags are read here; request bodies, parameters
+        and responses are resolved when an endpoint's attributes are first used.
+
         Args:
             openapi_schema (dict): The OpenAPI schema.
 
@@ -71,77 +211,186 @@ class APIClient:
         endpoints = []
         paths = openapi_schema.get("paths", {})
 
-        for path, methods in paths.items():
-            for method, details in methods.items():
-                request_body_schema = details.get("requestBody", {}).get("content", {}).get("application/json", {}).get("schema")
+        for path, path_item in paths.items():
+            shared_parameters = path_item.get("parameters")
+            for method, details in path_item.items():
+                if method not in HTTP_METHODS:
+                    continue
+                operation = details
+                if shared_parameters:
+                    operation = {**details, "parameters": shared_parameters + details.get("parameters", [])}
 
-                if request_body_schema and "$ref" in request_body_schema:
-                    request_body_schema = self.resolve_ref(request_body_schema["$ref"])
-
-                endpoint = Endpoint(
+                endpoints.append(Endpoint(
                     path=path,
                     method=method,
                     tags=details.get("tags", []),
-                    request_body=request_body_schema,
-                    query_params=details.get("parameters")
-                )
-
-                endpoints.append(endpoint)
+                    operation=operation,
+                    resolver=self.ref_resolver,
+                ))
         return endpoints
 
-    def make_request(self, root_url: str, endpoint: Endpoint, **kwargs) -> requests.Response:
+    def prepare_request(self, root_url: Optional[str], endpoint: Endpoint, kwargs: dict,
+                        url_path: Optional[str] = None) -> Tuple[str, str, dict]:
         """
-        Make an HTTP request to an endpoint.
+        Build the method, URL and arguments of a request to an endpoint.
+
+        GET, HEAD, OPTIONS and DELETE send the keyword arguments as query parameters;
+        POST, PUT and PATCH send `data` as the JSON body and `params` as query parameters.
 
         Args:
-            root_url (str): The base URL of the API.
+            root_url (str, optional): The base URL of the API, defaults to the client's root address.
             endpoint (Endpoint): The endpoint to make the request to.
-            **kwargs: Additional arguments for the request.
+            kwargs (dict): Additional arguments for the request.
+            url_path (str, optional): The path to request with its `{parameters}` filled in,
+                defaults to the endpoint's path.
 
         Returns:
-            requests.Response: The HTTP response.
+            Tuple[str, str, dict]: The upper-case method, the URL and the `json`/`params` arguments.
         """
-        try:
-            url = root_url + endpoint.path
-            method = endpoint.method.lower()
-            if method == "get":
-                response = requests.get(url, params=kwargs)
-            elif method == "post":
-                response = requests.post(url, json=kwargs.get("data"))
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            response.raise_for_status()  # Raise HTTPError for bad responses
-            return response
-        except requests.RequestException as e:
-            raise SystemError(f"Request to {url} failed: {e}")
+        root_url = root_url or self.root_address
+        method = endpoint.method.lower()
+        if method not in SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        if method in BODY_METHODS:
+            arguments = {"json": kwargs.get("data"), "params": kwargs.get("params")}
+        else:
+            arguments = {"params": kwargs}
+        return method.upper(), root_url.rstrip("/") + (url_path or endpoint.path), arguments
+
+    @property
+    def endpoint_index(self) -> EndpointIndex:
+        """The inverted indexes over `self.endpoints`, rebuilt if the list is replaced."""
+        if self._endpoint_index is None or self._endpoint_index.endpoints is not self.endpoints:
+            self._endpoint_index = EndpointIndex(self.endpoints)
+        return self._endpoint_index
 
     def filter_endpoints(self, criteria: EndpointFilterCriteria) -> List[Endpoint]:
         """
         Filter the endpoints based on the given criteria.
 
+        Every given criterion must match; a list matches if any of its values does.
+        Tags match exactly, while methods and paths match as substrings.
+
         Args:
             criteria (EndpointFilterCriteria): The criteria to filter the endpoints.
 
         Returns:
             List[Endpoint]: A list of endpoints that match the criteria.
         """
-        filtered_endpoints = self.endpoints
         criteria_dict = criteria.model_dump(exclude_unset=True)
+        if not criteria_dict:
+            return self.endpoints
+        return [self.endpoints[endpoint_id] for endpoint_id in self.endpoint_index.select(criteria_dict)]
+
+    def match_path(self, path: str, method: Optional[str] = None) -> List[Endpoint]:
+        """
+        Find the endpoints whose path template matches a concrete request path.
 
-        for key, value in criteria_dict.items():
-            if isinstance(value, list):
-                new_filtered_endpoints = []
-                for endpoint in filtered_endpoints:
-                    for filter_val in value:
-                        if filter_val in getattr(endpoint, key):
-                            new_filtered_endpoints.append(endpoint)
-                            break  # Avoid adding the same endpoint multiple times
-                filtered_endpoints = new_filtered_endpoints
-            else:
-                filtered_endpoints = [
-                    endpoint for endpoint in filtered_endpoints
-                    if value in getattr(endpoint, key)
-                ]
-
-        return filtered_endpoints
-    
\ No newline at end of file
+        Args:
+            path (str): A request path such as `/items/42/events`.
+            method (str, optional): Only return endpoints of this HTTP method.
+
+        Returns:
+            List[Endpoint]: The matching endpoints, e.g. the one of `/items/{id}/events`.
+        """
+        endpoints = [self.endpoints[endpoint_id] for endpoint_id in self.endpoint_index.templates.match(path)]
+        if method is not None:
+            endpoints = [endpoint for endpoint in endpoints if endpoint.method == method.lower()]
+        return endpoints
+
+    def close(self) -> None:
+        """Release the connections held by the client."""
+
+
+class APIClient(BaseAPIClient):
+    """
+    Synchronous client for an API described by an OpenAPI schema.
+
+    Requests go through one keep-alive `requests.Session` per root address,
+    so repeated calls to a provider reuse pooled connections. Identical GET
+    and HEAD requests share one upstream call and are answered from
+    `response_cache` while fresh.
+    """
+
+    def __init__(self, openapi_schema: dict, client_id: int = None, root_address: str = None,
+                 config: Optional[ClientConfig] = None, health: Optional[HealthRegistry] = None):
+        super().__init__(openapi_schema, client_id=client_id, root_address=root_address, config=config,
+                         health=health)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+
+    def session(self, root_url: str) -> requests.Session:
+        """
+        Return the pooled session for the scheme and host of a root URL, creating it on first use.
+
+        Args:
+            root_url (str): The base URL of the API.
+
+        Returns:
+            requests.Session: A session with a retrying, connection-pooling adapter.
+        """
+        parts = urlsplit(root_url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(key)
+        if session is None:
+            with self._sessions_lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.config.pool_connections,
+                                          pool_maxsize=self.config.pool_maxsize,
+                                          max_retries=self.config.retry())
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._sessions[key] = session
+        return session
+
+    def close(self) -> None:
+        """Close the pooled connections of all sessions."""
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def make_request(self, root_url: Optional[str], endpoint: Endpoint, *, url_path: Optional[str] = None,
+                     **kwargs) -> requests.Response:
+        """
+        Make an HTTP request to an endpoint.
+
+        Responses are cached by URL, with the lifetimes configured for the
+        endpoint's path template.
+
+        Args:
+            root_url (str, optional): The base URL of the API, defaults to the client's root address.
+            endpoint (Endpoint): The endpoint to make the request to.
+            url_path (str, optional): The path to request with its `{parameters}` filled in,
+                defaults to the endpoint's path.
+            **kwargs: Additional arguments for the request, see `prepare_request`.
+
+        Returns:
+            requests.Response: The HTTP response.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit breaker is open.
+            SystemError: If the request failed.
+        """
+        method, url, arguments = self.prepare_request(root_url, endpoint, kwargs, url_path)
+        root = root_url or self.root_address
+        if method not in CACHEABLE_METHODS:
+            return self._send(root, method, url, arguments)
+        return self.response_cache.get(request_key(method, url, arguments), endpoint.path,
+                                       lambda: self._send(root, method, url, arguments))
+
+    def _send(self, root: str, method: str, url: str, arguments: dict) -> requests.Response:
+        self.health.admit(root)
+        start = time.monotonic()
+        failed = True
+        try:
+            response = self.session(url).request(method, url, timeout=self.config.timeout, **arguments)
+            failed = response.status_code >= 500
+            response.raise_for_status()  # Raise HTTPError for bad responses
+            return response
+        except requests.RequestException as e:
+            raise SystemError(f"Request to {url} failed: {e}")
+        finally:
+            self.health.record(root, time.monotonic() - start, failed)
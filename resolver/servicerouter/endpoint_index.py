@@ -0,0 +1,197 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+GRAM = 3
+# Exact criteria narrow the selection cheaply, so they are applied before substring ones
+CRITERIA_ORDER = {"tags": 0, "method": 1, "path": 2}
+EMPTY: Set[int] = frozenset()
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[start:start + GRAM] for start in range(len(text) - GRAM + 1)}
+
+
+class _TemplateNode:
+    __slots__ = ("literals", "params", "endpoints")
+
+    def __init__(self):
+        self.literals: Dict[str, "_TemplateNode"] = {}
+        # (segment pattern, child) for segments holding a `{parameter}`
+        self.params: List[tuple] = []
+        self.endpoints: List[int] = []
+
+
+def _segment_pattern(segment: str) -> Optional["re.Pattern"]:
+    """Compile a path segment with `{parameters}` into a regex, or return None for literal segments."""
+    if "{" not in segment:
+        return None
+    parts = re.split(r"\{[^}/]*\}", segment)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts))
+
+
+class PathTemplateTrie:
+    """
+    Segment trie of OpenAPI path templates such as `/items/{id}/events`.
+
+    Matches concrete request paths against the templates in time proportional
+    to the number of segments, trying literal segments before parameters.
+    """
+
+    def __init__(self):
+        self.root = _TemplateNode()
+
+    def add(self, template: str, endpoint_id: int) -> None:
+        node = self.root
+        for segment in template.strip("/").split("/"):
+            pattern = _segment_pattern(segment)
+            if pattern is None:
+                node = node.literals.setdefault(segment, _TemplateNode())
+                continue
+            for existing, child in node.params:
+                if existing.pattern == pattern.pattern:
+                    node = child
+                    break
+            else:
+                child = _TemplateNode()
+                node.params.append((pattern, child))
+                node = child
+        node.endpoints.append(endpoint_id)
+
+    def match(self, path: str) -> List[int]:
+        """Return the ids of the endpoints whose template matches a concrete path."""
+        matches: List[int] = []
+        self._match(self.root, path.split("?", 1)[0].strip("/").split("/"), 0, matches)
+        return sorted(set(matches))
+
+    def _match(self, node: _TemplateNode, segments: List[str], position: int, matches: List[int]) -> None:
+        if position == len(segments):
+            matches.extend(node.endpoints)
+            return
+        segment = segments[position]
+        child = node.literals.get(segment)
+        if child is not None:
+            self._match(child, segments, position + 1, matches)
+        for pattern, child in node.params:
+            if pattern.fullmatch(segment):
+                self._match(child, segments, position + 1, matches)
+
+
+class EndpointIndex:
+    """
+    Inverted indexes over the endpoints of an API client.
+
+    Answers each criterion of `EndpointFilterCriteria` with the same semantics
+    as a scan: a tag must be one of the endpoint's tags, while method and path
+    criteria are substrings of the endpoint's method and path. Methods are few
+    and scanned per distinct value; paths are narrowed with a trigram index
+    before the substring check.
+
+    Args:
+        endpoints (List[Endpoint]): The endpoints to index, in client order.
+    """
+
+    def __init__(self, endpoints: List):
+        self.endpoints = endpoints
+        self.paths = [endpoint.path for endpoint in endpoints]
+        self.by_tag: Dict[str, Set[int]] = {}
+        self.by_method: Dict[str, Set[int]] = {}
+        self.by_path: Dict[str, Set[int]] = {}
+        self.path_grams: Dict[str, Set[str]] = {}
+        self.templates = PathTemplateTrie()
+
+        for endpoint_id, endpoint in enumerate(endpoints):
+            for tag in endpoint.tags:
+                self.by_tag.setdefault(tag, set()).add(endpoint_id)
+            self.by_method.setdefault(endpoint.method, set()).add(endpoint_id)
+            if endpoint.path not in self.by_path:
+                for gram in _grams(endpoint.path):
+                    self.path_grams.setdefault(gram, set()).add(endpoint.path)
+            self.by_path.setdefault(endpoint.path, set()).add(endpoint_id)
+            self.templates.add(endpoint.path, endpoint_id)
+
+    def select(self, criteria: Dict[str, object]) -> List[int]:
+        """
+        Return the positions of the endpoints matching all criteria, in client order.
+
+        Exact criteria are applied first. A path criterion following them is
+        checked on the selected endpoints directly when the path index would
+        yield more candidates than are selected, as for common fragments
+        such as `{id}`.
+
+        Args:
+            criteria (Dict[str, object]): Criterion names mapped to a value or a list of values.
+
+        Returns:
+            List[int]: The sorted positions of the matching endpoints.
+        """
+        selected: Optional[Set[int]] = None
+        for key, value in sorted(criteria.items(), key=lambda item: CRITERIA_ORDER.get(item[0], len(CRITERIA_ORDER))):
+            values = value if isinstance(value, list) else [value]
+            if selected is not None and key == "path" and self._path_estimate(values) >= len(selected):
+                paths = self.paths
+                if len(values) == 1:
+                    fragment = values[0]
+                    selected = {endpoint_id for endpoint_id in selected if fragment in paths[endpoint_id]}
+                else:
+                    selected = {endpoint_id for endpoint_id in selected
+                                if any(fragment in paths[endpoint_id] for fragment in values)}
+            else:
+                matches = self._union([self.matching(key, filter_val) for filter_val in values])
+                selected = matches if selected is None else selected & matches
+            if not selected:
+                return []
+        if selected is None:
+            return list(range(len(self.endpoints)))
+        return sorted(selected)
+
+    def matching(self, key: str, value) -> Set[int]:
+        """
+        Return the ids of the endpoints matching one criterion value.
+
+        The returned set may be shared with the index and must not be modified.
+
+        Args:
+            key (str): The criterion, `tags`, `method` or `path`.
+            value: The criterion value.
+
+        Returns:
+            Set[int]: Positions of the matching endpoints.
+        """
+        if key == "tags":
+            return self.by_tag.get(value, EMPTY)
+        if key == "method":
+            return self._union([ids for method, ids in self.by_method.items() if value in method])
+        if key == "path":
+            return self._union([self.by_path[path] for path in self.paths_containing(value)])
+        return {endpoint_id for endpoint_id, endpoint in enumerate(self.endpoints)
+                if value in getattr(endpoint, key)}
+
+    def _path_estimate(self, fragments: List[str]) -> float:
+        """Estimate the endpoints the path index would touch to answer some fragments."""
+        candidates = 0
+        for fragment in fragments:
+            if len(fragment) < GRAM:
+                candidates = len(self.by_path)
+                break
+            candidates += min(len(self.path_grams.get(gram, EMPTY)) for gram in _grams(fragment))
+        # Each candidate path is checked, then its endpoints are merged into the result
+        return candidates * (1 + len(self.endpoints) / max(len(self.by_path), 1))
+
+    def paths_containing(self, fragment: str) -> List[str]:
+        """Return the distinct paths containing a fragment."""
+        if len(fragment) < GRAM:
+            candidates: Iterable[str] = self.by_path
+        else:
+            postings = sorted((self.path_grams.get(gram, set()) for gram in _grams(fragment)), key=len)
+            candidates = set.intersection(*postings) if postings[0] else ()
+        return [path for path in candidates if fragment in path]
+
+    @staticmethod
+    def _union(sets: List[Set[int]]) -> Set[int]:
+        # A single set is returned as it is, without copying
+        if len(sets) == 1:
+            return sets[0]
+        result: Set[int] = set()
+        for ids in sets:
+            result |= ids
+        return result
@@ -0,0 +1,293 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(SystemError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+def _key(root_address: str) -> str:
+    return (root_address or "").rstrip("/")
+
+
+class ProviderHealth:
+    """
+    Latency and error statistics and the circuit breaker state of one provider.
+
+    Latencies and outcomes of the last `window` calls are kept for percentiles
+    and the error rate, next to an exponentially weighted moving average of
+    the latency.
+    """
+
+    def __init__(self, window: int, alpha: float):
+        self.alpha = alpha
+        self.latencies: deque = deque(maxlen=window)
+        self.failed: deque = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.failed) / len(self.failed) if self.failed else 0.0
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the nearest-rank percentile `q` (0-100) of the recent latencies, None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+    def observe(self, latency: float, failed: bool) -> None:
+        self.calls += 1
+        self.failures += failed
+        self.latencies.append(latency)
+        self.failed.append(failed)
+        self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+
+
+class HealthRegistry:
+    """
+    Observed health of providers, keyed by root address, with a circuit breaker each.
+
+    API clients record every upstream call here. A provider's circuit opens
+    after `failure_threshold` consecutive failures, or once at least
+    `min_calls` recent calls failed at `error_rate_threshold` or more. Calls
+    are then refused for `cooldown` seconds, after which one probe is let
+    through: its success closes the circuit, its failure opens it again.
+
+    Failures are transport errors and 5xx responses; 4xx responses are answers
+    of a healthy provider.
+
+    Args:
+        window (int): Number of recent calls kept per provider for percentiles and the error rate.
+        alpha (float): Weight of the latest latency in the moving average.
+        failure_threshold (int): Consecutive failures opening the circuit.
+        error_rate_threshold (float): Recent error rate opening the circuit.
+        min_calls (int): Recent calls needed before the error rate or percentiles are trusted.
+        cooldown (float): Seconds an open circuit refuses calls before probing.
+        clock (Callable[[], float]): Monotonic clock.
+    """
+
+    def __init__(self, window: int = 100, alpha: float = 0.2, failure_threshold: int = 5,
+                 error_rate_threshold: float = 0.5, min_calls: int = 20, cooldown: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._providers: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    def provider(self, root_address: str) -> ProviderHealth:
+        """Return the health record of a provider, creating it on first use."""
+        key = _key(root_address)
+        health = self._providers.get(key)
+        if health is None:
+            with self._lock:
+                health = self._providers.setdefault(key, ProviderHealth(self.window, self.alpha))
+        return health
+
+    def admit(self, root_address: str) -> None:
+        """
+        Check that a call to a provider may be made, letting one probe through a circuit whose cooldown is over.
+
+        Args:
+            root_address (str): The root address of the provider.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with its probe outstanding.
+        """
+        health = self.provider(root_address)
+        with self._lock:
+            if health.state == CLOSED:
+                return
+            if health.state == OPEN and self._clock() - health.opened_at >= self.cooldown:
+                health.state = HALF_OPEN
+            if health.state == HALF_OPEN and not health.probing:
+                health.probing = True
+                return
+        raise CircuitOpenError(f"Circuit open for {root_address}")
+
+    def available(self, root_address: str) -> bool:
+        """Whether a call to a provider would currently be admitted, without claiming a probe."""
+        health = self.provider(root_address)
+        with self._lock:
+            if health.state == OPEN:
+                return self._clock() - health.opened_at >= self.cooldown
+            return health.state == CLOSED or not health.probing
+
+    def record(self, root_address: str, latency: float, failed: bool) -> None:
+        """
+        Record the outcome of a call and update the provider's circuit.
+
+        Args:
+            root_address (str): The root address of the provider.
+            latency (float): Seconds the call took.
+            failed (bool): Whether the call failed.
+        """
+        health = self.provider(root_address)
+        with self._lock:
+            health.observe(latency, failed)
+            probe, health.probing = health.probing, False
+            if not failed:
+                health.consecutive_failures = 0
+                if health.state != CLOSED:
+                    # Start over, so the failures that opened the circuit do not reopen it
+                    health.state = CLOSED
+                    health.failed.clear()
+                return
+            health.consecutive_failures += 1
+            if (probe or health.state == HALF_OPEN
+                    or health.consecutive_failures >= self.failure_threshold
+                    or (len(health.failed) >= self.min_calls and health.error_rate >= self.error_rate_threshold)):
+                health.state = OPEN
+                health.opened_at = self._clock()
+
+    def score(self, root_address: str) -> float:
+        """
+        Return the expected cost of calling a provider, lower is better.
+
+        The moving average latency divided by the recent success rate; providers
+        without observations score 0 so they are tried, open circuits score infinity.
+        """
+        health = self.provider(root_address)
+        if not self.available(root_address):
+            return math.inf
+        if health.ewma is None:
+            return 0.0
+        return health.ewma / max(1.0 - health.error_rate, 0.01)
+
+    def rank(self, candidates: Iterable[T], root_address: Callable[[T], str]) -> List[T]:
+        """
+        Order candidates by the score of their provider, keeping the given order between equals.
+
+        Args:
+            candidates (Iterable[T]): Services, clients or anything with a provider.
+            root_address (Callable[[T], str]): Returns the root address of a candidate.
+
+        Returns:
+            List[T]: The candidates, healthiest first and open circuits last.
+        """
+        return sorted(candidates, key=lambda candidate: self.score(root_address(candidate)))
+
+    def hedge_delay(self, root_address: str, percentile: float = 95) -> Optional[float]:
+        """Return the latency percentile after which a call to a provider is worth hedging, None while unknown."""
+        health = self.provider(root_address)
+        with self._lock:
+            if len(health.latencies) < self.min_calls:
+                return None
+            return health.percentile(percentile)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the health of every provider seen.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Circuit state, calls, failures, error rate and latency statistics by root address.
+        """
+        with self._lock:
+            return {
+                key: {
+                    "state": health.state,
+                    "calls": health.calls,
+                    "failures": health.failures,
+                    "error_rate": health.error_rate,
+                    "ewma": health.ewma,
+                    "p50": health.percentile(50),
+                    "p95": health.percentile(95),
+                    "p99": health.percentile(99),
+                }
+                for key, health in self._providers.items()
+            }
+
+
+def hedged_call(attempts: List[Callable[[], T]], delay: Optional[float] = None) -> T:
+    """
+    Return the result of the first attempt to succeed, starting attempts one after the other.
+
+    The next attempt starts as soon as all running ones have failed, or once
+    `delay` seconds pass without a result, so a slow first provider is raced
+    by the second. Attempts must be safe to repeat. A losing attempt cannot be
+    interrupted and finishes in the background.
+
+    Args:
+        attempts (List[Callable[[], T]]): Equivalent calls, preferred first.
+        delay (float, optional): Seconds to wait before hedging, None to only fail over.
+
+    Returns:
+        T: The first successful result.
+
+    Raises:
+        Exception: The error of the last attempt to fail, if all of them failed.
+    """
+    if not attempts:
+        raise ValueError("No attempts to make")
+    executor = ThreadPoolExecutor(max_workers=len(attempts), thread_name_prefix="hedge")
+    pending = set()
+    started = 0
+    error: Optional[BaseException] = None
+    try:
+        while True:
+            if started < len(attempts):
+                pending.add(executor.submit(attempts[started]))
+                started += 1
+            done, pending = wait(pending, timeout=delay if started < len(attempts) else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not pending and started == len(attempts):
+                raise error
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def ahedged_call(attempts: List[Callable[[], Awaitable[T]]], delay: Optional[float] = None) -> T:
+    """
+    Asynchronous counterpart of `hedged_call`; attempts are coroutine functions.
+
+    Attempts still running when one succeeds are cancelled.
+    """
+    if not attempts:
+        raise ValueError("No attempts to make")
+    pending = set()
+    started = 0
+    error: Optional[BaseException] = None
+    try:
+        while True:
+            if started < len(attempts):
+                pending.add(asyncio.ensure_future(attempts[started]()))
+                started += 1
+            done, pending = await asyncio.wait(pending, timeout=delay if started < len(attempts) else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if not pending and started == len(attempts):
+                raise error
+    finally:
+        for task in pending:
+            task.cancel()
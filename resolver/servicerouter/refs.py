@@ -0,0 +1,107 @@
+from typing import Any, Dict, List
+from urllib.parse import unquote
+
+
+class RefResolver:
+    """
+    Memoized resolution of local `$ref`s (`#/components/...`) within an OpenAPI document.
+
+    Every reference is looked up once; later lookups are a dictionary hit.
+    JSON pointer escapes (`~0`, `~1`) and percent-encoding are decoded, chains of
+    references are followed, and `expand` inlines nested references while
+    leaving recursive ones as `$ref` so the result is always finite.
+
+    Args:
+        document (dict): The document references point into. Only the parts
+            that are referenced need to be kept, typically everything but `paths`.
+    """
+
+    def __init__(self, document: dict):
+        self.document = document
+        self._targets: Dict[str, Any] = {}
+        self._expanded: Dict[str, Any] = {}
+
+    def resolve(self, ref: str) -> Any:
+        """
+        Resolve a reference, following references that point to other references.
+
+        Args:
+            ref (str): The reference, e.g. `#/components/schemas/Item`.
+
+        Returns:
+            Any: The referenced object.
+
+        Raises:
+            ValueError: If the reference is external, dangling, or part of a cycle of references.
+        """
+        target = self._targets.get(ref)
+        if target is not None:
+            return target
+
+        seen: List[str] = []
+        current = ref
+        while True:
+            if current in seen:
+                raise ValueError(f"Circular reference: {' -> '.join(seen + [current])}")
+            seen.append(current)
+            target = self._lookup(current)
+            if not (isinstance(target, dict) and isinstance(target.get("$ref"), str)):
+                break
+            current = target["$ref"]
+        for link in seen:
+            self._targets[link] = target
+        return target
+
+    def _lookup(self, ref: str) -> Any:
+        if not ref.startswith("#"):
+            raise ValueError(f"Invalid reference: {ref}")
+        node = self.document
+        try:
+            for token in ref[1:].split("/")[1:]:
+                token = unquote(token).replace("~1", "/").replace("~0", "~")
+                node = node[int(token)] if isinstance(node, list) else node[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise ValueError(f"Invalid reference: {ref}")
+        return node
+
+    def expand(self, node: Any) -> Any:
+        """
+        Return a copy of a schema with its references inlined.
+
+        A reference met again while its own target is being expanded is kept as
+        `{"$ref": ...}`. Expanded targets are memoized and shared between callers,
+        so the result must not be modified.
+
+        Args:
+            node (Any): A schema or any other part of the document.
+
+        Returns:
+            Any: The schema with references replaced by their expanded targets.
+        """
+        return self._expand(node, [], [])
+
+    def _expand(self, node: Any, active: List[str], cuts: List[int]) -> Any:
+        # `active` holds the references being expanded, outermost first, and
+        # `cuts` the stack depths at which recursion was cut off
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                if ref in active:
+                    cuts.append(active.index(ref))
+                    return node
+                expanded = self._expanded.get(ref)
+                if expanded is None:
+                    depth, mark = len(active), len(cuts)
+                    active.append(ref)
+                    try:
+                        expanded = self._expand(self.resolve(ref), active, cuts)
+                    finally:
+                        active.pop()
+                    # The expansion is context free unless it cut a reference enclosing this one
+                    if all(cut >= depth for cut in cuts[mark:]):
+                        self._expanded[ref] = expanded
+                return expanded
+            return {key: self._expand(value, active, cuts) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self._expand(value, active, cuts) for value in node]
+        return node
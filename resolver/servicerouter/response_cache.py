@@ -0,0 +1,290 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+# Only responses to safe methods are cached or shared between callers
+CACHEABLE_METHODS = frozenset({"GET", "HEAD"})
+CACHEABLE_STATUSES = frozenset({200, 203, 204})
+
+
+class CachedResponse(NamedTuple):
+    response: Any
+    fresh_until: float
+    stale_until: float
+
+
+class _Flight:
+    """An upstream call in progress, awaited by every identical request."""
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error: Optional[BaseException] = None
+
+
+def request_key(method: str, url: str, arguments: dict) -> Tuple:
+    """
+    Build the cache key of a request from its method, URL and query parameters.
+
+    Parameters are normalised so that their order, and whether a value is given
+    as a string, a number or a one-element list, does not matter. `None` values
+    are dropped, as they are by the HTTP clients.
+
+    Args:
+        method (str): The upper-case HTTP method.
+        url (str): The request URL without query string.
+        arguments (dict): The request arguments from `BaseAPIClient.prepare_request`.
+
+    Returns:
+        Tuple: A hashable key.
+    """
+    params = []
+    for name, value in (arguments.get("params") or {}).items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        params.append((str(name), tuple(str(item) for item in values)))
+    return method, url, tuple(sorted(params))
+
+
+def cache_control(headers) -> Dict[str, Optional[str]]:
+    """Parse the `Cache-Control` header of a response into lower-case directives."""
+    directives: Dict[str, Optional[str]] = {}
+    for directive in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    return float(value) if value is not None and value.isdigit() else None
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of upstream responses with request coalescing.
+
+    Identical requests, as keyed by `request_key`, that arrive while one is in
+    flight wait for it instead of calling the provider again. Successful
+    responses are kept for their freshness lifetime and may then be served
+    stale for a while longer, during which a single background call
+    revalidates them. Should it fail, the stale response keeps being served
+    until it expires.
+
+    Lifetimes come from the per-endpoint `ttls` if the endpoint's path template
+    is listed, then from the response's `Cache-Control` (`s-maxage`, `max-age`,
+    `stale-while-revalidate`, with `no-store`, `no-cache` and `private`
+    disabling caching), and fall back to `ttl` and `stale`.
+
+    Cached responses are shared between callers and must not be modified.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0.0, stale: float = 0.0,
+                 ttls: Optional[Dict[str, float]] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of cached responses.
+            ttl (float): Seconds responses without caching headers stay fresh.
+            stale (float): Seconds a response may be served stale while it is revalidated.
+            ttls (Dict[str, float], optional): Freshness lifetimes by endpoint path template.
+            clock (Callable[[], float]): Monotonic clock used for expiry.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale = stale
+        self.ttls = ttls or {}
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lifetime(self, path: str, response) -> Tuple[float, float]:
+        """
+        Return how long a response stays fresh and how long it may then be served stale.
+
+        Args:
+            path (str): The path template of the endpoint, e.g. `/items/{id}`.
+            response: The `requests` or `httpx` response.
+
+        Returns:
+            Tuple[float, float]: The freshness lifetime and the stale-while-revalidate window in seconds.
+        """
+        if response.status_code not in CACHEABLE_STATUSES:
+            return 0.0, 0.0
+        if path in self.ttls:
+            return self.ttls[path], (self.stale if self.ttls[path] > 0 else 0.0)
+        directives = cache_control(response.headers)
+        if {"no-store", "no-cache", "private"} & directives.keys():
+            return 0.0, 0.0
+        max_age = _seconds(directives.get("s-maxage"))
+        if max_age is None:
+            max_age = _seconds(directives.get("max-age"))
+        fresh = self.ttl if max_age is None else max_age
+        stale = _seconds(directives.get("stale-while-revalidate"))
+        # The configured window only extends responses that are cacheable at all
+        return fresh, ((self.stale if fresh > 0 else 0.0) if stale is None else stale)
+
+    def _lookup(self, key: Hashable, now: float) -> Tuple[Optional[CachedResponse], bool]:
+        # Returns the usable entry, if any, and whether it is still fresh; called under the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        if now >= entry.stale_until:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return entry, now < entry.fresh_until
+
+    def _store(self, key: Hashable, path: str, response) -> None:
+        fresh, stale = self.lifetime(path, response)
+        if self.maxsize <= 0 or fresh + stale <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._entries[key] = CachedResponse(response, now + fresh, now + fresh + stale)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: Hashable, path: str, fetch: Callable[[], Any]):
+        """
+        Return the response to a request, calling `fetch` only if no identical call can be used.
+
+        Args:
+            key (Hashable): The request key, see `request_key`.
+            path (str): The path template of the endpoint.
+            fetch (Callable[[], Any]): Makes the upstream call and returns its response.
+
+        Returns:
+            The cached, shared or fetched response.
+
+        Raises:
+            Exception: Whatever `fetch` raised, for the caller and every caller waiting on it.
+        """
+        with self._lock:
+            entry, fresh = self._lookup(key, self._clock())
+            flight = self._flights.get(key)
+            if entry is not None:
+                if fresh:
+                    self.hits += 1
+                    return entry.response
+                self.stale_hits += 1
+                if flight is None:
+                    self.revalidations += 1
+                    flight = self._flights[key] = _Flight()
+                    threading.Thread(target=self._revalidate, args=(key, path, fetch, flight), daemon=True).start()
+                return entry.response
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._fly(key, path, fetch, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+
+    def _fly(self, key: Hashable, path: str, fetch: Callable[[], Any], flight: _Flight) -> None:
+        try:
+            flight.response = fetch()
+            self._store(key, path, flight.response)
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _revalidate(self, key: Hashable, path: str, fetch: Callable[[], Any], flight: _Flight) -> None:
+        self._fly(key, path, fetch, flight)
+        if flight.error is not None:
+            print(f"Error revalidating cached response of {key[1]}: {flight.error}")
+
+    async def aget(self, key: Hashable, path: str, fetch: Callable[[], Awaitable[Any]]):
+        """
+        Asynchronous counterpart of `get`; `fetch` is a coroutine function.
+
+        A caller that is cancelled while waiting does not cancel the upstream
+        call other callers are waiting on.
+        """
+        with self._lock:
+            entry, fresh = self._lookup(key, self._clock())
+            task = self._tasks.get(key)
+            if entry is not None:
+                if fresh:
+                    self.hits += 1
+                    return entry.response
+                self.stale_hits += 1
+                if task is None:
+                    self.revalidations += 1
+                    self._tasks[key] = asyncio.ensure_future(self._arevalidate(key, path, fetch))
+                return entry.response
+            if task is None:
+                self.misses += 1
+                task = self._tasks[key] = asyncio.ensure_future(self._afly(key, path, fetch))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _afly(self, key: Hashable, path: str, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            response = await fetch()
+            self._store(key, path, response)
+            return response
+        finally:
+            with self._lock:
+                self._tasks.pop(key, None)
+
+    async def _arevalidate(self, key: Hashable, path: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self._afly(key, path, fetch)
+        except Exception as e:
+            print(f"Error revalidating cached response of {key[1]}: {e}")
+
+    def clear(self) -> None:
+        """Drop all cached responses; calls in flight are not affected."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters needed to size the cache.
+
+        Returns:
+            Dict[str, Any]: Hits, stale hits, misses, coalesced calls, revalidations, evictions and occupancy.
+        """
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": (lookups - self.misses) / lookups if lookups else 0.0,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -1,9 +1,16 @@
-import os
+import hashlib
 import json
+import os
+import pickle
+import time
+import zlib
 import requests
-from typing import List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 from pydantic import BaseModel, ValidationError
-from resolver.servicerouter.client_generator import APIClient
+from resolver.servicerouter.artefacts import Artefact, ArtefactStore
+from resolver.servicerouter.client_generator import APIClient, BaseAPIClient, ClientConfig
+from resolver.servicerouter.health import HealthRegistry
 
 
 class ServiceAPI(BaseModel):
@@ -42,32 +49,112 @@ class ServiceFilterCriteria(BaseModel):
     lastUpdated: Optional[Union[str, List[str]]] = None
 
 
+class ServiceFetchError(BaseModel):
+    """
+    Records a service whose OpenAPI schema could not be fetched during a refresh.
+    """
+    serviceName: str
+    id: int
+    apiDocumentationAdress: str
+    error: str
+    elapsed: float
+
+
+SNAPSHOT_FORMAT = 1
+
+
+class DiscoverySnapshot(NamedTuple):
+    """The registry and the schemas of a discovered network, as written by `ServiceDiscovery.save_snapshot`."""
+    format: int
+    saved_at: float
+    registry_digest: Optional[str]
+    services: List[dict]
+    # Schema digest and content by service id
+    schemas: Dict[int, Tuple[str, bytes]]
+
+
+class RestoredNetwork(NamedTuple):
+    """Services and clients restored from disk without network access."""
+    services: List[ServiceAPI]
+    clients: List[BaseAPIClient]
+    saved_at: float
+
+
 class ServiceDiscovery:
     """
     Handles service discovery, fetching OpenAPI schemas, and generating API clients.
+
+    Args:
+        get_all_registered_services_endpoint (str, optional): URL of the registry listing all services.
+        connect_timeout (float): Seconds to wait for a connection to a registry or service.
+        read_timeout (float): Seconds to wait between bytes of a response.
+        deadline (float): Seconds after which `generate_clients` stops waiting for outstanding schemas.
+        max_workers (int): Number of schemas fetched concurrently.
+        store (ArtefactStore, optional): Where registry and schema documents are cached.
+        client_config (ClientConfig, optional): Pooling, timeout and retry settings of generated clients.
+        health (HealthRegistry, optional): Provider health shared by all generated clients.
+
+    The registry and every schema are fetched conditionally and only rewritten
+    on disk when their content hash changes. Clients are kept per service id
+    with the hash of their schema and reused while it is unchanged, so one
+    instance should be kept across refreshes.
     """
 
-    def __init__(self, get_all_registered_services_endpoint: str = None):
+    def __init__(self, get_all_registered_services_endpoint: str = None, connect_timeout: float = 3.05,
+                 read_timeout: float = 10.0, deadline: float = 30.0, max_workers: int = 16,
+                 store: Optional[ArtefactStore] = None, client_config: Optional[ClientConfig] = None,
+                 health: Optional[HealthRegistry] = None):
         self.registry_server = get_all_registered_services_endpoint
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.errors: List[ServiceFetchError] = []
+        self.store = store if store is not None else ArtefactStore()
+        self.client_config = client_config if client_config is not None else ClientConfig()
+        self.health = health if health is not None else HealthRegistry()
+        self._services: Optional[Tuple[str, List[ServiceAPI]]] = None
+        self._clients: Dict[int, Tuple[str, BaseAPIClient]] = {}
 
     def fetch_services(self) -> List[ServiceAPI]:
         """
         Fetch services from the registry server or a local mock file.
 
+        The registry document is requested conditionally; if it is unchanged,
+        the services parsed from it last time are returned as they are.
+
         Returns:
             List[ServiceAPI]: A list of discovered services.
         """
         try:
-            response = requests.get(self.registry_server)
-            response.raise_for_status()
-            services = self.__parse_services(response.json())
-            if self.__save_discovered_services(services):
-                return services
+            artefact = self.store.fetch(self.registry_server, self.store.path("registry.json"), timeout=self.timeout)
+            return self._adopt_services(artefact)
         except requests.RequestException as e:
             print(f"Error fetching service endpoints from registry: {e}")
             raise e
 
-    def __parse_services(self, response: dict) -> List[ServiceAPI]:
+    def _adopt_services(self, artefact: Artefact) -> List[ServiceAPI]:
+        """
+        Return the services of a registry document, reusing the last ones if it is unchanged.
+
+        Args:
+            artefact (Artefact): The current registry document.
+
+        Returns:
+            List[ServiceAPI]: The registered services.
+        """
+        if self._services is not None and self._services[0] == artefact.digest:
+            return self._services[1]
+        services = self._parse_services(json.loads(artefact.content))
+        if self._save_discovered_services(services):
+            self._services = (artefact.digest, services)
+            # Forget clients of services that are no longer registered
+            registered = {service.id for service in services}
+            for service_id in list(self._clients):
+                if service_id not in registered:
+                    self._clients.pop(service_id)[1].close()
+            return services
+
+    def _parse_services(self, response: dict) -> List[ServiceAPI]:
         """
         Parse the registry response to create a list of ServiceAPI instances.
 
@@ -87,9 +174,9 @@ class ServiceDiscovery:
                 print(f"Error parsing service {service_name}: {e}")
         return services
 
-    def __save_discovered_services(self, services: List[ServiceAPI]) -> bool:
+    def _save_discovered_services(self, services: List[ServiceAPI]) -> bool:
         """
-        Save discovered services' metadata to JSON files.
+        Save discovered services' metadata to JSON files, skipping unchanged ones.
 
         Args:
             services (List[ServiceAPI]): The list of services to save.
@@ -99,18 +186,16 @@ class ServiceDiscovery:
         """
         try:
             for service_instance in services:
-                service_name = service_instance.serviceName.replace(" ", "_")
-                output_dir = os.path.abspath(f'./resolver/data/discovery/services/{service_name}')
-                os.makedirs(output_dir, exist_ok=True)
-
-                file_name = os.path.join(output_dir, "info.json")
-                with open(file_name, "w") as file:
-                    json.dump(service_instance.model_dump(), file)
+                self.store.store(self._service_path(service_instance, "info.json"),
+                                 json.dumps(service_instance.model_dump()).encode())
             return True
         except (OSError, IOError) as e:
             print(f"Error saving discovered services: {e}")
             raise e
 
+    def _service_path(self, service: ServiceAPI, file_name: str) -> str:
+        return self.store.path("services", service.serviceName.replace(" ", "_"), file_name)
+
     def fetch_openapi_schema(self, service: ServiceAPI) -> dict:
         """
         Fetch the OpenAPI schema for a given service.
@@ -121,36 +206,24 @@ class ServiceDiscovery:
         Returns:
             Optional[dict]: The OpenAPI schema, or None if fetching failed.
         """
-        try:
-            response = requests.get(service.apiDocumentationAdress)
-            response.raise_for_status()
-            openapi_schema = response.json()
-            if self.__save_openapi_schema(openapi_schema, service.serviceName):
-                return openapi_schema
-        except requests.RequestException as e:
-            print(f"Error fetching OpenAPI schema from {service.apiDocumentationAdress}: {e}")
-            raise e
+        return json.loads(self.__fetch_openapi_artefact(service).content)
 
-    def __save_openapi_schema(self, openapi_schema: dict, service_name: str) -> bool:
+    def __fetch_openapi_artefact(self, service: ServiceAPI) -> Artefact:
         """
-        Save the OpenAPI schema to a JSON file.
+        Conditionally fetch the OpenAPI schema of a service and store it if it changed.
 
         Args:
-            openapi_schema (dict): The OpenAPI schema to save.
-            service_name (str): The name of the service.
+            service (ServiceAPI): The service for which to fetch the OpenAPI schema.
 
         Returns:
-            bool: True if the schema was saved successfully, False otherwise.
+            Artefact: The raw schema and its content hash.
         """
         try:
-            service_name = service_name.replace(" ", "_")
-            output_dir = os.path.abspath(f'./resolver/data/discovery/services/{service_name}')
-            os.makedirs(output_dir, exist_ok=True)
-
-            schema_file = os.path.join(output_dir, "openapi.json")
-            with open(schema_file, "w") as f:
-                json.dump(openapi_schema, f)
-            return True
+            return self.store.fetch(service.apiDocumentationAdress, self._service_path(service, "openapi.json"),
+                                    timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Error fetching OpenAPI schema from {service.apiDocumentationAdress}: {e}")
+            raise e
         except (OSError, IOError) as e:
             print(f"Error saving OpenAPI schema: {e}")
             raise e
@@ -183,21 +256,233 @@ class ServiceDiscovery:
 
         return filtered_services
 
-    def generate_clients(self, services:List[ServiceAPI]) -> List[APIClient]:
+    def rank_services(self, services: List[ServiceAPI]) -> List[ServiceAPI]:
+        """
+        Order services by the observed health of their providers.
+
+        Args:
+            services (List[ServiceAPI]): Services offering the same data, e.g. from `filter_services`.
+
+        Returns:
+            List[ServiceAPI]: The services, fastest and most reliable first and open circuits last.
+        """
+        return self.health.rank(services, lambda service: service.rootAddress)
+
+    def generate_clients(self, services: List[ServiceAPI]) -> List[APIClient]:
         """
         Generate API clients from the OpenAPI schemas of the given services.
 
+        Schemas are fetched concurrently on a bounded pool, each request limited by
+        the connect and read timeouts. Services that fail, or are still outstanding
+        when the deadline passes, are left out of the result and recorded in
+        `self.errors`, so one unreachable service does not abort the refresh.
+
         Args:
             services (List[ServiceAPI]): The list of services to generate clients for.
 
         Returns:
-            List[APIClient]: A list of generated API clients.
+            List[APIClient]: The generated API clients, in the order of `services`.
+        """
+        self.errors = []
+        if not services:
+            return []
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(services)),
+                                      thread_name_prefix="service-discovery")
+        futures = [executor.submit(self.__generate_client, service) for service in services]
+        try:
+            wait(futures, timeout=self.deadline)
+            # Only fetches finished by now count; workers never touch `self._clients`
+            # themselves, so those that finish later are discarded
+            outcomes = [future.result() if future.done() else None for future in futures]
+        finally:
+            # Outstanding fetches are bounded by the request timeouts; don't wait for them
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        return self._collect_clients(services, outcomes)
+
+    def _collect_clients(self, services: List[ServiceAPI], outcomes: List[Optional[Tuple]]) -> List[BaseAPIClient]:
+        """
+        Gather the clients of a refresh and record the errors of failed services.
+
+        Args:
+            services (List[ServiceAPI]): The services of the refresh.
+            outcomes (List[Optional[Tuple]]): `((digest, client), error, elapsed)` per
+                service, or None for services still outstanding at the deadline.
+
+        Returns:
+            List[BaseAPIClient]: The clients of the services that succeeded, in order.
         """
         clients = []
-        for service in services: 
+        for service, outcome in zip(services, outcomes):
+            if outcome is None:
+                self._record_error(service, f"Deadline of {self.deadline}s exceeded", self.deadline)
+                continue
+            entry, error, elapsed = outcome
+            if error is None:
+                clients.append(self._keep_client(service, entry))
+            else:
+                self._record_error(service, error, elapsed)
+        return clients
+
+    def _client_for(self, service: ServiceAPI, artefact: Artefact, client_class=APIClient,
+                    **options) -> Tuple[str, BaseAPIClient]:
+        """
+        Return the client of a service, reusing the existing one while its schema is unchanged.
+
+        Safe to call from worker threads: a new client is only kept once it is
+        passed to `_keep_client`.
+
+        Args:
+            service (ServiceAPI): The service.
+            artefact (Artefact): Its current OpenAPI schema.
+            client_class (type): The client class to build a new client with.
+            **options: Additional arguments for the client class.
+
+        Returns:
+            Tuple[str, BaseAPIClient]: The schema digest and the client of the service.
+        """
+        cached = self._clients.get(service.id)
+        if cached is not None and cached[0] == artefact.digest and cached[1].root_address == service.rootAddress:
+            return cached
+        client = client_class(json.loads(artefact.content), client_id=service.id,
+                              root_address=service.rootAddress, config=self.client_config, health=self.health,
+                              **options)
+        return artefact.digest, client
+
+    def _keep_client(self, service: ServiceAPI, entry: Tuple[str, BaseAPIClient]) -> BaseAPIClient:
+        """
+        Keep the client of a service for later refreshes, closing the one it replaces.
+
+        Args:
+            service (ServiceAPI): The service.
+            entry (Tuple[str, BaseAPIClient]): The schema digest and client returned by `_client_for`.
+
+        Returns:
+            BaseAPIClient: The client of the service.
+        """
+        cached = self._clients.get(service.id)
+        self._clients[service.id] = entry
+        if cached is not None and cached[1] is not entry[1]:
+            cached[1].close()
+        return entry[1]
+
+    def save_snapshot(self, path: str, services: List[ServiceAPI]) -> None:
+        """
+        Write the services and the schemas of their current clients to one compressed file.
+
+        The schemas are read back from the artefact store; a service whose stored
+        schema no longer matches its client is left out. The file is replaced
+        atomically, so concurrent readers never see a partial write.
+
+        Args:
+            path (str): The file to write.
+            services (List[ServiceAPI]): The services to include, typically those of the published catalogue.
+        """
+        schemas = {}
+        for service in services:
+            cached = self._clients.get(service.id)
+            if cached is None:
+                continue
             try:
-                clients.append(APIClient(self.fetch_openapi_schema(service)))
+                with open(self._service_path(service, "openapi.json"), "rb") as file:
+                    content = file.read()
+            except OSError:
+                continue
+            if hashlib.sha256(content).hexdigest() == cached[0]:
+                schemas[service.id] = (cached[0], content)
+        registry_digest = self._services[0] if self._services is not None and self._services[1] is services else None
+        snapshot = DiscoverySnapshot(SNAPSHOT_FORMAT, time.time(), registry_digest,
+                                     [service.model_dump() for service in services], schemas)
+        ArtefactStore._write(path, zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def load_snapshot(self, path: str) -> Optional[RestoredNetwork]:
+        """
+        Restore services and clients from a file written by `save_snapshot`.
+
+        The restored clients are kept with their schema digests, so a later
+        refresh reuses them for unchanged schemas. The file is trusted like the
+        code itself, it must only be writable by the service.
+
+        Args:
+            path (str): The file to read.
+
+        Returns:
+            Optional[RestoredNetwork]: The restored network, or None for a missing, unreadable or outdated file.
+        """
+        try:
+            with open(path, "rb") as file:
+                snapshot = pickle.loads(zlib.decompress(file.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError):
+            return None
+        if not isinstance(snapshot, DiscoverySnapshot) or snapshot.format != SNAPSHOT_FORMAT:
+            return None
+        services = [ServiceAPI(**service) for service in snapshot.services]
+        schemas = {service_id: Artefact(content, digest, False)
+                   for service_id, (digest, content) in snapshot.schemas.items()}
+        return self._restore(snapshot.registry_digest, services, schemas, snapshot.saved_at)
+
+    def load_stored(self) -> Optional[RestoredNetwork]:
+        """
+        Restore services and clients from the registry and schema files in the artefact store.
+
+        Slower than `load_snapshot`, as every schema is a separate file, but
+        available whenever a previous process completed a discovery.
+
+        Returns:
+            Optional[RestoredNetwork]: The restored network, or None if no registry document is stored.
+        """
+        registry_path = self.store.path("registry.json")
+        try:
+            with open(registry_path, "rb") as file:
+                content = file.read()
+            services = self._parse_services(json.loads(content))
+        except (OSError, ValueError, AttributeError):
+            return None
+        schemas = {}
+        for service in services:
+            try:
+                with open(self._service_path(service, "openapi.json"), "rb") as file:
+                    schema = file.read()
+            except OSError:
+                continue
+            schemas[service.id] = Artefact(schema, hashlib.sha256(schema).hexdigest(), False)
+        return self._restore(hashlib.sha256(content).hexdigest(), services, schemas,
+                             os.path.getmtime(registry_path))
+
+    def _restore(self, registry_digest: Optional[str], services: List[ServiceAPI],
+                 schemas: Dict[int, Artefact], saved_at: float) -> RestoredNetwork:
+        self.errors = []
+        if registry_digest is not None:
+            self._services = (registry_digest, services)
+        clients = []
+        for service in services:
+            artefact = schemas.get(service.id)
+            if artefact is None:
+                continue
+            try:
+                clients.append(self._keep_client(service, self._client_for(service, artefact)))
             except Exception as e:
-                print(f"Error generating API client: {e}")
-                raise e
-        return clients
+                self._record_error(service, str(e), 0.0)
+        return RestoredNetwork(services, clients, saved_at)
+
+    def __generate_client(self, service: ServiceAPI
+                          ) -> Tuple[Optional[Tuple[str, BaseAPIClient]], Optional[str], float]:
+        start = time.monotonic()
+        try:
+            entry = self._client_for(service, self.__fetch_openapi_artefact(service))
+            return entry, None, time.monotonic() - start
+        except Exception as e:
+            return None, str(e), time.monotonic() - start
+
+    def _record_error(self, service: ServiceAPI, error: str, elapsed: float) -> None:
+        print(f"Error generating API client for {service.serviceName}: {error}")
+        self.errors.append(ServiceFetchError(
+            serviceName=service.serviceName,
+            id=service.id,
+            apiDocumentationAdress=service.apiDocumentationAdress,
+            error=error,
+            elapsed=round(elapsed, 3),
+        ))
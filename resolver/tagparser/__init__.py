@@ -1,2 +1,8 @@
-from .dbm import DatabaseManagement, Tagstyle, RegexPattern
-from .tagparser import Parser, InvalidTagError, AmbiguousTagError
+from .dbm import DatabaseManagement, Tagstyle, TagstyleStorage, RegexPattern, TagstyleDefinition, tagstyles_from_catalogue
+from .dbm import REGEX_KIND, DIGITAL_LINK_KIND
+from .storage import InMemoryTagstyleStorage, create_storage
+from .tagparser import Parser, ParsedTag, InvalidTagError, AmbiguousTagError
+from .snapshot import TagstyleSnapshot, CompiledTagstyle
+from .cache import ParseCache
+from .safety import UnsafePatternError, analyze_pattern, check_pattern, MAX_TAG_LENGTH
+from .gs1 import DigitalLink, parse_digital_link, is_valid_gtin, gtin_check_digit
@@ -0,0 +1,48 @@
+"""
+Parse archives of tags offline across all cores.
+
+Usage:
+    python -m resolver.tagparser [FILE ...] [--format ndjson|csv] [--output PATH]
+        [--workers N] [--chunk-size 2000] [--window N] [--backend sqlite|memory] [--path PATH]
+
+Reads one tag per line from the files, or from stdin if none are given,
+and writes one result per tag in input order. A summary of throughput and
+error counts is printed to stderr.
+"""
+import argparse
+import sys
+import time
+
+from resolver.tagparser.bulk import FORMATS, bulk_parse, format_summary, open_sources, read_tags
+from resolver.tagparser.storage import create_storage
+
+
+def main(argv=None) -> int:
+    argparser = argparse.ArgumentParser(prog="python -m resolver.tagparser", description=__doc__.splitlines()[1])
+    argparser.add_argument("files", nargs="*", help="Files with one tag per line, - for stdin")
+    argparser.add_argument("--format", choices=FORMATS, default="ndjson")
+    argparser.add_argument("--output", help="Output file, defaults to stdout")
+    argparser.add_argument("--workers", type=int, help="Worker processes, defaults to the number of cores")
+    argparser.add_argument("--chunk-size", type=int, default=2000, help="Tags per chunk sent to a worker")
+    argparser.add_argument("--window", type=int, help="Chunks in flight, defaults to twice the workers")
+    argparser.add_argument("--backend", choices=("sqlite", "memory"), help="Tagstyle store, see create_storage")
+    argparser.add_argument("--path", help="Database file, or tagstyles.json catalogue for the memory backend")
+    args = argparser.parse_args(argv)
+
+    storage = create_storage(args.backend, args.path)
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        summary = bulk_parse(
+            read_tags(open_sources(args.files)), storage, output, output_format=args.format,
+            workers=args.workers, chunk_size=args.chunk_size, window=args.window,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(format_summary(summary, time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
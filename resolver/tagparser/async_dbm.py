@@ -0,0 +1,80 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from resolver.tagparser.dbm import Tagstyle, TagstyleStorage
+from resolver.tagparser.storage import create_storage
+
+
+class AsyncDatabaseManagement:
+    """
+    Asynchronous access to a tagstyle store.
+
+    Blocking SQLite calls run on bounded thread pools so they never stall the
+    event loop. Reads share a pool sized for concurrent WAL readers, while
+    writes go through a single thread since SQLite serializes writers anyway;
+    a larger write pool would only queue threads on the database lock.
+    Every pool thread keeps its own persistent connection.
+    """
+
+    def __init__(self, manager: Optional[TagstyleStorage] = None,
+                 max_readers: int = 4, max_writers: int = 1):
+        """
+        Initialize the executors.
+
+        Args:
+            manager (TagstyleStorage, optional): The store to run calls on.
+                Defaults to the store configured through `create_storage`.
+            max_readers (int): Number of threads serving read calls.
+            max_writers (int): Number of threads serving write calls.
+        """
+        self.manager = manager if manager is not None else create_storage()
+        self.max_readers = max_readers
+        self.max_writers = max_writers
+        self._readers = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="tagstyles-read")
+        self._writers = ThreadPoolExecutor(max_workers=max_writers, thread_name_prefix="tagstyles-write")
+
+    async def _run(self, executor: ThreadPoolExecutor, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(method, *args))
+
+    async def health_check(self) -> bool:
+        """Check the health of the database connection."""
+        return await self._run(self._readers, self.manager.health_check)
+
+    async def add_tag(self, new_tag: Tagstyle) -> bool:
+        """Add a new tag to the database."""
+        return await self._run(self._writers, self.manager.add_tag, new_tag)
+
+    async def add_tags(self, new_tags: List[Tagstyle]) -> bool:
+        """Add several tags to the database within a single transaction."""
+        return await self._run(self._writers, self.manager.add_tags, new_tags)
+
+    async def delete_tag_by_id(self, tagid: int) -> bool:
+        """Delete a tag from the database by its ID."""
+        return await self._run(self._writers, self.manager.delete_tag_by_id, tagid)
+
+    async def delete_all_tags(self) -> bool:
+        """Delete all tags from the database."""
+        return await self._run(self._writers, self.manager.delete_all_tags)
+
+    async def update_tag_by_name(self, tagid: int, updated_tag: Tagstyle) -> bool:
+        """Update a tagstyle entry in the database."""
+        return await self._run(self._writers, self.manager.update_tag_by_name, tagid, updated_tag)
+
+    async def retrieve_all_tags_completly(self) -> List[Tagstyle]:
+        """Retrieve all tags including all their contents."""
+        return await self._run(self._readers, self.manager.retrieve_all_tags_completly)
+
+    async def retrieve_all_tags_with_ids(self) -> List[Tuple[int, Tagstyle]]:
+        """Retrieve all tags including all their contents, paired with their IDs."""
+        return await self._run(self._readers, self.manager.retrieve_all_tags_with_ids)
+
+    async def retrieve_tag_by_id(self, tagid: int) -> Optional[Tagstyle]:
+        """Retrieve a single tag by its ID."""
+        return await self._run(self._readers, self.manager.retrieve_tag_by_id, tagid)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the executors once pending calls have finished."""
+        self._readers.shutdown(wait=wait)
+        self._writers.shutdown(wait=wait)
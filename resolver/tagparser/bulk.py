@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from resolver.tagparser.dbm import Tagstyle, TagstyleStorage
+from resolver.tagparser.snapshot import TagstyleSnapshot
+from resolver.tagparser.storage import InMemoryTagstyleStorage
+from resolver.tagparser.tagparser import AmbiguousTagError, InvalidTagError, Parser
+
+FORMATS = ("csv", "ndjson")
+CSV_HEADER = ("index", "tag", "tagstyle", "contents", "error")
+
+# Parser and snapshot of a pool worker, set once by `_init_worker`.
+_worker: Optional[Tuple[Parser, TagstyleSnapshot]] = None
+
+
+class ChunkResult(NamedTuple):
+    """Serialized results of one chunk of tags together with its outcome counts."""
+    text: str
+    parsed: int
+    invalid: int
+    ambiguous: int
+    failed: int
+
+
+class BulkSummary(NamedTuple):
+    """Outcome counts of a bulk parsing run."""
+    tags: int
+    parsed: int
+    invalid: int
+    ambiguous: int
+    failed: int
+
+
+def read_tags(sources: Iterable[IO[str]]) -> Iterator[str]:
+    """
+    Stream tags from text sources, one tag per line.
+
+    Args:
+        sources (Iterable[IO[str]]): Open text files or stdin.
+
+    Yields:
+        str: Each non-empty line without its line ending.
+    """
+    for source in sources:
+        for line in source:
+            tag = line.rstrip("\r\n")
+            if tag:
+                yield tag
+
+
+def chunked(tags: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Group tags into lists of at most `size` tags."""
+    iterator = iter(tags)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _new_parser() -> Parser:
+    # Tags are parsed against an explicit snapshot, so the store is never consulted
+    return Parser(InMemoryTagstyleStorage(), cache_size=0)
+
+
+def _init_worker(entries: List[Tuple[int, Tagstyle]], generation) -> None:
+    """Compile the tagstyle snapshot once per worker process."""
+    global _worker
+    _worker = (_new_parser(), TagstyleSnapshot(entries, generation))
+
+
+def _parse_chunk_in_worker(tags: List[str], start: int, output_format: str) -> ChunkResult:
+    parser, snapshot = _worker
+    return parse_chunk(parser, snapshot, tags, start, output_format)
+
+
+def parse_chunk(parser: Parser, snapshot: TagstyleSnapshot, tags: List[str], start: int,
+                output_format: str) -> ChunkResult:
+    """
+    Parse a chunk of tags and serialize the results in input order.
+
+    Args:
+        parser (Parser): The parser to use.
+        snapshot (TagstyleSnapshot): The snapshot to parse against.
+        tags (List[str]): The tags of the chunk.
+        start (int): Index of the first tag within the whole input.
+        output_format (str): `csv` or `ndjson`.
+
+    Returns:
+        ChunkResult: The serialized rows and the outcome counts of the chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if output_format == "csv" else None
+    counts = {"parsed": 0, "invalid": 0, "ambiguous": 0, "failed": 0}
+    for offset, tag in enumerate(tags):
+        record: Dict = {"index": start + offset, "tag": tag}
+        try:
+            parsed = parser.parse_tag_fields(tag, snapshot=snapshot)
+            record["tagstyle"] = parsed.tagstyle
+            record["contents"] = parsed.contents
+            counts["parsed"] += 1
+        except Exception as e:
+            # Like Parser.parse_tags, a tag that fails unexpectedly, e.g. on a content
+            # pattern without a group, is reported without ending the run
+            record["error"] = {"type": type(e).__name__, "detail": str(e)}
+            if isinstance(e, AmbiguousTagError):
+                counts["ambiguous"] += 1
+            elif isinstance(e, InvalidTagError):
+                counts["invalid"] += 1
+            else:
+                counts["failed"] += 1
+
+        if writer is None:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+        else:
+            writer.writerow((
+                record["index"], tag, record.get("tagstyle", ""),
+                json.dumps(record["contents"], ensure_ascii=False) if "contents" in record else "",
+                record["error"]["type"] if "error" in record else "",
+            ))
+    return ChunkResult(buffer.getvalue(), **counts)
+
+
+def bulk_parse(tags: Iterable[str], storage: TagstyleStorage, output: IO[str], output_format: str = "ndjson",
+               workers: Optional[int] = None, chunk_size: int = 2000, window: Optional[int] = None) -> BulkSummary:
+    """
+    Parse a stream of tags across a process pool and write the results in input order.
+
+    The tagstyles are read from the store once and shipped to every worker,
+    which compiles its own snapshot. At most `window` chunks are in flight,
+    so reading the input pauses while the output falls behind and memory
+    stays bounded by `window * chunk_size` tags.
+
+    Args:
+        tags (Iterable[str]): The tags to parse.
+        storage (TagstyleStorage): The store to load the tagstyles from.
+        output (IO[str]): Where to write the results.
+        output_format (str): `csv` or `ndjson`.
+        workers (int, optional): Number of worker processes, defaults to the number of cores.
+            With a single worker, tags are parsed in the calling process.
+        chunk_size (int): Number of tags per chunk sent to a worker.
+        window (int, optional): Maximum number of chunks in flight, defaults to twice the workers.
+
+    Returns:
+        BulkSummary: The number of tags and of each outcome.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    entries = storage.retrieve_all_tags_with_ids()
+    generation = storage.generation
+
+    if output_format == "csv":
+        output.write(",".join(CSV_HEADER) + "\n")
+
+    totals = [0, 0, 0, 0, 0]
+
+    def emit(result: ChunkResult, size: int) -> None:
+        output.write(result.text)
+        totals[0] += size
+        totals[1] += result.parsed
+        totals[2] += result.invalid
+        totals[3] += result.ambiguous
+        totals[4] += result.failed
+
+    start = 0
+    if workers == 1:
+        parser, snapshot = _new_parser(), TagstyleSnapshot(entries, generation)
+        for chunk in chunked(tags, chunk_size):
+            emit(parse_chunk(parser, snapshot, chunk, start, output_format), len(chunk))
+            start += len(chunk)
+        return BulkSummary(*totals)
+
+    pending: "deque[Tuple[Future, int]]" = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(entries, generation)) as pool:
+        for chunk in chunked(tags, chunk_size):
+            if len(pending) >= window:
+                future, size = pending.popleft()
+                emit(future.result(), size)
+            pending.append((pool.submit(_parse_chunk_in_worker, chunk, start, output_format), len(chunk)))
+            start += len(chunk)
+        while pending:
+            future, size = pending.popleft()
+            emit(future.result(), size)
+    return BulkSummary(*totals)
+
+
+def format_summary(summary: BulkSummary, seconds: float) -> str:
+    """Render a run summary for stderr."""
+    rate = summary.tags / seconds if seconds > 0 else 0.0
+    return (f"{summary.tags} tags in {seconds:.2f}s ({rate:.0f} tags/s): "
+            f"{summary.parsed} parsed, {summary.invalid} invalid, {summary.ambiguous} ambiguous, "
+            f"{summary.failed} failed")
+
+
+def open_sources(paths: List[str]) -> Iterator[IO[str]]:
+    """Open the given files in turn, `-` or no paths meaning stdin."""
+    if not paths:
+        paths = ["-"]
+    for path in paths:
+        if path == "-":
+            yield sys.stdin
+        else:
+            with open(path, "r", encoding="utf-8", newline="") as source:
+                yield source
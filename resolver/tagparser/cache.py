@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ParseCache:
+    """
+    Bounded LRU cache of parse results with an optional time-to-live.
+
+    Entries belong to the store generation they were computed at. As soon as
+    a lookup or insert names a different generation, the whole cache is
+    flushed, so results never outlive a change of the tagstyle store.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of cached tags.
+            ttl (float, optional): Seconds an entry stays valid, or None for no expiry.
+            clock (Callable[[], float]): Monotonic clock used for expiry.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _switch_generation(self, generation: Hashable) -> None:
+        if generation != self.generation:
+            if self._entries:
+                self.flushes += 1
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, tag: str, generation: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up the cached result of a tag.
+
+        Args:
+            tag (str): The raw tag.
+            generation (Hashable): The current store generation.
+
+        Returns:
+            Tuple[bool, Any]: Whether the tag was cached and the cached value.
+        """
+        with self._lock:
+            self._switch_generation(generation)
+            entry = self._entries.get(tag)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(tag)
+                    self.hits += 1
+                    return True, value
+                del self._entries[tag]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, tag: str, value: Any, generation: Hashable) -> None:
+        """
+        Store the result of a tag, evicting the least recently used entries.
+
+        Args:
+            tag (str): The raw tag.
+            value (Any): The result to cache.
+            generation (Hashable): The store generation the result was computed at.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._switch_generation(generation)
+            expires_at = None if self.ttl is None else self._clock() + self.ttl
+            self._entries[tag] = (expires_at, value)
+            self._entries.move_to_end(tag)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            if self._entries:
+                self.flushes += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters needed to size the cache.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, evictions, expirations, flushes and occupancy.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "flushes": self.flushes,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
@@ -1,9 +1,21 @@
 import os
 import sqlite3
-from typing import List, Optional
+import threading
+import time
+from abc import ABC, abstractmethod
+from itertools import groupby
+from typing import Dict, Hashable, List, Literal, Optional, Tuple
 
 from pydantic import BaseModel
 
+from resolver.tagparser.safety import check_pattern
+
+
+# Kinds of tagstyles; tags of GS1 Digital Link tagstyles can additionally be split into identifier pairs.
+REGEX_KIND = "regex"
+DIGITAL_LINK_KIND = "gs1 digital link"
+TagstyleKind = Literal["regex", "gs1 digital link"]
+
 
 class RegexPattern(BaseModel):
     """Model representing a regular expression pattern."""
@@ -12,18 +24,241 @@ class RegexPattern(BaseModel):
 
 
 class Tagstyle(BaseModel):
-    """Model representing a tag style with an entire pattern and contents."""
+    """Model representing a tag style with an entire pattern, contents and its kind."""
     entire_pattern: RegexPattern
     contents: List[RegexPattern]
+    kind: TagstyleKind = REGEX_KIND
+
+
+class TagstyleDefinition(BaseModel):
+    """Model representing a tag style in the `tagstyles.json` catalogue format."""
+    ENTIRE_PATTERN: str
+    contents: Dict[str, str]
+    kind: TagstyleKind = REGEX_KIND
+
+
+def tagstyles_from_catalogue(catalogue: Dict[str, TagstyleDefinition]) -> List[Tagstyle]:
+    """
+    Convert a catalogue in the `tagstyles.json` format to Tagstyle objects.
+
+    Args:
+        catalogue (Dict[str, TagstyleDefinition]): Tag style definitions keyed by name.
+
+    Returns:
+        List[Tagstyle]: The tag styles in catalogue order.
+    """
+    tagstyles = []
+    for name, definition in catalogue.items():
+        if not isinstance(definition, TagstyleDefinition):
+            definition = TagstyleDefinition(**definition)
+        tagstyles.append(Tagstyle(
+            entire_pattern=RegexPattern(name=name, pattern=definition.ENTIRE_PATTERN),
+            contents=[
+                RegexPattern(name=content_name, pattern=content_pattern)
+                for content_name, content_pattern in definition.contents.items()
+            ],
+            kind=definition.kind,
+        ))
+    return tagstyles
+
+
+DEFAULT_DB_PATH = './resolver/tagparser/tagstyles.db'
+
+
+class TagstyleStorage(ABC):
+    """Interface of the stores tagstyles are kept in."""
+
+    @property
+    @abstractmethod
+    def generation(self):
+        """Return a value that changes whenever the stored tagstyles change."""
+
+    @property
+    @abstractmethod
+    def identity(self) -> Hashable:
+        """Return a value naming the backend and the place the tagstyles are kept in."""
+
+    @abstractmethod
+    def health_check(self) -> bool:
+        """Check the health of the store."""
+
+    @abstractmethod
+    def initialize_db(self) -> bool:
+        """Initialize the store if it doesn't exist."""
+
+    def add_tag(self, new_tag: Tagstyle) -> bool:
+        """Add a new tag to the store."""
+        return self.add_tags([new_tag])
+
+    @staticmethod
+    def check_tags(tags: List[Tagstyle]) -> None:
+        """
+        Reject tags whose patterns are invalid or too costly to match.
+
+        Args:
+            tags (List[Tagstyle]): The tags about to be stored.
+
+        Raises:
+            UnsafePatternError: If any entire pattern or content pattern is rejected.
+        """
+        for tag in tags:
+            check_pattern(tag.entire_pattern.pattern)
+            for content in tag.contents:
+                check_pattern(content.pattern, search=True)
+
+    @abstractmethod
+    def add_tags(self, new_tags: List[Tagstyle]) -> bool:
+        """Add several tags to the store at once."""
+
+    @abstractmethod
+    def delete_tag_by_id(self, tagid: int) -> bool:
+        """Delete a tag from the store by its ID."""
+
+    @abstractmethod
+    def delete_all_tags(self) -> bool:
+        """Delete all tags from the store."""
+
+    def retrieve_all_tags_completly(self) -> List[Tagstyle]:
+        """Retrieve all tags including all their contents."""
+        return [tagstyle for _, tagstyle in self.retrieve_all_tags_with_ids()]
+
+    @abstractmethod
+    def retrieve_all_tags_with_ids(self) -> List[Tuple[int, Tagstyle]]:
+        """Retrieve all tags including all their contents, paired with their IDs."""
+
+    @abstractmethod
+    def retrieve_all_tagstyles(self) -> List:
+        """Retrieve all tags excluding the contents as (id, name, entire_pattern) rows."""
+
+    @abstractmethod
+    def retrieve_tag_by_id(self, tagid: int) -> Optional[Tagstyle]:
+        """Retrieve a single tag by its ID."""
+
+    @abstractmethod
+    def update_tag_by_name(self, tagid: int, updated_tag: Tagstyle) -> bool:
+        """Update a tagstyle entry in the store."""
 
 
-class DatabaseManagement:
+class DatabaseManagement(TagstyleStorage):
     """Class for managing a SQLite database."""
-    def __init__(self):
-        """Initialize the DatabaseManagement class."""
-        self.db_name = 'tagstyles.db'
-        self.db_path = './resolver/tagparser'
-        self.full_path = os.path.join(self.db_path, self.db_name)
+    # Connections are kept open per thread and database file and reused by
+    # every DatabaseManagement instance pointing at the same file.
+    _local = threading.local()
+
+    # Connection tuning: WAL lets readers proceed while a writer is active,
+    # NORMAL synchronous is durable in WAL mode except on power loss.
+    busy_timeout = 5.0
+    cached_statements = 128
+    pragmas = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    contents_index = "CREATE INDEX IF NOT EXISTS idx_contents_tagstyle_id ON contents (tagstyle_id)"
+
+    # Seconds the generation read from the database is trusted before it is read
+    # again. Writes through this instance are seen at once; writes by other
+    # instances, threads or processes within this delay.
+    generation_ttl = 0.5
+
+    def __init__(self, full_path: Optional[str] = None):
+        """
+        Initialize the DatabaseManagement class.
+
+        Args:
+            full_path (str, optional): Path of the database file. Defaults to the
+                `RESOLVER_TAGSTYLE_DB` environment variable or the bundled database.
+        """
+        self.full_path = full_path or os.environ.get('RESOLVER_TAGSTYLE_DB', DEFAULT_DB_PATH)
+        self.db_path, self.db_name = os.path.split(self.full_path)
+        self._generation: Optional[Tuple[float, int]] = None
+
+    @property
+    def identity(self) -> Tuple[str, str]:
+        """Return the backend and the absolute path of the database file."""
+        return "sqlite", os.path.abspath(self.full_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return the persistent connection of the current thread.
+
+        Connections inherited from a parent process are never reused, since
+        SQLite connections must not be shared across a fork.
+
+        Returns:
+            sqlite3.Connection: The open connection to the database file.
+        """
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        key = os.path.abspath(self.full_path)
+        entry = connections.get(key)
+        if entry is not None and entry[0] == os.getpid():
+            return entry[1]
+
+        conn = sqlite3.connect(self.full_path, timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements)
+        try:
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            with conn:
+                self._migrate(conn.cursor())
+        except sqlite3.Error:
+            conn.close()
+            raise
+
+        connections[key] = (os.getpid(), conn)
+        return conn
+
+    @staticmethod
+    def _migrate(cur: sqlite3.Cursor) -> None:
+        """Bring a tagstyles table created by an earlier version up to the current columns."""
+        columns = [row[1] for row in cur.execute("PRAGMA table_info(tagstyles)")]
+        if columns and "kind" not in columns:
+            # Databases created before tagstyles had a kind hold regex tagstyles only
+            cur.execute("ALTER TABLE tagstyles ADD COLUMN kind TEXT NOT NULL DEFAULT 'regex'")
+
+    def close(self) -> None:
+        """Close the connection of the current thread, if one is open."""
+        connections = getattr(self._local, "connections", {})
+        entry = connections.pop(os.path.abspath(self.full_path), None)
+        if entry is not None and entry[0] == os.getpid():
+            entry[1].close()
+
+    @property
+    def generation(self) -> int:
+        """
+        Return a counter that increases whenever the stored tagstyles change.
+
+        The counter is stored in the database itself, so writes made by other
+        threads or worker processes are visible as well, after at most
+        `generation_ttl` seconds. A database not set up by `initialize_db` has
+        generation 0.
+        """
+        cached = self._generation
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.generation_ttl:
+            return cached[1]
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM tagstyles_meta WHERE key = 'generation'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            if self._connection().execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tagstyles_meta'").fetchone():
+                raise
+            row = None
+        generation = row[0] if row else 0
+        self._generation = (now, generation)
+        return generation
+
+    def _bump_generation(self, cur: sqlite3.Cursor) -> None:
+        """Mark the stored tagstyles as changed within the current transaction."""
+        cur.execute("UPDATE tagstyles_meta SET value = value + 1 WHERE key = 'generation'")
 
     def health_check(self) -> bool:
         """Check the health of the database connection."""
@@ -32,8 +267,7 @@ class DatabaseManagement:
                 print(f"Database file '{self.full_path}' does not exist.")
                 return False
 
-            conn = sqlite3.connect(self.full_path)
-            conn.close()
+            self._connection().execute("SELECT 1")
             print("Database connection successful.")
             return True
 
@@ -44,196 +278,210 @@ class DatabaseManagement:
     def initialize_db(self) -> bool:
         """Initialize the database schema if it doesn't exist."""
         try:
-            conn = sqlite3.connect(self.full_path)
-            cur = conn.cursor()
+            conn = self._connection()
+            with conn:
+                cur = conn.cursor()
 
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS tagstyles (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    entire_pattern TEXT NOT NULL
-                )
-            ''')
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS tagstyles (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        entire_pattern TEXT NOT NULL,
+                        kind TEXT NOT NULL DEFAULT 'regex'
+                    )
+                ''')
+                self._migrate(cur)
 
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS contents (
-                    id INTEGER PRIMARY KEY,
-                    tagstyle_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    pattern TEXT NOT NULL,
-                    FOREIGN KEY (tagstyle_id) REFERENCES tagstyles(id)
-                )
-            ''')
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS contents (
+                        id INTEGER PRIMARY KEY,
+                        tagstyle_id INTEGER NOT NULL,
+                        name TEXT NOT NULL,
+                        pattern TEXT NOT NULL,
+                        FOREIGN KEY (tagstyle_id) REFERENCES tagstyles(id)
+                    )
+                ''')
 
-            conn.commit()
+                cur.execute(self.contents_index)
+
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS tagstyles_meta (
+                        key TEXT PRIMARY KEY,
+                        value INTEGER NOT NULL
+                    )
+                ''')
+                cur.execute("INSERT OR IGNORE INTO tagstyles_meta (key, value) VALUES ('generation', 0)")
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return True
 
-    def add_tag(self, new_tag: Tagstyle) -> bool:
-        """Add a new tag to the database."""
+    def add_tags(self, new_tags: List[Tagstyle]) -> bool:
+        """Add several tags to the database within a single transaction."""
+        self.check_tags(new_tags)
         try:
-            conn = sqlite3.connect(self.full_path)
-            cur = conn.cursor()
-
-            cur.execute('''
-                INSERT INTO tagstyles (name, entire_pattern)
-                VALUES (?, ?)
-            ''', (new_tag.entire_pattern.name, new_tag.entire_pattern.pattern))
-
-            tagstyle_id = cur.lastrowid
-
-            for content in new_tag.contents:
-                cur.execute('''
+            conn = self._connection()
+            with conn:
+                cur = conn.cursor()
+
+                contents_rows = []
+                for new_tag in new_tags:
+                    cur.execute('''
+                        INSERT INTO tagstyles (name, entire_pattern, kind)
+                        VALUES (?, ?, ?)
+                    ''', (new_tag.entire_pattern.name, new_tag.entire_pattern.pattern, new_tag.kind))
+
+                    tagstyle_id = cur.lastrowid
+                    contents_rows.extend(
+                        (tagstyle_id, content.name, content.pattern) for content in new_tag.contents
+                    )
+
+                cur.executemany('''
                     INSERT INTO contents (tagstyle_id, name, pattern)
                     VALUES (?, ?, ?)
-                ''', (tagstyle_id, content.name, content.pattern))
+                ''', contents_rows)
 
-            conn.commit()
+                self._bump_generation(cur)
+            self._generation = None
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return True
 
     def delete_tag_by_id(self, tagid: int) -> bool:
         """Delete a tag from the database by its ID."""
         try:
-            conn = sqlite3.connect(self.full_path)
-            cur = conn.cursor()
+            conn = self._connection()
+            with conn:
+                cur = conn.cursor()
 
-            cur.execute('DELETE FROM contents WHERE tagstyle_id = ?', (tagid,))
-            cur.execute('DELETE FROM tagstyles WHERE id = ?', (tagid,))
+                cur.execute('DELETE FROM contents WHERE tagstyle_id = ?', (tagid,))
+                cur.execute('DELETE FROM tagstyles WHERE id = ?', (tagid,))
 
-            conn.commit()
+                self._bump_generation(cur)
+            self._generation = None
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return True
 
     def delete_all_tags(self) -> bool:
         """Delete all tags from the database."""
         try:
-            conn = sqlite3.connect(self.full_path)
-            cur = conn.cursor()
+            conn = self._connection()
+            with conn:
+                cur = conn.cursor()
 
-            cur.execute('DELETE FROM contents')
-            cur.execute('DELETE FROM tagstyles')
+                cur.execute('DELETE FROM contents')
+                cur.execute('DELETE FROM tagstyles')
 
-            conn.commit()
+                self._bump_generation(cur)
+            self._generation = None
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return True
 
-    def retrieve_all_tags_completly(self) -> List[Tagstyle]:
-        """Retrieve all tags including all their contents."""
-        tagstyles_rows = self.retrieve_all_tagstyles()
-        all_tagstyles = []
+    def retrieve_all_tags_with_ids(self) -> List[Tuple[int, Tagstyle]]:
+        """Retrieve all tags including all their contents, paired with their IDs, in one query."""
+        try:
+            cur = self._connection().cursor()
 
-        for tagstyle_row in tagstyles_rows:
-            tagstyle_id, name, pattern = tagstyle_row
+            cur.execute('''
+                SELECT t.id, t.name, t.entire_pattern, t.kind, c.name, c.pattern
+                FROM tagstyles AS t
+                LEFT JOIN contents AS c ON c.tagstyle_id = t.id
+                ORDER BY t.id, c.id
+            ''')
+            rows = cur.fetchall()
 
-            try:
-                tagstyle = self.retrieve_tag_by_id(tagstyle_id)
-                if tagstyle:
-                    all_tagstyles.append(tagstyle)
-            except Exception as e:
-                print(f"An error occurred while retrieving tag with ID {tagstyle_id}: {e}")
-                raise
+        except sqlite3.Error as e:
+            print(f"An error occurred: {e}")
+            raise
+
+        all_tagstyles = []
+        for (tagstyle_id, name, pattern, kind), group in groupby(rows, key=lambda row: row[:4]):
+            contents = [
+                RegexPattern(name=row[4], pattern=row[5])
+                for row in group if row[4] is not None
+            ]
+            entire_pattern = RegexPattern(name=name, pattern=pattern)
+            all_tagstyles.append((tagstyle_id, Tagstyle(entire_pattern=entire_pattern, contents=contents, kind=kind)))
 
         return all_tagstyles
 
     def retrieve_all_tagstyles(self) -> List:
         """Retrieve all tags excluding the contents."""
         try:
-            conn = sqlite3.connect(self.full_path)
+            conn = self._connection()
             cur = conn.cursor()
 
-            cur.execute('SELECT * FROM tagstyles')
+            cur.execute('SELECT id, name, entire_pattern FROM tagstyles')
             tagstyles_rows = cur.fetchall()
 
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return tagstyles_rows
 
     def retrieve_tag_by_id(self, tagid: int) -> Optional[Tagstyle]:
         """Retrieve a single tag by its ID."""
         try:
-            conn = sqlite3.connect(self.full_path)
+            conn = self._connection()
             cur = conn.cursor()
 
-            cur.execute('SELECT * FROM tagstyles WHERE id = ?', (tagid,))
+            cur.execute('SELECT id, name, entire_pattern, kind FROM tagstyles WHERE id = ?', (tagid,))
             tagstyle_row = cur.fetchone()
 
             if tagstyle_row is None:
                 return None
 
-            tagstyle_id, name, pattern = tagstyle_row
+            tagstyle_id, name, pattern, kind = tagstyle_row
 
             cur.execute('SELECT name, pattern FROM contents WHERE tagstyle_id = ?', (tagstyle_id,))
             contents_rows = cur.fetchall()
 
             contents = [RegexPattern(name=row[0], pattern=row[1]) for row in contents_rows]
             entire_pattern = RegexPattern(name=name, pattern=pattern)
-            tagstyle = Tagstyle(entire_pattern=entire_pattern, contents=contents)
+            tagstyle = Tagstyle(entire_pattern=entire_pattern, contents=contents, kind=kind)
 
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return tagstyle
 
     def update_tag_by_name(self, tagid: int, updated_tag: Tagstyle) -> bool:
         """Update a tagstyle entry in the database."""
+        self.check_tags([updated_tag])
         try:
-            conn = sqlite3.connect(self.full_path)
-            cur = conn.cursor()
+            conn = self._connection()
+            with conn:
+                cur = conn.cursor()
 
-            cur.execute('''
-                UPDATE tagstyles
-                SET name = ?, entire_pattern = ?
-                WHERE id = ?
-            ''', (updated_tag.entire_pattern.name, updated_tag.entire_pattern.pattern, tagid))
+                cur.execute('''
+                    UPDATE tagstyles
+                    SET name = ?, entire_pattern = ?, kind = ?
+                    WHERE id = ?
+                ''', (updated_tag.entire_pattern.name, updated_tag.entire_pattern.pattern, updated_tag.kind, tagid))
 
-            cur.execute('DELETE FROM contents WHERE tagstyle_id = ?', (tagid,))
+                cur.execute('DELETE FROM contents WHERE tagstyle_id = ?', (tagid,))
 
-            for content in updated_tag.contents:
-                cur.execute('''
-                    INSERT INTO contents (tagstyle_id, name, pattern)
-                    VALUES (?, ?, ?)
-                ''', (tagid, content.name, content.pattern))
+                for content in updated_tag.contents:
+                    cur.execute('''
+                        INSERT INTO contents (tagstyle_id, name, pattern)
+                        VALUES (?, ?, ?)
+                    ''', (tagid, content.name, content.pattern))
 
-            conn.commit()
+                self._bump_generation(cur)
+            self._generation = None
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
         return True
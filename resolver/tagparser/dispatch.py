@@ -0,0 +1,351 @@
+import re
+from typing import Dict, FrozenSet, List, Optional, Pattern, Sequence, Set, Tuple
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # pragma: no cover
+    import sre_parse
+    import sre_constants
+
+
+# Upper bounds keeping the analysis cheap for patterns with large alternations.
+MAX_PREFIXES = 64
+MAX_PREFIX_LENGTH = 64
+MIN_FRAGMENT_LENGTH = 2
+
+# Character classes used for the character-class signature of a pattern.
+DIGIT = 1
+UPPER = 2
+LOWER = 4
+OTHER_ASCII = 8
+NON_ASCII = 16
+ALL_CLASSES = DIGIT | UPPER | LOWER | OTHER_ASCII | NON_ASCII
+
+_CLASS_RANGES = (
+    (DIGIT, 0x30, 0x39),
+    (UPPER, 0x41, 0x5A),
+    (LOWER, 0x61, 0x7A),
+)
+_CLASS_INTERVALS = tuple((cls, ((low, high),)) for cls, low, high in _CLASS_RANGES) + (
+    (OTHER_ASCII, ((0x00, 0x2F), (0x3A, 0x40), (0x5B, 0x60), (0x7B, 0x7F))),
+)
+_CLASS_SCANNERS = (
+    (DIGIT, re.compile(r"[0-9]")),
+    (UPPER, re.compile(r"[A-Z]")),
+    (LOWER, re.compile(r"[a-z]")),
+    (OTHER_ASCII, re.compile(r"[\x00-\x2f\x3a-\x40\x5b-\x60\x7b-\x7f]")),
+    (NON_ASCII, re.compile(r"[^\x00-\x7f]")),
+)
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+_ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+
+
+def _char_class(code: int) -> int:
+    """Return the character class of a single code point."""
+    if code > 0x7F:
+        return NON_ASCII
+    for cls, low, high in _CLASS_RANGES:
+        if low <= code <= high:
+            return cls
+    return OTHER_ASCII
+
+
+def _range_classes(low: int, high: int) -> int:
+    """Return all character classes touched by a code point range."""
+    mask = NON_ASCII if high > 0x7F else 0
+    for cls, ranges in _CLASS_INTERVALS:
+        for cls_low, cls_high in ranges:
+            if low <= cls_high and high >= cls_low:
+                mask |= cls
+                break
+    return mask
+
+
+def tag_classes(tag: str) -> int:
+    """
+    Compute the character-class signature of a tag.
+
+    Args:
+        tag (str): The tag to classify.
+
+    Returns:
+        int: A bitmask of the character classes occurring in the tag.
+    """
+    mask = 0
+    for cls, scanner in _CLASS_SCANNERS:
+        if scanner.search(tag):
+            mask |= cls
+    return mask
+
+
+def _ignores_case(flags: int) -> bool:
+    return bool(flags & sre_constants.SRE_FLAG_IGNORECASE)
+
+
+def _expand_prefixes(items) -> Tuple[Set[str], bool]:
+    """
+    Expand the literal prefixes every match of a parsed sequence starts with.
+
+    Returns:
+        Tuple[Set[str], bool]: The possible prefixes and whether they cover
+        the whole sequence, i.e. whether matching may continue after them.
+    """
+    prefixes = {""}
+    for op, av in items:
+        if op in _ZERO_WIDTH:
+            continue
+        if op is sre_constants.LITERAL:
+            options, exhaustive = {chr(av)}, True
+        elif op is sre_constants.IN:
+            options, exhaustive = _expand_in(av), True
+            if options is None:
+                return prefixes, False
+        elif op is sre_constants.SUBPATTERN:
+            group, add_flags, del_flags, sub = av
+            if _ignores_case(add_flags):
+                return prefixes, False
+            options, exhaustive = _expand_prefixes(sub)
+        elif op is sre_constants.BRANCH:
+            options, exhaustive = set(), True
+            for branch in av[1]:
+                branch_options, branch_exhaustive = _expand_prefixes(branch)
+                options |= branch_options
+                exhaustive = exhaustive and branch_exhaustive
+        elif op in _REPEATS:
+            options, exhaustive = _expand_repeat(*av)
+        else:
+            return prefixes, False
+
+        combined = {prefix + option for prefix in prefixes for option in options}
+        if len(combined) > MAX_PREFIXES or any(len(prefix) > MAX_PREFIX_LENGTH for prefix in combined):
+            return prefixes, False
+        prefixes = combined
+        if not exhaustive:
+            return prefixes, False
+    return prefixes, True
+
+
+def _expand_in(items) -> Optional[Set[str]]:
+    """Expand a character set into its members if it is small and literal."""
+    options = set()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            options.add(chr(av))
+        elif op is sre_constants.RANGE and av[1] - av[0] < MAX_PREFIXES:
+            options.update(chr(code) for code in range(av[0], av[1] + 1))
+        else:
+            return None
+        if len(options) > MAX_PREFIXES:
+            return None
+    return options
+
+
+def _expand_repeat(low: int, high: int, item) -> Tuple[Set[str], bool]:
+    """Expand a repeated item into the prefixes of its possible repetitions."""
+    options, exhaustive = _expand_prefixes(item)
+    if not exhaustive:
+        return (options if low > 0 else {""}), False
+
+    bounded = high <= MAX_PREFIX_LENGTH
+    counts = range(low, high + 1) if bounded else range(low, low + 1)
+    expanded = set()
+    for count in counts:
+        repetitions = {""}
+        for _ in range(count):
+            repetitions = {prefix + option for prefix in repetitions for option in options}
+            if len(repetitions) > MAX_PREFIXES:
+                return {""}, False
+        expanded |= repetitions
+        if len(expanded) > MAX_PREFIXES:
+            return {""}, False
+    return expanded, bounded
+
+
+def _allowed_classes(items) -> int:
+    """Return the character classes any character consumed by a sequence can have."""
+    mask = 0
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            mask |= _char_class(av)
+        elif op is sre_constants.IN:
+            mask |= _in_classes(av)
+        elif op is sre_constants.SUBPATTERN:
+            if _ignores_case(av[1]):
+                return ALL_CLASSES
+            mask |= _allowed_classes(av[3])
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                mask |= _allowed_classes(branch)
+        elif op in _REPEATS:
+            mask |= _allowed_classes(av[2])
+        elif op is sre_constants.GROUPREF_EXISTS:
+            mask |= _allowed_classes(av[1])
+            if av[2] is not None:
+                mask |= _allowed_classes(av[2])
+        elif op in _ZERO_WIDTH or op is sre_constants.GROUPREF:
+            # Zero-width, or repeats characters already consumed by a group
+            continue
+        else:
+            return ALL_CLASSES
+        if mask == ALL_CLASSES:
+            break
+    return mask
+
+
+def _in_classes(items) -> int:
+    mask = 0
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            mask |= _char_class(av)
+        elif op is sre_constants.RANGE:
+            mask |= _range_classes(*av)
+        elif op is sre_constants.CATEGORY and av is sre_constants.CATEGORY_DIGIT:
+            mask |= DIGIT | NON_ASCII
+        else:
+            return ALL_CLASSES
+    return mask
+
+
+def _required_fragments(items, fragments: Set[str]) -> None:
+    """Collect literal runs that occur in every match of a parsed sequence."""
+    run = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if len(run) >= MIN_FRAGMENT_LENGTH:
+            fragments.add("".join(run))
+        run = []
+        if op is sre_constants.SUBPATTERN and not _ignores_case(av[1]):
+            _required_fragments(av[3], fragments)
+        elif op in _REPEATS and av[0] >= 1:
+            _required_fragments(av[2], fragments)
+    if len(run) >= MIN_FRAGMENT_LENGTH:
+        fragments.add("".join(run))
+
+
+class PatternSignature:
+    """Necessary conditions a tag has to fulfil to fully match a pattern."""
+
+    __slots__ = ("prefixes", "min_length", "max_length", "classes", "fragments")
+
+    def __init__(self, prefixes: FrozenSet[str], min_length: int, max_length: Optional[int],
+                 classes: int, fragments: Tuple[str, ...]):
+        self.prefixes = prefixes
+        self.min_length = min_length
+        self.max_length = max_length
+        self.classes = classes
+        self.fragments = fragments
+
+    @classmethod
+    def from_pattern(cls, pattern: Pattern) -> "PatternSignature":
+        """
+        Derive the signature of a compiled pattern.
+
+        Patterns that cannot be analysed get a signature that admits every tag.
+
+        Args:
+            pattern (Pattern): The compiled pattern.
+
+        Returns:
+            PatternSignature: The signature of the pattern.
+        """
+        try:
+            parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+            min_length, max_length = parsed.getwidth()
+            if max_length >= sre_constants.MAXREPEAT - 1:
+                max_length = None
+            if _ignores_case(pattern.flags):
+                return cls(frozenset({""}), min_length, max_length, ALL_CLASSES, ())
+            prefixes, _ = _expand_prefixes(parsed)
+            fragments: Set[str] = set()
+            _required_fragments(parsed, fragments)
+            fragments = {fragment for fragment in fragments
+                         if not all(fragment in prefix for prefix in prefixes)}
+            return cls(frozenset(prefixes), min_length, max_length,
+                       _allowed_classes(parsed), tuple(sorted(fragments, key=len, reverse=True)))
+        except (re.error, TypeError, ValueError, RecursionError):
+            return cls(frozenset({""}), 0, None, ALL_CLASSES, ())
+
+    def admits(self, tag: str, length: int, classes: Optional[int]) -> bool:
+        """Check the length, character-class and fragment conditions for a tag."""
+        if length < self.min_length or (self.max_length is not None and length > self.max_length):
+            return False
+        if classes is not None and classes & ~self.classes:
+            return False
+        for fragment in self.fragments:
+            if fragment not in tag:
+                return False
+        return True
+
+
+class DispatchIndex:
+    """
+    Index narrowing the tagstyles whose entire pattern could match a tag.
+
+    Tagstyles are bucketed by the literal prefixes their entire pattern
+    requires (e.g. scheme and host) and filtered by length bounds, the
+    character classes they can consume and fixed literal fragments (e.g.
+    GS1 application identifiers) before any full regex runs. Candidates
+    are returned in store order, so matching them one after another gives
+    exactly the result of a linear scan.
+    """
+
+    def __init__(self, tagstyles: Sequence):
+        """
+        Build the index.
+
+        Args:
+            tagstyles (Sequence[CompiledTagstyle]): The compiled tagstyles in store order.
+        """
+        self.tagstyles = list(tagstyles)
+        self.signatures: List[PatternSignature] = []
+        self._by_prefix: Dict[str, List[int]] = {}
+
+        for position, tagstyle in enumerate(self.tagstyles):
+            signature = PatternSignature.from_pattern(tagstyle.entire_pattern)
+            self.signatures.append(signature)
+            for prefix in signature.prefixes:
+                self._by_prefix.setdefault(prefix, []).append(position)
+
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._by_prefix})
+
+    def candidates(self, tag: str) -> List:
+        """
+        Return the tagstyles whose entire pattern could match the tag.
+
+        Args:
+            tag (str): The tag to dispatch.
+
+        Returns:
+            List[CompiledTagstyle]: The candidate tagstyles in store order.
+        """
+        length = len(tag)
+        buckets = []
+        for prefix_length in self._prefix_lengths:
+            if prefix_length > length:
+                break
+            bucket = self._by_prefix.get(tag[:prefix_length])
+            if bucket:
+                buckets.append(bucket)
+
+        if not buckets:
+            return []
+        if len(buckets) == 1:
+            positions = buckets[0]
+        else:
+            positions = sorted({position for bucket in buckets for position in bucket})
+
+        candidates = []
+        classes = None
+        for position in positions:
+            signature = self.signatures[position]
+            if signature.classes != ALL_CLASSES and classes is None:
+                classes = tag_classes(tag)
+            if signature.admits(tag, length, classes):
+                candidates.append(self.tagstyles[position])
+        return candidates
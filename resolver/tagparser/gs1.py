@@ -0,0 +1,121 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+# Application identifiers of GS1 Digital Link URIs with their data titles.
+APPLICATION_IDENTIFIERS = {
+    "00": "SSCC",
+    "01": "GTIN",
+    "10": "BATCH/LOT",
+    "21": "SERIAL",
+    "22": "CPV",
+    "235": "TPX",
+    "250": "SECONDARY SERIAL",
+    "253": "GDTI",
+    "255": "GCN",
+    "8003": "GRAI",
+    "8004": "GIAI",
+    "8006": "ITIP",
+    "8010": "CPID",
+    "8011": "CPID SERIAL",
+    "8017": "GSRN - PROVIDER",
+    "8018": "GSRN - RECIPIENT",
+    "414": "LOC No.",
+    "417": "PARTY",
+}
+
+
+class DigitalLink(NamedTuple):
+    """A GS1 Digital Link URI split into its host and application identifier/value pairs."""
+    host: str
+    prefix: str
+    pairs: List[Tuple[str, str]]
+
+    def get(self, ai: str) -> Optional[str]:
+        """Return the value of the first pair with the given application identifier."""
+        for pair_ai, value in self.pairs:
+            if pair_ai == ai:
+                return value
+        return None
+
+    @property
+    def gtin_valid(self) -> Optional[bool]:
+        """Whether the GTIN has a correct check digit, or None if the link holds no GTIN."""
+        gtin = self.get("01")
+        return None if gtin is None else is_valid_gtin(gtin)
+
+
+def gtin_check_digit(digits: str) -> int:
+    """
+    Compute the GS1 check digit for the digits preceding it.
+
+    Args:
+        digits (str): The GTIN without its check digit.
+
+    Returns:
+        int: The check digit.
+    """
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        total += int(digit) * (3 if position % 2 == 0 else 1)
+    return (10 - total % 10) % 10
+
+
+def is_valid_gtin(gtin: str) -> bool:
+    """
+    Check the length, digits and check digit of a GTIN-8, -12, -13 or -14.
+
+    Args:
+        gtin (str): The GTIN including its check digit.
+
+    Returns:
+        bool: Whether the GTIN is well-formed.
+    """
+    if len(gtin) not in (8, 12, 13, 14) or not gtin.isascii() or not gtin.isdigit():
+        return False
+    return gtin_check_digit(gtin[:-1]) == int(gtin[-1])
+
+
+def parse_digital_link(tag: str) -> Optional[DigitalLink]:
+    """
+    Split a GS1 Digital Link URI into application identifier/value pairs in one pass.
+
+    The path is read from the first known primary key (`01`, `00`, `253`, ...)
+    onwards as alternating identifier and value segments. Everything before it
+    is kept as the path prefix; a query string or fragment ends the path.
+
+    Args:
+        tag (str): The URI to parse.
+
+    Returns:
+        Optional[DigitalLink]: The parsed URI, or None if it holds no known identifiers.
+    """
+    if tag.startswith("https://"):
+        rest = tag[8:]
+    elif tag.startswith("http://"):
+        rest = tag[7:]
+    else:
+        return None
+    host, slash, path = rest.partition("/")
+    if not host or not slash:
+        return None
+    for stop in "?#":
+        path = path.partition(stop)[0]
+
+    segments = path.split("/")
+    pairs = []
+    start = None
+    index = 0
+    while index + 1 < len(segments):
+        ai = segments[index]
+        if ai in APPLICATION_IDENTIFIERS and segments[index + 1]:
+            if start is None:
+                start = index
+            pairs.append((ai, segments[index + 1]))
+            index += 2
+        elif start is None:
+            index += 1
+        else:
+            break
+    if not pairs:
+        return None
+    return DigitalLink(host, "/".join(segments[:start]), pairs)
+
@@ -0,0 +1,533 @@
+import functools
+import math
+import multiprocessing
+import re
+import time
+from typing import FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+from resolver.tagparser.dispatch import PatternSignature, sre_constants, sre_parse
+
+# Longest tag the parser matches. Together with the backtracking degree accepted
+# below, this bounds the worst-case cost of matching any accepted tag.
+MAX_TAG_LENGTH = 1024
+
+# Highest power of the tag length that the backtracking of an accepted pattern
+# may grow with; 1024 ** 2 steps take a few milliseconds.
+MAX_BACKTRACKING_DEGREE = 2
+
+# Seconds a single match of an adversarial input may take in `benchmark_pattern`.
+MATCH_BUDGET = 0.01
+
+# Seconds after which the benchmark process is killed.
+BENCHMARK_TIMEOUT = 10.0
+
+# Input lengths the adversarial benchmark escalates through.
+BENCHMARK_LENGTHS = (8, 12, 16, 24, 32, 48, 64, 128, 256, 512, 1024)
+
+# Timings below this many seconds are too noisy to extrapolate from.
+_MIN_EXTRAPOLATION_TIME = 5e-5
+
+# Characters standing in for "everything else" when comparing character sets.
+_REPRESENTATIVES = "aZ0 _-./:?=&#%+\n\t\x00é"
+
+_BACKTRACKING_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+_ATOMIC = {getattr(sre_constants, name) for name in ("ATOMIC_GROUP", "POSSESSIVE_REPEAT") if hasattr(sre_constants, name)}
+_ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: re.compile(r"\d"),
+    sre_constants.CATEGORY_NOT_DIGIT: re.compile(r"\D"),
+    sre_constants.CATEGORY_SPACE: re.compile(r"\s"),
+    sre_constants.CATEGORY_NOT_SPACE: re.compile(r"\S"),
+    sre_constants.CATEGORY_WORD: re.compile(r"\w"),
+    sre_constants.CATEGORY_NOT_WORD: re.compile(r"\W"),
+}
+
+
+class UnsafePatternError(ValueError):
+    """Exception raised when a pattern is invalid or may take unbounded time to match."""
+
+    def __init__(self, pattern: str, reasons: Iterable[str]):
+        self.pattern = pattern
+        self.reasons = list(reasons)
+        super().__init__(f"Pattern {pattern!r} rejected: {'; '.join(self.reasons)}")
+
+
+class _CharsetAnalysis:
+    """
+    Character sets of parsed pattern items over a finite sample alphabet.
+
+    The alphabet holds every character the pattern mentions plus a few
+    representatives of everything else, so two items that can consume a
+    common character are recognised as overlapping.
+    """
+
+    def __init__(self, parsed):
+        self.parsed = parsed
+        flags = parsed.state.flags if hasattr(parsed, "state") else parsed.pattern.flags
+        self.ignore_case = bool(flags & sre_constants.SRE_FLAG_IGNORECASE)
+        self.dotall = bool(flags & sre_constants.SRE_FLAG_DOTALL)
+        codes = set(map(ord, _REPRESENTATIVES))
+        self._collect(parsed, codes)
+        alphabet = {chr(code) for code in codes}
+        if self.ignore_case:
+            alphabet |= {char.swapcase() for char in alphabet}
+        self.alphabet: FrozenSet[str] = frozenset(alphabet)
+
+    def _collect(self, items, codes: set) -> None:
+        for op, av in items:
+            if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL):
+                codes.add(av)
+            elif op is sre_constants.IN:
+                for in_op, in_av in av:
+                    if in_op is sre_constants.LITERAL:
+                        codes.add(in_av)
+                    elif in_op is sre_constants.RANGE:
+                        codes.update(in_av)
+            for sub in _children(op, av):
+                self._collect(sub, codes)
+
+    def _fold(self, members: FrozenSet[str]) -> FrozenSet[str]:
+        if not self.ignore_case:
+            return members
+        return frozenset(char for char in self.alphabet if char in members or char.swapcase() in members)
+
+    def item_chars(self, op, av) -> FrozenSet[str]:
+        """Return the characters a single item can consume."""
+        if op is sre_constants.LITERAL:
+            return self._fold(frozenset(chr(av)))
+        if op is sre_constants.NOT_LITERAL:
+            return self.alphabet - self._fold(frozenset(chr(av)))
+        if op is sre_constants.ANY:
+            return self.alphabet if self.dotall else self.alphabet - {"\n"}
+        if op is sre_constants.IN:
+            return self._in_chars(av)
+        if op in _ZERO_WIDTH:
+            return frozenset()
+        if op is sre_constants.GROUPREF:
+            return self.alphabet
+        members = frozenset()
+        for sub in _children(op, av):
+            members |= self.chars(sub)
+        return members
+
+    def _in_chars(self, items) -> FrozenSet[str]:
+        members = set()
+        negate = False
+        for op, av in items:
+            if op is sre_constants.NEGATE:
+                negate = True
+            elif op is sre_constants.LITERAL:
+                members.add(chr(av))
+            elif op is sre_constants.RANGE:
+                members.update(char for char in self.alphabet if av[0] <= ord(char) <= av[1])
+            elif op is sre_constants.CATEGORY and av in _CATEGORIES:
+                members.update(char for char in self.alphabet if _CATEGORIES[av].match(char))
+            else:
+                members.update(self.alphabet)
+        members = self._fold(frozenset(members))
+        return self.alphabet - members if negate else members
+
+    def chars(self, items) -> FrozenSet[str]:
+        """Return the characters any item of a sequence can consume."""
+        members = frozenset()
+        for op, av in items:
+            members |= self.item_chars(op, av)
+        return members
+
+    def first_chars(self, items) -> FrozenSet[str]:
+        """Return the characters a match of a sequence can start with."""
+        members = frozenset()
+        for op, av in items:
+            if op in (sre_constants.SUBPATTERN, sre_constants.BRANCH) or op in _BACKTRACKING_REPEATS or op in _ATOMIC:
+                members |= frozenset().union(*(self.first_chars(sub) for sub in _children(op, av)))
+            else:
+                members |= self.item_chars(op, av)
+            if _min_width(self.parsed, [(op, av)]) > 0:
+                break
+        return members
+
+    def sample(self, items) -> str:
+        """Return a short string following the structure of a sequence."""
+        text = ""
+        for op, av in items:
+            if op in _ZERO_WIDTH:
+                continue
+            if op is sre_constants.SUBPATTERN:
+                text += self.sample(av[-1])
+            elif op is sre_constants.BRANCH:
+                text += self.sample(av[1][-1])
+            elif op in _BACKTRACKING_REPEATS or op in _ATOMIC:
+                count, body = (av[0], av[2]) if isinstance(av, tuple) else (1, av)
+                text += self.sample(body) * max(count, 1)
+            else:
+                members = sorted(self.item_chars(op, av))
+                if members:
+                    text += members[0]
+        return text
+
+
+def _children(op, av) -> List:
+    """Return the sub-sequences nested in an item."""
+    if op is sre_constants.SUBPATTERN:
+        return [av[-1]]
+    if op is sre_constants.BRANCH:
+        return list(av[1])
+    if op in _BACKTRACKING_REPEATS or op in _ATOMIC:
+        return [av[-1] if isinstance(av, tuple) else av]
+    if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        return [av[1]]
+    if op is sre_constants.GROUPREF_EXISTS:
+        return [sub for sub in av[1:] if sub is not None]
+    return []
+
+
+def _width(parsed, items) -> Tuple[int, int]:
+    state = parsed.state if hasattr(parsed, "state") else parsed.pattern
+    return sre_parse.SubPattern(state, list(items)).getwidth()
+
+
+def _min_width(parsed, items) -> int:
+    return _width(parsed, items)[0]
+
+
+def _flatten(items) -> List:
+    """Splice the contents of plain groups into the surrounding sequence."""
+    flat = []
+    for op, av in items:
+        if op is sre_constants.SUBPATTERN:
+            flat.extend(_flatten(av[-1]))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _is_variable(parsed, op, av) -> bool:
+    """
+    Whether an item can match runs of different lengths.
+
+    Besides repeats matching a variable number of times, this covers
+    alternations with an empty or shorter branch; sre_parse factors
+    `(a|aa)` into `a(?:|a)`, whose branches differ in width.
+    """
+    if op in _BACKTRACKING_REPEATS:
+        return av[1] > av[0]
+    if op is sre_constants.BRANCH:
+        low, high = _width(parsed, [(op, av)])
+        return high > low
+    return False
+
+
+def _variable_items(parsed, op, av) -> List:
+    """Return the backtracking items within an item that match runs of different lengths."""
+    if op in _ATOMIC:
+        return []
+    found = []
+    if _is_variable(parsed, op, av):
+        found.append((op, av))
+    for sub in _children(op, av):
+        for sub_op, sub_av in sub:
+            found.extend(_variable_items(parsed, sub_op, sub_av))
+    return found
+
+
+def _repeats(items) -> List:
+    """Return every backtracking repeat that may match its body more than once, outermost first."""
+    found = []
+    for op, av in items:
+        if op in _ATOMIC:
+            continue
+        if op in _BACKTRACKING_REPEATS and av[1] > 1:
+            found.append(av)
+        for sub in _children(op, av):
+            found.extend(_repeats(sub))
+    return found
+
+
+def analyze_pattern(pattern: str, search: bool = False) -> List[str]:
+    """
+    Statically look for constructs prone to catastrophic backtracking.
+
+    Flags repeats, bounded or not, whose body can match the same text in
+    several ways, i.e. nested quantifiers such as `(a+)+`, `(\\w+\\s?)*` or
+    `(a?){30}`, and alternations inside a repeat whose branches can start with
+    the same character, such as `(a|ab|b)*`. These backtrack exponentially.
+
+    Sequences of variable repeats that can consume each other's characters,
+    such as `a.*b.*c`, backtrack polynomially with one power of the input
+    length per repeat, plus one if the pattern is searched for rather than
+    matched at the start. More than `MAX_BACKTRACKING_DEGREE` is flagged.
+
+    The verdict only depends on the pattern; nothing is executed.
+
+    Args:
+        pattern (str): The regular expression to analyze.
+        search (bool): Whether the pattern is searched for anywhere in the tag, as content patterns are,
+            rather than matched against the whole tag.
+
+    Returns:
+        List[str]: One message per finding, empty if none were found.
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression.
+    """
+    parsed = sre_parse.parse(pattern)
+    analysis = _CharsetAnalysis(parsed)
+    findings = []
+    for low, high, body in _repeats(parsed):
+        elements = _flatten(body)
+        if _has_nested_quantifier(analysis, elements):
+            findings.append(f"nested quantifier in repeated {analysis.sample(body)!r}")
+        elif _has_overlapping_boundary(analysis, elements):
+            findings.append(f"overlapping repeats across iterations of repeated {analysis.sample(body)!r}")
+        elif _has_overlapping_branches(analysis, elements):
+            findings.append(f"overlapping alternation in repeated {analysis.sample(body)!r}")
+    degree = _chain_length(analysis, parsed)
+    if search and not _is_anchored(analysis, parsed):
+        degree += 1
+    if degree > MAX_BACKTRACKING_DEGREE:
+        findings.append(f"backtracking grows with the tag length to the power {degree}, "
+                        f"at most {MAX_BACKTRACKING_DEGREE} is accepted")
+    return findings
+
+
+def _has_nested_quantifier(analysis: _CharsetAnalysis, elements: List) -> bool:
+    """
+    Check whether a repeated body can split a run of characters in several ways.
+
+    This is the case when it contains a variable item and every other
+    mandatory element can consume characters of that item as well.
+    """
+    for index, (op, av) in enumerate(elements):
+        for inner in _variable_items(analysis.parsed, op, av):
+            inner_chars = analysis.item_chars(*inner)
+            if not inner_chars:
+                continue
+            others = [
+                element for position, element in enumerate(elements)
+                if position != index and _min_width(analysis.parsed, [element]) > 0
+            ]
+            if inner[0] is sre_constants.BRANCH and not others:
+                # A lone alternation only splits a run if its branches overlap.
+                continue
+            if all(analysis.item_chars(*element) & inner_chars for element in others):
+                return True
+    return False
+
+
+def _has_overlapping_boundary(analysis: _CharsetAnalysis, elements: List) -> bool:
+    """
+    Check whether consecutive iterations of a repeated body can trade characters.
+
+    In `(\\s*,\\s*)*` the trailing `\\s*` of one iteration meets the leading
+    `\\s*` of the next, so a run of spaces can be split between them in as
+    many ways as it is long, once per iteration. The leading variable item is
+    compared with the trailing one; mandatory items before the former or after
+    the latter pin the boundary.
+    """
+    def boundary(items):
+        for item in items:
+            if item[0] not in _ATOMIC and _is_variable(analysis.parsed, *item):
+                return item
+            if _min_width(analysis.parsed, [item]) > 0:
+                return None
+        return None
+
+    leading = boundary(elements)
+    trailing = boundary(elements[::-1])
+    if leading is None or trailing is None or leading is trailing:
+        return False
+    return bool(analysis.item_chars(*leading) & analysis.item_chars(*trailing))
+
+
+def _has_overlapping_branches(analysis: _CharsetAnalysis, elements: List) -> bool:
+    """Check whether a repeated body holds an alternation with branches starting alike."""
+    for op, av in elements:
+        if op is sre_constants.BRANCH and _branches_overlap(analysis, av):
+            return True
+        for sub in _children(op, av):
+            if op not in _ATOMIC and _has_overlapping_branches(analysis, _flatten(sub)):
+                return True
+    return False
+
+
+def _branches_overlap(analysis: _CharsetAnalysis, av) -> bool:
+    firsts = [analysis.first_chars(branch) for branch in av[1]]
+    return any(first & other for index, first in enumerate(firsts) for other in firsts[index + 1:])
+
+
+def _is_ambiguous(analysis: _CharsetAnalysis, op, av) -> bool:
+    """Whether an item can end at several positions, so that the items after it are retried."""
+    if op in _BACKTRACKING_REPEATS:
+        return av[1] > av[0]
+    if op is sre_constants.BRANCH:
+        return _branches_overlap(analysis, av) or _is_variable(analysis.parsed, op, av)
+    return op is sre_constants.GROUPREF
+
+
+def _chain_length(analysis: _CharsetAnalysis, items) -> int:
+    """
+    Return the longest run of ambiguous items that can trade characters with each other.
+
+    A run continues while each item can consume characters of the latest
+    ambiguous item; an item that cannot, such as the `/` after `[^/]+`, pins
+    where the latter ends and breaks the run. Nested sequences are measured
+    on their own.
+    """
+    longest = length = 0
+    chars: FrozenSet[str] = frozenset()
+    for op, av in _flatten(items):
+        for sub in _children(op, av):
+            longest = max(longest, _chain_length(analysis, sub))
+        if op in _ZERO_WIDTH:
+            continue
+        item_chars = analysis.item_chars(op, av)
+        if op not in _ATOMIC and _is_ambiguous(analysis, op, av):
+            length = length + 1 if item_chars & chars else 1
+            chars = item_chars
+        elif not item_chars & chars:
+            length, chars = 0, frozenset()
+        longest = max(longest, length)
+    return longest
+
+
+def _is_anchored(analysis: _CharsetAnalysis, items) -> bool:
+    """Whether a sequence can only match at the start of the string."""
+    flattened = _flatten(items)
+    if not flattened or flattened[0][0] is not sre_constants.AT:
+        return False
+    multiline = analysis.parsed.state.flags if hasattr(analysis.parsed, "state") else analysis.parsed.pattern.flags
+    at = flattened[0][1]
+    return at is sre_constants.AT_BEGINNING_STRING or (
+        at is sre_constants.AT_BEGINNING and not multiline & sre_constants.SRE_FLAG_MULTILINE)
+
+
+def _adversarial_inputs(pattern: Pattern, analysis: _CharsetAnalysis) -> List[Tuple[str, str, str]]:
+    """
+    Build (prefix, pump, suffix) triples that drive repeats into backtracking.
+
+    Each pump follows the body of a repeat and the suffix is a character the
+    repeat cannot consume, so the match has to fail after exploring every way
+    of splitting the pumped text.
+    """
+    prefixes = sorted(PatternSignature.from_pattern(pattern).prefixes, key=len)
+    prefix = prefixes[-1] if prefixes else ""
+    inputs = []
+    for low, high, body in _repeats(analysis.parsed):
+        pump = analysis.sample(body)
+        outsiders = sorted(analysis.alphabet - analysis.chars(body))
+        for suffix in (outsiders[:1] or [""]):
+            inputs.append((prefix, pump or "a", suffix))
+    for char in "a0/ ":
+        inputs.append((prefix, char, "\x00"))
+    return list(dict.fromkeys(inputs))
+
+
+def _time_match(match, text: str, budget: float) -> float:
+    """Return the fastest of up to three timed matches, stopping early once over budget."""
+    fastest = None
+    for _ in range(3):
+        start = time.perf_counter()
+        match(text)
+        elapsed = time.perf_counter() - start
+        fastest = elapsed if fastest is None else min(fastest, elapsed)
+        if elapsed > budget * 4:
+            break
+    return fastest
+
+
+def _benchmark(pattern: str, max_length: int, budget: float) -> Tuple[float, Optional[str]]:
+    compiled = re.compile(pattern)
+    analysis = _CharsetAnalysis(sre_parse.parse(pattern))
+    worst = 0.0
+    for prefix, pump, suffix in _adversarial_inputs(compiled, analysis):
+        for match in (compiled.fullmatch, compiled.search):
+            previous = None
+            lengths = [length for length in BENCHMARK_LENGTHS if length <= max_length]
+            for position, length in enumerate(lengths):
+                repetitions = max(1, (length - len(prefix) - len(suffix)) // len(pump))
+                text = prefix + pump * repetitions + suffix
+                elapsed = _time_match(match, text, budget)
+                worst = max(worst, elapsed)
+                if elapsed > budget:
+                    return worst, f"matching {len(text)} characters took {elapsed * 1e3:.1f} ms"
+                if previous is not None and position + 1 < len(lengths) and elapsed > _MIN_EXTRAPOLATION_TIME:
+                    prev_length, prev_elapsed = previous
+                    exponent = math.log(elapsed / max(prev_elapsed, 1e-9)) / math.log(length / prev_length)
+                    predicted = elapsed * (lengths[position + 1] / length) ** max(exponent, 1.0)
+                    if predicted > budget * 4:
+                        return worst, (f"matching time grows super-linearly, {elapsed * 1e3:.2f} ms at "
+                                       f"{len(text)} characters")
+                previous = (length, elapsed)
+    return worst, None
+
+
+def _benchmark_worker(connection, pattern: str, max_length: int, budget: float) -> None:
+    try:
+        connection.send(_benchmark(pattern, max_length, budget))
+    finally:
+        connection.close()
+
+
+def benchmark_pattern(pattern: str, max_length: int = MAX_TAG_LENGTH, budget: float = MATCH_BUDGET,
+                      timeout: float = BENCHMARK_TIMEOUT) -> Tuple[float, Optional[str]]:
+    """
+    Time a pattern against adversarial inputs of escalating length.
+
+    Escalation stops as soon as a match exceeds the budget, or once the growth
+    measured so far predicts that the next length would. Each timing is the
+    fastest of repeated runs to rule out scheduling noise, but timings still
+    depend on the machine, so this is a diagnostic for pattern authors and
+    not part of `check_pattern`'s verdict.
+
+    The pattern runs in a separate process that is killed after `timeout`
+    seconds, so a catastrophic pattern cannot hang the caller.
+
+    Args:
+        pattern (str): The regular expression to benchmark.
+        max_length (int): Longest input to try.
+        budget (float): Seconds a single match may take.
+        timeout (float): Seconds after which the benchmark is abandoned.
+
+    Returns:
+        Tuple[float, Optional[str]]: The slowest match in seconds and a message
+        describing the violation, or None if the pattern stayed within budget.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_benchmark_worker, args=(sender, pattern, max_length, budget), daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout):
+            return receiver.recv()
+        return timeout, f"benchmark did not finish within {timeout:g} s"
+    except EOFError:
+        return 0.0, "benchmark process exited without a result"
+    finally:
+        receiver.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+
+@functools.lru_cache(maxsize=4096)
+def check_pattern(pattern: str, search: bool = False) -> None:
+    """
+    Ensure a pattern compiles and matches any tag up to `MAX_TAG_LENGTH` in bounded time.
+
+    The verdict comes from `analyze_pattern` alone: it is deterministic and
+    the pattern is never executed.
+
+    Args:
+        pattern (str): The regular expression to check.
+        search (bool): Whether the pattern is searched for anywhere in the tag rather than fully matched.
+
+    Raises:
+        UnsafePatternError: If the pattern is invalid or may backtrack excessively.
+    """
+    try:
+        findings = analyze_pattern(pattern, search)
+    except re.error as e:
+        raise UnsafePatternError(pattern, [f"invalid regular expression: {e}"])
+    if findings:
+        raise UnsafePatternError(pattern, findings)
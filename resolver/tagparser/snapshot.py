@@ -0,0 +1,123 @@
+import hashlib
+import json
+import re
+from typing import Dict, Hashable, Iterable, List, Optional, Pattern, Tuple
+from resolver.tagparser.dbm import DIGITAL_LINK_KIND, REGEX_KIND, Tagstyle
+from resolver.tagparser.dispatch import DispatchIndex
+
+
+class CompiledTagstyle:
+    """A stored tagstyle with its entire pattern and content patterns compiled."""
+
+    __slots__ = ("id", "name", "kind", "entire_pattern", "contents", "_searchers")
+
+    def __init__(self, tagstyle_id: int, tagstyle: Tagstyle):
+        """
+        Compile a stored tagstyle.
+
+        Args:
+            tagstyle_id (int): The ID of the tagstyle in the store.
+            tagstyle (Tagstyle): The stored tagstyle.
+        """
+        self.id = tagstyle_id
+        self.name = tagstyle.entire_pattern.name
+        self.kind = tagstyle.kind
+        self.entire_pattern: Pattern = re.compile(tagstyle.entire_pattern.pattern)
+        self.contents: List[Tuple[str, Pattern]] = [
+            (content.name, re.compile(content.pattern))
+            for content in tagstyle.contents
+        ]
+        self._searchers = tuple((name, pattern.search) for name, pattern in self.contents)
+
+    def extract(self, tag: str) -> Dict[str, str]:
+        """
+        Extract all content fields of a tag with their precompiled patterns.
+
+        Each content pattern is searched for separately, in content order, and
+        its field holds the first group of the leftmost match, exactly like
+        `re.search(pattern, tag).group(1)`.
+
+        Args:
+            tag (str): The tag to extract contents from.
+
+        Returns:
+            Dict[str, str]: The extracted contents in content order.
+        """
+        contents = {}
+        for name, search in self._searchers:
+            match = search(tag)
+            if match:
+                contents[name] = match.group(1)
+        return contents
+
+
+def tagstyles_digest(entries: Iterable[Tuple[int, Tagstyle]]) -> str:
+    """
+    Return a digest of stored tagstyles that changes with any of their IDs, kinds or patterns.
+
+    Args:
+        entries (Iterable[Tuple[int, Tagstyle]]): Stored tagstyles paired with their IDs.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest.
+    """
+    rows = sorted([tagstyle_id, tagstyle.model_dump()] for tagstyle_id, tagstyle in entries)
+    return hashlib.sha256(json.dumps(rows, sort_keys=True).encode()).hexdigest()
+
+
+class TagstyleSnapshot:
+    """Immutable in-memory view of all stored tagstyles with compiled patterns."""
+
+    def __init__(self, entries: Iterable[Tuple[int, Tagstyle]],
+                 generation: Optional[Hashable] = None, identity: Optional[Hashable] = None):
+        """
+        Compile a snapshot from stored tagstyles.
+
+        Args:
+            entries (Iterable[Tuple[int, Tagstyle]]): Stored tagstyles paired with their IDs.
+            generation (Hashable, optional): Store generation the entries were read at.
+            identity (Hashable, optional): Identity of the store the entries were read from.
+        """
+        entries = list(entries)
+        self.generation = generation
+        self.identity = identity
+        self.digest = tagstyles_digest(entries)
+        self.tagstyles = [CompiledTagstyle(tagstyle_id, tagstyle) for tagstyle_id, tagstyle in entries]
+        self.by_id = {tagstyle.id: tagstyle for tagstyle in self.tagstyles}
+        self.index = DispatchIndex(self.tagstyles)
+
+    def __len__(self) -> int:
+        return len(self.tagstyles)
+
+    def match_entire_pattern(self, tag: str) -> Dict[str, int]:
+        """
+        Match the entire tag against the compiled tagstyles it dispatches to.
+
+        Args:
+            tag (str): The tag to match.
+
+        Returns:
+            Dict[str, int]: A dictionary with tagstyle names as keys and their IDs as values.
+        """
+        matches = {}
+        for tagstyle in self.index.candidates(tag):
+            if tagstyle.entire_pattern.fullmatch(tag):
+                matches[tagstyle.name] = tagstyle.id
+        return matches
+
+    def match_contents(self, tagstyle_id: int, tag: str) -> Optional[Dict[str, str]]:
+        """
+        Extract the contents of a tag using the content patterns of one tagstyle.
+
+        Args:
+            tagstyle_id (int): The ID of the tagstyle to use.
+            tag (str): The tag to extract contents from.
+
+        Returns:
+            Optional[Dict[str, str]]: The extracted contents, or None if the
+            tagstyle is not part of the snapshot.
+        """
+        tagstyle = self.by_id.get(tagstyle_id)
+        if tagstyle is None:
+            return None
+        return tagstyle.extract(tag)
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from resolver.tagparser.dbm import DatabaseManagement, Tagstyle, TagstyleStorage, tagstyles_from_catalogue
+
+
+class InMemoryTagstyleStorage(TagstyleStorage):
+    """
+    Tagstyle store kept entirely in process memory.
+
+    Suited to read-only edge deployments, benchmarks and tests that should
+    not touch the filesystem. IDs are assigned like SQLite rowids, i.e. one
+    above the largest ID currently stored. Tagstyles are copied on the way in
+    and out, so callers never share the stored objects, as with SQLite.
+    """
+
+    def __init__(self, tagstyles: Optional[List[Tagstyle]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            tagstyles (List[Tagstyle], optional): Tagstyles to load initially.
+        """
+        self._tagstyles: Dict[int, Tagstyle] = {}
+        self._generation = 0
+        self.catalogue_path: Optional[str] = None
+        self._lock = threading.Lock()
+        if tagstyles:
+            self.add_tags(tagstyles)
+
+    @classmethod
+    def from_catalogue(cls, catalogue_path: str) -> "InMemoryTagstyleStorage":
+        """
+        Create a store from a catalogue file in the `tagstyles.json` format.
+
+        Args:
+            catalogue_path (str): Path of the catalogue file.
+
+        Returns:
+            InMemoryTagstyleStorage: The populated store.
+        """
+        with open(catalogue_path, 'r') as file:
+            storage = cls(tagstyles_from_catalogue(json.load(file)))
+        storage.catalogue_path = os.path.abspath(catalogue_path)
+        return storage
+
+    @property
+    def generation(self) -> int:
+        """Return a counter that increases whenever the stored tagstyles change."""
+        return self._generation
+
+    @property
+    def identity(self) -> Tuple[str, Optional[str]]:
+        """Return the backend and the absolute path of the catalogue the store was loaded from, if any."""
+        return "memory", self.catalogue_path
+
+    def health_check(self) -> bool:
+        """Check the health of the store."""
+        return True
+
+    def initialize_db(self) -> bool:
+        """Initialize the store; an in-memory store is always ready."""
+        return True
+
+    def add_tags(self, new_tags: List[Tagstyle]) -> bool:
+        """Add several tags to the store at once."""
+        self.check_tags(new_tags)
+        with self._lock:
+            next_id = max(self._tagstyles, default=0) + 1
+            for offset, new_tag in enumerate(new_tags):
+                self._tagstyles[next_id + offset] = new_tag.model_copy(deep=True)
+            self._generation += 1
+        return True
+
+    def delete_tag_by_id(self, tagid: int) -> bool:
+        """Delete a tag from the store by its ID."""
+        with self._lock:
+            self._tagstyles.pop(tagid, None)
+            self._generation += 1
+        return True
+
+    def delete_all_tags(self) -> bool:
+        """Delete all tags from the store."""
+        with self._lock:
+            self._tagstyles.clear()
+            self._generation += 1
+        return True
+
+    def retrieve_all_tags_with_ids(self) -> List[Tuple[int, Tagstyle]]:
+        """Retrieve all tags including all their contents, paired with their IDs."""
+        with self._lock:
+            return [(tagid, tagstyle.model_copy(deep=True)) for tagid, tagstyle in sorted(self._tagstyles.items())]
+
+    def retrieve_all_tagstyles(self) -> List:
+        """Retrieve all tags excluding the contents as (id, name, entire_pattern) rows."""
+        return [
+            (tagid, tagstyle.entire_pattern.name, tagstyle.entire_pattern.pattern)
+            for tagid, tagstyle in self.retrieve_all_tags_with_ids()
+        ]
+
+    def retrieve_tag_by_id(self, tagid: int) -> Optional[Tagstyle]:
+        """Retrieve a single tag by its ID."""
+        tagstyle = self._tagstyles.get(tagid)
+        return None if tagstyle is None else tagstyle.model_copy(deep=True)
+
+    def update_tag_by_name(self, tagid: int, updated_tag: Tagstyle) -> bool:
+        """Update a tagstyle entry in the store."""
+        self.check_tags([updated_tag])
+        with self._lock:
+            if tagid in self._tagstyles:
+                self._tagstyles[tagid] = updated_tag.model_copy(deep=True)
+            self._generation += 1
+        return True
+
+
+def create_storage(backend: Optional[str] = None, path: Optional[str] = None) -> TagstyleStorage:
+    """
+    Create the configured tagstyle store.
+
+    Args:
+        backend (str, optional): `sqlite` or `memory`. Defaults to the
+            `RESOLVER_TAGSTYLE_BACKEND` environment variable, else `sqlite`.
+        path (str, optional): Database file for `sqlite`, or catalogue file in the
+            `tagstyles.json` format for `memory`. Defaults to `RESOLVER_TAGSTYLE_DB`
+            respectively `RESOLVER_TAGSTYLE_CATALOGUE`.
+
+    Returns:
+        TagstyleStorage: The store.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = (backend or os.environ.get('RESOLVER_TAGSTYLE_BACKEND', 'sqlite')).lower()
+    if backend == 'sqlite':
+        return DatabaseManagement(path)
+    if backend == 'memory':
+        path = path or os.environ.get('RESOLVER_TAGSTYLE_CATALOGUE')
+        return InMemoryTagstyleStorage.from_catalogue(path) if path else InMemoryTagstyleStorage()
+    raise ValueError(f"Unknown tagstyle storage backend: {backend}")
@@ -1,7 +1,16 @@
-import re
+import os
+import pickle
 import sqlite3
-from typing import Dict
-from resolver.tagparser.dbm import DatabaseManagement, Tagstyle, RegexPattern
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+from pydantic import ConfigDict
+from resolver.tagparser.cache import ParseCache
+from resolver.tagparser.dbm import Tagstyle, TagstyleStorage, RegexPattern
+from resolver.tagparser.gs1 import DigitalLink, parse_digital_link
+from resolver.tagparser.safety import MAX_TAG_LENGTH
+from resolver.tagparser.snapshot import DIGITAL_LINK_KIND, REGEX_KIND, TagstyleSnapshot, tagstyles_digest
+from resolver.tagparser.storage import create_storage
 
 
 class AmbiguousTagError(Exception):
@@ -18,53 +27,326 @@ class InvalidTagError(Exception):
         super().__init__(message)
 
 
+class ParsedTag(NamedTuple):
+    """Lightweight parse result holding the tagstyle name, the extracted contents and the tagstyle's kind."""
+    tagstyle: str
+    contents: Dict[str, str]
+    kind: str = REGEX_KIND
+
+
+class ParsedPattern(RegexPattern):
+    """Immutable regular expression pattern of a parse result."""
+    model_config = ConfigDict(frozen=True)
+
+
+class ParsedTagstyle(Tagstyle):
+    """Immutable parse result, so that cached results can be shared between callers."""
+    model_config = ConfigDict(frozen=True)
+    entire_pattern: ParsedPattern
+    contents: Tuple[ParsedPattern, ...]
+
+
 class Parser:
     """Parser class to parse tags against stored tag patterns in the database."""
 
-    def __init__(self):
-        """Initialize the Parser with a DatabaseManagement instance."""
-        self.manager = DatabaseManagement()
+    def __init__(self, storage: Optional[TagstyleStorage] = None,
+                 cache_size: int = 4096, cache_ttl: Optional[float] = None,
+                 max_tag_length: int = MAX_TAG_LENGTH):
+        """
+        Initialize the Parser with a tagstyle store.
 
-    def parse_tag(self, tag: str) -> Tagstyle:
+        Args:
+            storage (TagstyleStorage, optional): The store to parse against.
+                Defaults to the store configured through `create_storage`.
+            cache_size (int): Number of parse results to keep in the LRU cache, 0 disables it.
+            cache_ttl (float, optional): Seconds a cached parse result stays valid.
+            max_tag_length (int): Longer tags are rejected without matching. Stored patterns
+                only backtrack polynomially in the tag length, so this bounds their matching cost.
+        """
+        self.manager = storage if storage is not None else create_storage()
+        self._snapshot: Optional[TagstyleSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self.cache = ParseCache(maxsize=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        self.max_tag_length = max_tag_length
+
+    def snapshot(self) -> TagstyleSnapshot:
+        """
+        Return the compiled tagstyle snapshot, rebuilding it if the store changed.
+
+        The snapshot is only rebuilt when the generation counter of the
+        store differs from the one it was built at.
+
+        Returns:
+            TagstyleSnapshot: The current compiled tagstyle snapshot.
+        """
+        generation = self.manager.generation
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.generation != generation:
+            with self._snapshot_lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.generation != generation:
+                    snapshot = TagstyleSnapshot(self.manager.retrieve_all_tags_with_ids(), generation,
+                                                self.manager.identity)
+                    self._snapshot = snapshot
+        return snapshot
+
+    def has_current_snapshot(self) -> bool:
+        """Whether a compiled snapshot matching the current store generation is already held."""
+        snapshot = self._snapshot
+        return snapshot is not None and snapshot.generation == self.manager.generation
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Serialize the current compiled snapshot so other processes can skip compiling it.
+
+        The file is replaced atomically, so concurrent readers never see a partial write.
+
+        Args:
+            path (str): The file to write.
+        """
+        snapshot = self.snapshot()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".tagstyles-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def load_snapshot(self, path: str) -> bool:
+        """
+        Adopt a snapshot written by `save_snapshot` if it was taken of the current store contents.
+
+        The snapshot must come from the same store, at its current generation,
+        and the stored tagstyles must still hash to the digest saved with it;
+        two stores can be at the same generation with different tagstyles.
+        Reading the stored rows is still much cheaper than compiling them.
+        The file is trusted like the code itself, it must only be writable by the service.
+
+        Args:
+            path (str): The file to read.
+
+        Returns:
+            bool: Whether the snapshot was adopted. A missing, unreadable or
+            outdated file leaves the parser unchanged.
+        """
+        try:
+            with open(path, "rb") as file:
+                snapshot = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return False
+        if not isinstance(snapshot, TagstyleSnapshot) or snapshot.generation != self.manager.generation:
+            return False
+        if getattr(snapshot, "identity", None) != self.manager.identity:
+            return False
+        if getattr(snapshot, "digest", None) != tagstyles_digest(self.manager.retrieve_all_tags_with_ids()):
+            return False
+        with self._snapshot_lock:
+            self._snapshot = snapshot
+        return True
+
+    def invalidate(self) -> None:
+        """Drop the compiled tagstyle snapshot and cached results so the next parse rebuilds them."""
+        self._snapshot = None
+        if self.cache is not None:
+            self.cache.clear()
+
+    def cache_info(self) -> Dict[str, Any]:
+        """
+        Return the hit, miss and eviction counters of the parse result cache.
+
+        Returns:
+            Dict[str, Any]: The cache statistics, or `{"enabled": False}` without a cache.
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+    def parse_tag(self, tag: str) -> ParsedTagstyle:
         """
         Parse a tag and extract its contents based on stored tag patterns.
 
+        Contents always come from the content patterns, for GS1 Digital Link
+        tagstyles too, so they follow the stored patterns: `01/(\\d{13})`
+        yields 13 digits of a 14-digit GTIN. The tagstyle kind does not change
+        this path; `parse_digital_link` returns the complete identifier values
+        instead, but it is slower than the precompiled content patterns and
+        its values differ from theirs, so `parse_tag` does not dispatch to it.
+
+        Args:
+            tag (str): The tag to parse.
+
+        Returns:
+            ParsedTagstyle: A frozen Tagstyle with the matched entire pattern and contents.
+
+        Raises:
+            AmbiguousTagError: If multiple patterns match the tag.
+            InvalidTagError: If no patterns match the tag.
+            Exception: If a database error occurs.
+        """
+        try:
+            return self._parse_with_snapshot(self.snapshot(), tag)
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {e}")
+
+    def parse_tag_fields(self, tag: str, snapshot: Optional[TagstyleSnapshot] = None) -> ParsedTag:
+        """
+        Parse a tag into a lightweight result without building pydantic models.
+
         Args:
             tag (str): The tag to parse.
+            snapshot (TagstyleSnapshot, optional): The snapshot to parse against.
+                Defaults to the current snapshot of the store.
 
         Returns:
-            Tagstyle: A Tagstyle object with the matched entire pattern and contents.
+            ParsedTag: The name of the matched tagstyle and the extracted contents.
 
         Raises:
             AmbiguousTagError: If multiple patterns match the tag.
             InvalidTagError: If no patterns match the tag.
             Exception: If a database error occurs.
         """
+        if snapshot is not None:
+            return self._match(snapshot, tag)
         try:
-            candidates = self.match_entire_pattern(tag)
-            if len(candidates) != 1:
-                if len(candidates) > 1:
-                    raise AmbiguousTagError()
-                else:
-                    raise InvalidTagError()
-
-            tagstyle_name = list(candidates.keys())[0]
-            tagstyle_id = candidates[tagstyle_name]
-            contents = self.match_contents(tagstyle_id, tag)
-
-            items = [
-                RegexPattern(name=item_name, pattern=item_pattern)
-                for item_name, item_pattern in contents.items()
-            ]
-            parsed_tag = Tagstyle(
-                entire_pattern=RegexPattern(name=tagstyle_name, pattern=tag),
-                contents=items
-            )
-            return parsed_tag
+            return self._match(self.snapshot(), tag)
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {e}")
+
+    def parse_tags(self, tags: Iterable[str], snapshot: Optional[TagstyleSnapshot] = None
+                   ) -> Iterator[Tuple[str, Union[ParsedTagstyle, Exception]]]:
+        """
+        Parse many tags against a single tagstyle snapshot.
+
+        A tag that cannot be parsed does not abort the batch; the error
+        raised for it is yielded in place of its result instead.
 
+        Args:
+            tags (Iterable[str]): The tags to parse.
+            snapshot (TagstyleSnapshot, optional): The snapshot to parse against.
+                Defaults to the current snapshot at the time the first tag is parsed.
+
+        Yields:
+            Tuple[str, Union[ParsedTagstyle, Exception]]: Each tag paired with its parsed
+            Tagstyle, or with the AmbiguousTagError/InvalidTagError raised for it.
+
+        Raises:
+            Exception: If a database error occurs while loading the snapshot.
+        """
+        if snapshot is None:
+            try:
+                snapshot = self.snapshot()
+            except sqlite3.Error as e:
+                raise Exception(f"Database error: {e}")
+
+        for tag in tags:
+            try:
+                yield tag, self._parse_with_snapshot(snapshot, tag)
+            except Exception as e:
+                yield tag, e
+
+    def _parse_with_snapshot(self, snapshot: TagstyleSnapshot, tag: str) -> ParsedTagstyle:
+        """
+        Parse a single tag against the given snapshot, consulting the result cache.
+
+        Both parsed tags and InvalidTagError/AmbiguousTagError outcomes are
+        cached. Parsed tags are frozen, so callers can share a cached result
+        without affecting each other.
+        """
+        if self.cache is None or len(tag) > self.max_tag_length:
+            return self._parse_uncached(snapshot, tag)
+
+        found, result = self.cache.get(tag, snapshot.generation)
+        if found:
+            if isinstance(result, tuple):
+                error_type, args = result
+                raise error_type(*args)
+            return result
+
+        try:
+            result = self._parse_uncached(snapshot, tag)
+        except (AmbiguousTagError, InvalidTagError) as e:
+            # Keep the error type and message only, re-raising a stored
+            # instance would grow its traceback on every hit
+            self.cache.put(tag, (type(e), e.args), snapshot.generation)
+            raise
+        self.cache.put(tag, result, snapshot.generation)
+        return result
+
+    def _parse_uncached(self, snapshot: TagstyleSnapshot, tag: str) -> ParsedTagstyle:
+        """Parse a single tag against the given snapshot."""
+        parsed = self._match(snapshot, tag)
+        items = tuple(
+            ParsedPattern(name=item_name, pattern=item_pattern)
+            for item_name, item_pattern in parsed.contents.items()
+        )
+        return ParsedTagstyle(
+            entire_pattern=ParsedPattern(name=parsed.tagstyle, pattern=tag),
+            contents=items,
+            kind=parsed.kind
+        )
+
+    def parse_digital_link(self, tag: str) -> DigitalLink:
+        """
+        Split a GS1 Digital Link tag into its application identifier/value pairs.
+
+        The tag is resolved exactly like in `parse_tag` and must belong to a
+        tagstyle stored with the GS1 Digital Link kind. Unlike the content
+        patterns used by `parse_tag`, the pairs cover every identifier of the
+        path with its complete value, and `gtin_valid` reports whether the
+        GTIN check digit is correct.
+
+        Args:
+            tag (str): The tag to parse.
+
+        Returns:
+            DigitalLink: The host, path prefix and identifier/value pairs.
+
+        Raises:
+            AmbiguousTagError: If multiple patterns match the tag.
+            InvalidTagError: If no pattern matches the tag, its tagstyle is not a
+                GS1 Digital Link tagstyle or the tag holds no known identifiers.
+            Exception: If a database error occurs.
+        """
+        try:
+            snapshot = self.snapshot()
         except sqlite3.Error as e:
             raise Exception(f"Database error: {e}")
 
+        tagstyle_name, tagstyle_id = self._resolve(snapshot, tag)
+        if snapshot.by_id[tagstyle_id].kind != DIGITAL_LINK_KIND:
+            raise InvalidTagError(f"Tagstyle {tagstyle_name} is not a GS1 Digital Link tagstyle")
+        link = parse_digital_link(tag)
+        if link is None:
+            raise InvalidTagError("Tag holds no GS1 application identifiers")
+        return link
+
+    def _resolve(self, snapshot: TagstyleSnapshot, tag: str) -> Tuple[str, int]:
+        """Return the name and ID of the single tagstyle matching a tag."""
+        self._check_length(tag)
+        candidates = snapshot.match_entire_pattern(tag)
+        if len(candidates) != 1:
+            if len(candidates) > 1:
+                raise AmbiguousTagError()
+            else:
+                raise InvalidTagError()
+        return next(iter(candidates.items()))
+
+    def _match(self, snapshot: TagstyleSnapshot, tag: str) -> ParsedTag:
+        """Match a tag to exactly one tagstyle and extract its contents."""
+        tagstyle_name, tagstyle_id = self._resolve(snapshot, tag)
+        contents = snapshot.match_contents(tagstyle_id, tag)
+        if contents is None:
+            raise InvalidTagError("No matching tag style found.")
+        return ParsedTag(tagstyle_name, contents, snapshot.by_id[tagstyle_id].kind)
+
+    def _check_length(self, tag: str) -> None:
+        """Bound the matching cost by refusing tags longer than the patterns were checked for."""
+        if len(tag) > self.max_tag_length:
+            raise InvalidTagError(f"Tag exceeds the maximum length of {self.max_tag_length} characters")
+
     def match_entire_pattern(self, tag: str) -> Dict[str, int]:
         """
         Match the entire tag pattern against stored tag patterns.
@@ -74,13 +356,12 @@ class Parser:
 
         Returns:
             Dict[str, int]: A dictionary with tagstyle names as keys and their IDs as values.
+
+        Raises:
+            InvalidTagError: If the tag exceeds the maximum tag length.
         """
-        tagstyles_rows = self.manager.retrieve_all_tagstyles()
-        matches = {}
-        for tagstyle_id, name, pattern in tagstyles_rows:
-            if re.fullmatch(pattern, tag):
-                matches[name] = tagstyle_id
-        return matches
+        self._check_length(tag)
+        return self.snapshot().match_entire_pattern(tag)
 
     def match_contents(self, tagstyle_id: int, tag: str) -> Dict[str, str]:
         """
@@ -94,17 +375,13 @@ class Parser:
             Dict[str, str]: A dictionary of extracted contents.
 
         Raises:
-            InvalidTagError: If no matching tagstyle is found.
+            InvalidTagError: If no matching tagstyle is found or the tag is too long.
         """
-        tagstyle = self.manager.retrieve_tag_by_id(tagstyle_id)
-        if not tagstyle:
+        self._check_length(tag)
+        contents = self.snapshot().match_contents(tagstyle_id, tag)
+        if contents is None:
             raise InvalidTagError("No matching tag style found.")
 
-        contents = {}
-        for content in tagstyle.contents:
-            match = re.search(content.pattern, tag)
-            if match:
-                contents[content.name] = match.group(1)
-
         return contents
+
         
\ No newline at end of file
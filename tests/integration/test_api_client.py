@@ -0,0 +1,158 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from resolver.servicerouter.client_generator import APIClient, ClientConfig, Endpoint
+from resolver.servicerouter.health import CircuitOpenError, HealthRegistry
+from tests.stand_in_registry import StandInRegistry, openapi_document
+
+
+@pytest.fixture
+def registry():
+    with StandInRegistry(services=2) as registry:
+        yield registry
+
+
+def make_client(registry, **config) -> APIClient:
+    config.setdefault("backoff_factor", 0)
+    config.setdefault("backoff_jitter", 0)
+    return APIClient(openapi_document(0), client_id=0, root_address=f"{registry.url}/services/0",
+                     config=ClientConfig(**config))
+
+
+def test_requests_reuse_pooled_connection(registry):
+    client = make_client(registry)
+    endpoint = Endpoint(path="/items/0", method="get", tags=[])
+
+    for _ in range(5):
+        response = client.make_request(None, endpoint, serial="1234")
+
+    assert response.json()["query"] == "serial=1234"
+    assert len(registry.connections) == 1
+    client.close()
+
+
+@pytest.mark.parametrize("method", ["post", "put", "patch"])
+def test_body_methods_send_json(registry, method):
+    client = make_client(registry)
+    endpoint = Endpoint(path="/items/0/events", method=method, tags=[])
+
+    response = client.make_request(None, endpoint, data={"name": "repair"}, params={"dry": "1"})
+
+    assert response.json() == {"method": method.upper(), "path": "/services/0/items/0/events",
+                               "query": "dry=1", "json": {"name": "repair"}}
+
+
+def test_delete_is_supported(registry):
+    client = make_client(registry)
+    response = client.make_request(None, Endpoint(path="/items/0", method="delete", tags=[]))
+    assert response.json()["method"] == "DELETE"
+
+
+def test_unsupported_method_is_rejected(registry):
+    client = make_client(registry)
+    with pytest.raises(ValueError):
+        client.make_request(None, Endpoint(path="/items/0", method="trace", tags=[]))
+
+
+def test_idempotent_requests_are_retried(registry):
+    registry.flaky[0] = 2
+    client = make_client(registry, retries=2)
+
+    response = client.make_request(None, Endpoint(path="/items/0", method="get", tags=[]))
+
+    assert response.status_code == 200
+    assert registry.flaky[0] == 0
+
+
+def test_post_is_not_retried(registry):
+    registry.flaky[0] = 1
+    client = make_client(registry, retries=2)
+
+    with pytest.raises(SystemError, match="503"):
+        client.make_request(None, Endpoint(path="/items/0/events", method="post", tags=[]), data={})
+
+
+def test_retries_are_bounded(registry):
+    registry.flaky[0] = 5
+    client = make_client(registry, retries=1)
+
+    with pytest.raises(SystemError, match="503"):
+        client.make_request(None, Endpoint(path="/items/0", method="get", tags=[]))
+    assert registry.flaky[0] == 3
+
+
+def test_sessions_are_kept_per_root_address(registry):
+    client = make_client(registry)
+    assert client.session(f"{registry.url}/services/0") is client.session(f"{registry.url}/services/1/")
+    assert client.session("http://other.example.org") is not client.session(registry.url)
+
+
+def test_cached_responses_spare_the_provider(registry):
+    registry.cache_control[0] = "max-age=60"
+    client = make_client(registry)
+    endpoint = Endpoint(path="/items/0", method="get", tags=[])
+
+    responses = [client.make_request(None, endpoint, serial=serial) for serial in ["1", "1", "2", "1"]]
+
+    assert registry.echoes == 2
+    assert responses[0] is responses[1] is responses[3]
+    assert responses[2].json()["query"] == "serial=2"
+
+
+def test_uncacheable_responses_and_posts_are_not_cached(registry):
+    client = make_client(registry, cache_ttls={"/items/0/events": 60})
+    for _ in range(2):
+        client.make_request(None, Endpoint(path="/items/0", method="get", tags=[]))
+        client.make_request(None, Endpoint(path="/items/0/events", method="post", tags=[]), data={})
+    assert registry.echoes == 4
+
+
+def test_filled_paths_are_cached_for_their_template(registry):
+    client = make_client(registry, cache_ttls={"/items/{serial}": 60})
+    endpoint = Endpoint(path="/items/{serial}", method="get", tags=[])
+
+    responses = [client.make_request(None, endpoint, url_path=f"/items/{serial}") for serial in (1, 1, 2)]
+
+    assert registry.echoes == 2
+    assert responses[0] is responses[1]
+    assert responses[2].json()["path"] == "/services/0/items/2"
+
+
+def test_concurrent_identical_requests_are_coalesced(registry):
+    registry.echo_delay = 0.2
+    client = make_client(registry)
+    endpoint = Endpoint(path="/items/0", method="get", tags=[])
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        responses = list(executor.map(lambda _: client.make_request(None, endpoint, serial="1"), range(10)))
+
+    assert registry.echoes == 1
+    assert all(response.json()["query"] == "serial=1" for response in responses)
+
+
+def test_calls_are_recorded_and_failing_providers_are_cut_off(registry):
+    health = HealthRegistry(failure_threshold=2, cooldown=60)
+    client = APIClient(openapi_document(0), client_id=0, root_address=f"{registry.url}/services/0",
+                       config=ClientConfig(retries=0), health=health)
+    endpoint = Endpoint(path="/items/0", method="get", tags=[])
+
+    client.make_request(None, endpoint)
+    registry.flaky[0] = 5
+    for _ in range(2):
+        with pytest.raises(SystemError, match="503"):
+            client.make_request(None, endpoint)
+    requests_before = registry.requests
+    with pytest.raises(CircuitOpenError):
+        client.make_request(None, endpoint)
+
+    assert registry.requests == requests_before
+    stats = health.stats()[f"{registry.url}/services/0"]
+    assert stats["state"] == "open"
+    assert (stats["calls"], stats["failures"]) == (3, 2)
+
+
+def test_client_errors_do_not_count_as_failures(registry):
+    health = HealthRegistry(failure_threshold=1)
+    client = APIClient(openapi_document(0), client_id=0, root_address=f"{registry.url}/unknown", health=health)
+    with pytest.raises(SystemError, match="404"):
+        client.make_request(None, Endpoint(path="/items/0", method="get", tags=[]))
+    assert health.stats()[f"{registry.url}/unknown"]["state"] == "closed"
@@ -0,0 +1,178 @@
+import asyncio
+import time
+import pytest
+from resolver.servicerouter.artefacts import ArtefactStore
+from resolver.servicerouter.async_discovery import AsyncServiceDiscovery
+from resolver.servicerouter.client_generator import Endpoint
+from resolver.servicerouter.service_discovery import ServiceDiscovery
+from tests.stand_in_registry import StandInRegistry
+
+
+@pytest.fixture(autouse=True)
+def discovery_dir(tmp_path, monkeypatch):
+    # Artefacts are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def test_generate_clients_fetches_concurrently():
+    with StandInRegistry(services=8, latency=0.2) as registry:
+        discovery = ServiceDiscovery(registry.registry_endpoint, max_workers=8)
+        services = discovery.fetch_services()
+
+        start = time.monotonic()
+        clients = discovery.generate_clients(services)
+        elapsed = time.monotonic() - start
+
+    assert [client.client_id for client in clients] == list(range(8))
+    assert discovery.errors == []
+    # Sequential fetching would take at least 8 * 0.2s
+    assert elapsed < 1.0
+
+
+def test_generate_clients_reports_failures_and_keeps_partial_results():
+    with StandInRegistry(services=4, failures={1: 500}, hang={2}) as registry:
+        discovery = ServiceDiscovery(registry.registry_endpoint, read_timeout=0.3)
+        services = discovery.fetch_services()
+        clients = discovery.generate_clients(services)
+
+    assert [client.client_id for client in clients] == [0, 3]
+    errors = {error.id: error for error in discovery.errors}
+    assert set(errors) == {1, 2}
+    assert "500" in errors[1].error
+    assert "timed out" in errors[2].error.lower()
+    assert errors[2].apiDocumentationAdress.endswith("/services/2/openapi.json")
+
+
+def test_generate_clients_stops_at_deadline():
+    with StandInRegistry(services=3, delays={1: 1.5}) as registry:
+        discovery = ServiceDiscovery(registry.registry_endpoint, read_timeout=5, deadline=0.5)
+        services = discovery.fetch_services()
+
+        start = time.monotonic()
+        clients = discovery.generate_clients(services)
+        elapsed = time.monotonic() - start
+        # Let the abandoned fetch finish; its client must not be kept
+        time.sleep(1.5)
+
+    assert [client.client_id for client in clients] == [0, 2]
+    assert [error.id for error in discovery.errors] == [1]
+    assert "Deadline" in discovery.errors[0].error
+    assert elapsed < 1.0
+    assert set(discovery._clients) == {0, 2}
+
+
+def test_refresh_of_unchanged_network_uses_conditional_requests():
+    with StandInRegistry(services=3) as registry:
+        discovery = ServiceDiscovery(registry.registry_endpoint)
+        services = discovery.fetch_services()
+        clients = discovery.generate_clients(services)
+        assert registry.full_responses == 4
+
+        registry.versions[1] = 1
+        refreshed_services = discovery.fetch_services()
+        refreshed = discovery.generate_clients(refreshed_services)
+
+    # Only the changed schema is downloaded and parsed again
+    assert registry.not_modified == 3
+    assert registry.full_responses == 5
+    assert refreshed_services is services
+    assert refreshed[0] is clients[0] and refreshed[2] is clients[2]
+    assert refreshed[1] is not clients[1]
+    assert refreshed[1].openapi_schema["info"]["version"] == "0.1.1"
+
+
+def test_stored_artefacts_are_reused_by_a_new_discovery(tmp_path):
+    with StandInRegistry(services=2) as registry:
+        ServiceDiscovery(registry.registry_endpoint).generate_clients(
+            ServiceDiscovery(registry.registry_endpoint).fetch_services())
+        schema_file = tmp_path / "resolver/data/discovery/services/Service_0/openapi.json"
+        written = schema_file.stat().st_mtime_ns
+
+        discovery = ServiceDiscovery(registry.registry_endpoint)
+        clients = discovery.generate_clients(discovery.fetch_services())
+
+    assert registry.not_modified == 3
+    assert len(clients) == 2
+    assert schema_file.stat().st_mtime_ns == written
+    assert (tmp_path / "resolver/data/discovery/services/Service_0/meta.json").exists()
+
+
+
+def test_snapshot_restores_the_network_without_requests(tmp_path):
+    with StandInRegistry(services=3) as registry:
+        discovery = ServiceDiscovery(registry.registry_endpoint)
+        services = discovery.fetch_services()
+        discovery.generate_clients(services)
+        discovery.save_snapshot(str(tmp_path / "network.snapshot"), services)
+        requests_before = registry.requests
+
+        restored = ServiceDiscovery(registry.registry_endpoint).load_snapshot(str(tmp_path / "network.snapshot"))
+        assert registry.requests == requests_before
+
+        refreshed = ServiceDiscovery(registry.registry_endpoint)
+        restored_again = refreshed.load_snapshot(str(tmp_path / "network.snapshot"))
+        refreshed_services = refreshed.fetch_services()
+        clients = refreshed.generate_clients(refreshed_services)
+
+    assert restored.services == services
+    assert [client.client_id for client in restored.clients] == [0, 1, 2]
+    assert [endpoint.path for endpoint in restored.clients[1].endpoints] == ["/items/1", "/items/1/events"]
+    # Revalidating the restored network costs 304s and keeps the restored clients
+    assert refreshed_services is restored_again.services
+    assert clients == restored_again.clients
+    assert registry.full_responses == 4
+
+
+def test_unusable_snapshots_are_ignored(tmp_path):
+    discovery = ServiceDiscovery("http://127.0.0.1:9/registry.json")
+    assert discovery.load_snapshot(str(tmp_path / "missing.snapshot")) is None
+    (tmp_path / "broken.snapshot").write_bytes(b"not a snapshot")
+    assert discovery.load_snapshot(str(tmp_path / "broken.snapshot")) is None
+
+
+def test_stored_artefacts_restore_the_network_without_snapshot():
+    with StandInRegistry(services=2, failures={1: 500}) as registry:
+        discovery = ServiceDiscovery(registry.registry_endpoint)
+        discovery.generate_clients(discovery.fetch_services())
+
+    restored = ServiceDiscovery("http://127.0.0.1:9/registry.json").load_stored()
+
+    assert [service.id for service in restored.services] == [0, 1]
+    assert [client.client_id for client in restored.clients] == [0]
+    assert ServiceDiscovery("http://127.0.0.1:9/registry.json", store=ArtefactStore("elsewhere")).load_stored() is None
+
+
+def test_async_discovery_keeps_hundreds_of_requests_in_flight():
+    async def scenario(registry):
+        async with AsyncServiceDiscovery(registry.registry_endpoint) as discovery:
+            services = await discovery.fetch_services()
+            clients = await discovery.generate_clients(services)
+            endpoint = Endpoint(path="/items/0", method="get", tags=[])
+            start = time.monotonic()
+            responses = await asyncio.gather(*(clients[index % len(clients)].make_request(None, endpoint)
+                                               for index in range(300)))
+            return clients, responses, time.monotonic() - start
+
+    with StandInRegistry(services=5, latency=0.3) as registry:
+        clients, responses, elapsed = asyncio.run(scenario(registry))
+
+    assert [client.client_id for client in clients] == list(range(5))
+    assert all(response.status_code == 200 for response in responses)
+    # 300 sequential requests would take 90s
+    assert elapsed < 10
+
+
+def test_async_discovery_reports_failures_and_reuses_clients():
+    async def scenario(registry):
+        async with AsyncServiceDiscovery(registry.registry_endpoint, read_timeout=0.3) as discovery:
+            first = await discovery.generate_clients(await discovery.fetch_services())
+            errors = discovery.errors
+            second = await discovery.generate_clients(await discovery.fetch_services())
+            return first, errors, second
+
+    with StandInRegistry(services=3, failures={1: 500}, hang={2}) as registry:
+        first, errors, second = asyncio.run(scenario(registry))
+
+    assert [client.client_id for client in first] == [0]
+    assert {error.id for error in errors} == {1, 2}
+    assert second[0] is first[0]
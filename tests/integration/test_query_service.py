@@ -1,18 +1,25 @@
 import pytest
 import json
+import os
+import time
 from unittest.mock import patch, MagicMock
 from resolver.servicerouter.service_discovery import ServiceDiscovery, ServiceAPI
-from resolver.query_services import QueryEngine
+from resolver.query_services import QueryEngine, fill_path
+from resolver.servicerouter.client_generator import Endpoint
+from resolver.servicerouter.health import CircuitOpenError
+from resolver.tagparser.tagparser import ParsedTag
+from tests.stand_in_registry import StandInRegistry
 
 @pytest.fixture
 def mock_services():
     mock_response_file = './resolver/data/registry.json'
     with open(mock_response_file, 'r') as file:
-        return json.load(file)
+        registry = json.load(file)
+    return [ServiceAPI(**{**info, "id": int(info["id"])}, serviceName=name) for name, info in registry.items()]
 
 @pytest.fixture
-def mock_clients():
-    return [MagicMock(), MagicMock()]
+def mock_clients(mock_services):
+    return [MagicMock(client_id=service.id) for service in mock_services]
 
 def test_query_engine_init(mock_services, mock_clients):
     with patch.object(ServiceDiscovery, 'fetch_services', return_value=mock_services), \
@@ -37,3 +44,213 @@ def test_update_network(mock_services, mock_clients):
         assert result is True
         assert len(query_engine.services) == len(mock_services)
         assert len(query_engine.clients) == len(mock_clients)
+
+def test_update_network_only_rebuilds_changed_services(mock_services, mock_clients):
+    with patch.object(ServiceDiscovery, 'fetch_services', return_value=mock_services) as fetch_services, \
+         patch.object(ServiceDiscovery, 'generate_clients', return_value=mock_clients) as generate_clients:
+        query_engine = QueryEngine("http://registry.com")
+        catalogue = query_engine.catalogue
+
+        query_engine.update_network()
+        assert generate_clients.call_count == 1
+        assert query_engine.clients == catalogue.clients
+
+        changed = mock_services[1].model_copy(update={"version": "0.2.0"})
+        added = mock_services[0].model_copy(update={"id": 4, "serviceName": "Added Service"})
+        fetch_services.return_value = [mock_services[0], changed, added]
+        new_clients = [MagicMock(client_id=3), MagicMock(client_id=4)]
+        generate_clients.return_value = new_clients
+
+        query_engine.update_network()
+
+    assert generate_clients.call_args.args[0] == [changed, added]
+    assert query_engine.catalogue is not catalogue
+    assert query_engine.clients == [mock_clients[0], *new_clients]
+    assert query_engine.catalogue.clients_by_id[3] is new_clients[0]
+
+
+def test_update_network_drops_removed_and_retries_failed_services(mock_services, mock_clients):
+    with patch.object(ServiceDiscovery, 'fetch_services', return_value=mock_services) as fetch_services, \
+         patch.object(ServiceDiscovery, 'generate_clients', return_value=mock_clients[:1]) as generate_clients:
+        query_engine = QueryEngine("http://registry.com")
+        assert query_engine.clients == mock_clients[:1]
+
+        generate_clients.return_value = mock_clients[1:]
+        query_engine.update_network()
+        # The service whose client failed is retried even though it did not change
+        assert generate_clients.call_args.args[0] == mock_services[1:]
+        assert query_engine.clients == mock_clients
+
+        fetch_services.return_value = mock_services[:1]
+        query_engine.update_network()
+
+    assert query_engine.services == mock_services[:1]
+    assert query_engine.clients == mock_clients[:1]
+
+
+def test_refresher_refreshes_in_background(mock_services, mock_clients):
+    with patch.object(ServiceDiscovery, 'fetch_services', return_value=mock_services) as fetch_services, \
+         patch.object(ServiceDiscovery, 'generate_clients', return_value=mock_clients):
+        query_engine = QueryEngine("http://registry.com")
+        query_engine.start_refresher(0.01, jitter=0.5)
+        deadline = time.monotonic() + 5
+        while fetch_services.call_count < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        query_engine.stop_refresher()
+
+    assert fetch_services.call_count >= 3
+    assert query_engine.refresher is None
+
+
+def test_call_provider_prefers_healthy_providers_and_fails_over(mock_services, mock_clients):
+    for service, client in zip(mock_services, mock_clients):
+        client.root_address = service.rootAddress
+    with patch.object(ServiceDiscovery, 'fetch_services', return_value=mock_services), \
+         patch.object(ServiceDiscovery, 'generate_clients', return_value=mock_clients):
+        query_engine = QueryEngine("http://registry.com")
+    health = query_engine.discovery.health
+
+    health.record(mock_services[0].rootAddress, 1.0, failed=False)
+    health.record(mock_services[1].rootAddress, 0.1, failed=False)
+    assert query_engine.call_provider(mock_services, lambda client: client.client_id) == 3
+
+    def call(client):
+        if client.client_id == 3:
+            raise SystemError("provider down")
+        return client.client_id
+
+    assert query_engine.call_provider(mock_services, call) == 2
+
+    for _ in range(health.failure_threshold):
+        health.record(mock_services[0].rootAddress, 0.1, failed=True)
+    with pytest.raises(SystemError, match="provider down"):
+        query_engine.call_provider(mock_services, call)
+    with pytest.raises(CircuitOpenError):
+        query_engine.call_provider(mock_services[:1], call)
+
+
+@pytest.fixture
+def network(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with StandInRegistry(services=3) as registry:
+        parser = MagicMock()
+        parser.parse_tag_fields.return_value = ParsedTag("items", {"serial": "42"})
+        yield registry, QueryEngine(registry.registry_endpoint, parser=parser, request_deadline=5)
+
+
+def test_data_request_fans_out_to_all_providers(network):
+    registry, query_engine = network
+    registry.echo_delay = 0.2
+
+    start = time.monotonic()
+    response = query_engine.formulate_data_request("operator", "tag-42", mode="all")
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5
+    assert response.complete and not response.errors
+    assert sorted(result.id for result in response.results) == [0, 1, 2]
+    assert all(result.data["query"] == "serial=42" for result in response.results)
+    assert response.data["method"] == "GET"
+
+
+def test_first_mode_returns_the_fastest_answer(network):
+    registry, query_engine = network
+    registry.echo_delays.update({0: 1.0, 1: 1.0})
+
+    start = time.monotonic()
+    response = query_engine.formulate_data_request("operator", "tag-42", mode="first")
+
+    assert time.monotonic() - start < 0.8
+    assert [result.id for result in response.results] == [2]
+    assert response.data["path"] == "/services/2/items/2"
+
+
+def test_quorum_mode_waits_for_enough_answers(network):
+    registry, query_engine = network
+    registry.echo_delays[0] = 1.0
+
+    response = query_engine.formulate_data_request("operator", "tag-42", mode="quorum", quorum=2)
+
+    assert response.complete
+    assert sorted(result.id for result in response.results) == [1, 2]
+    with pytest.raises(ValueError):
+        query_engine.formulate_data_request("operator", "tag-42", mode="quorum")
+    with pytest.raises(ValueError):
+        query_engine.formulate_data_request("operator", "tag-42", mode="some")
+
+
+def test_deadline_cuts_off_slow_providers(network):
+    registry, query_engine = network
+    registry.echo_delays[1] = 2.0
+    query_engine.catalogue.clients_by_id[2].make_request = MagicMock(side_effect=SystemError("provider down"))
+
+    start = time.monotonic()
+    response = query_engine.formulate_data_request("operator", "tag-42", mode="all", deadline=0.5)
+
+    assert time.monotonic() - start < 1.0
+    assert not response.complete
+    assert [result.id for result in response.results] == [0]
+    assert sorted((error.id, error.error) for error in response.errors) == [
+        (1, "Deadline of 0.5s exceeded"), (2, "provider down")]
+
+
+def test_results_stream_as_they_arrive(network):
+    registry, query_engine = network
+    registry.echo_delays.update({0: 0.4, 1: 0.2})
+
+    arrivals = [result.id for result in query_engine.stream_data_request("operator", "tag-42")]
+
+    assert arrivals == [2, 1, 0]
+
+
+def test_term_selects_the_endpoints(network):
+    _, query_engine = network
+    _, calls = query_engine.data_calls("tag-42", term="events")
+    assert calls == []
+    _, calls = query_engine.data_calls("tag-42", term="items")
+    assert [call.endpoint.path for call in calls] == ["/items/0", "/items/1", "/items/2"]
+
+
+def test_fill_path_encodes_substituted_values():
+    endpoint = Endpoint(path="/items/{serial}/{lot}", method="get", tags=[])
+    path, params = fill_path(endpoint, {"serial": "../admin?x=1#", "batch": "7"})
+    assert path == "/items/..%2Fadmin%3Fx%3D1%23/{lot}"
+    assert endpoint.path == "/items/{serial}/{lot}"
+    assert params == {"batch": "7"}
+
+
+def test_warm_start_serves_the_stored_network_and_revalidates(network, tmp_path):
+    registry, query_engine = network
+    snapshot_path = str(tmp_path / "network.snapshot")
+    parser = query_engine.parser
+    QueryEngine(registry.registry_endpoint, parser=parser, snapshot_path=snapshot_path)
+    assert os.path.exists(snapshot_path)
+
+    offline = QueryEngine("http://127.0.0.1:9/registry.json", parser=parser, snapshot_path=snapshot_path,
+                          warm_start=True)
+    assert offline.warm
+    assert [client.client_id for client in offline.clients] == [0, 1, 2]
+    assert offline.formulate_data_request("operator", "tag-42", mode="all").complete
+
+    requests_before, full_responses = registry.requests, registry.full_responses
+    engine = QueryEngine(registry.registry_endpoint, parser=parser, snapshot_path=snapshot_path, warm_start=True)
+    assert registry.requests == requests_before
+    clients = engine.clients
+    registry.services = 4
+    engine.revalidate_in_background().join(5)
+
+    # Only the added service is discovered, the restored clients are kept
+    assert not engine.warm
+    assert engine.clients[:3] == clients
+    assert engine.clients[3].client_id == 3
+    assert registry.full_responses - full_responses == 2
+
+
+def test_warm_start_falls_back_to_discovery(network, tmp_path):
+    registry, query_engine = network
+    snapshot_path = str(tmp_path / "elsewhere" / "network.snapshot")
+    engine = QueryEngine(registry.registry_endpoint, parser=query_engine.parser, snapshot_path=snapshot_path,
+                         warm_start=True)
+    # The artefact store of the first engine is read instead of the missing snapshot
+    assert engine.warm
+    assert len(engine.clients) == 3
@@ -0,0 +1,201 @@
+"""
+Local stand-in for the service registry and the services' OpenAPI documents.
+
+Serves `/registry.json` in the format of `resolver/data/registry.json` and one
+`/services/<id>/openapi.json` per registered service. Individual services can be
+made slow, fail with a status code, or hang past any read timeout, so discovery
+can be tested and benchmarked without the network.
+
+Every other path below `/services/<id>/` is a service API echoing the method,
+path, query and JSON body of the request. `flaky[id]` makes a service answer
+503 that many times before succeeding, and `connections` records the client
+ports seen, so connection reuse and retries can be checked. Echo responses
+carry `cache_control[id]` as their `Cache-Control` header, and `echo_delay`,
+or `echo_delays[id]` for a single service, slows them down so concurrent calls overlap.
+
+Responses carry an `ETag` derived from their content and honour
+`If-None-Match` with 304, so conditional refreshes can be observed through
+the `full_responses` and `not_modified` counters. Bump `versions[id]` to
+change a service's schema.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+
+
+def openapi_document(service_id: int, version: int = 0) -> dict:
+    """Return a small OpenAPI document with one GET and one POST endpoint."""
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": f"Service {service_id}", "version": f"0.1.{version}"},
+        "paths": {
+            f"/items/{service_id}": {"get": {"tags": ["items"], "parameters": []}},
+            f"/items/{service_id}/events": {
+                "post": {
+                    "tags": ["events"],
+                    "requestBody": {"content": {"application/json": {
+                        "schema": {"$ref": "#/components/schemas/Event"}}}},
+                }
+            },
+        },
+        "components": {"schemas": {"Event": {"type": "object", "properties": {"name": {"type": "string"}}}}},
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept bursts of hundreds of concurrent connections without dropping SYNs
+    request_queue_size = 1024
+
+
+class StandInRegistry:
+    """
+    A threaded HTTP server on a free local port, usable as a context manager.
+
+    Args:
+        services (int): Number of registered services.
+        latency (float): Seconds every schema response is delayed by.
+        delays (Dict[int, float], optional): Per-service delays overriding `latency`.
+        failures (Dict[int, int], optional): Status codes returned instead of a schema.
+        hang (Set[int], optional): Services whose schema never arrives while the server runs.
+    """
+
+    def __init__(self, services: int = 10, latency: float = 0.0, delays: Optional[Dict[int, float]] = None,
+                 failures: Optional[Dict[int, int]] = None, hang: Optional[Set[int]] = None):
+        self.services = services
+        self.latency = latency
+        self.delays = delays or {}
+        self.failures = failures or {}
+        self.hang = hang or set()
+        self.versions: Dict[int, int] = {}
+        self.flaky: Dict[int, int] = {}
+        self.connections: Set[int] = set()
+        self.cache_control: Dict[int, str] = {}
+        self.echo_delay = 0.0
+        self.echo_delays: Dict[int, float] = {}
+        self.echoes = 0
+        self.requests = 0
+        self.full_responses = 0
+        self.not_modified = 0
+        self._counter_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def registry_endpoint(self) -> str:
+        return f"{self.url}/registry.json"
+
+    def registry(self) -> dict:
+        """Return the registry document listing every service."""
+        return {
+            f"Service {index}": {
+                "id": str(index),
+                "rootAddress": f"{self.url}/services/{index}",
+                "apiDocumentationAdress": f"{self.url}/services/{index}/openapi.json",
+                "serviceType": "data provider",
+                "serviceTags": ["stand-in"],
+                "serviceOwner": "Stand-in",
+                "maintainerContact": "stand-in@example.org",
+                "maintainanceStatus": "maintained",
+                "sourceCode": "https://example.org/stand-in",
+                "version": "0.1.0",
+                "lastUpdated": "01.01.2024",
+            }
+            for index in range(self.services)
+        }
+
+    def _count(self, counter: str) -> None:
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _handler(self):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                registry._count("requests")
+                registry.connections.add(self.client_address[1])
+                parts = self.path.partition("?")[0].strip("/").split("/")
+                if parts == ["registry.json"]:
+                    return self._send(200, registry.registry())
+                if len(parts) == 3 and parts[0] == "services" and parts[2] == "openapi.json" and parts[1].isdigit():
+                    service_id = int(parts[1])
+                    if service_id in registry.hang:
+                        registry._stopped.wait()
+                        return
+                    time.sleep(registry.delays.get(service_id, registry.latency))
+                    if service_id in registry.failures:
+                        return self._send(registry.failures[service_id], {"detail": "stand-in failure"})
+                    return self._send(200, openapi_document(service_id, registry.versions.get(service_id, 0)))
+                if len(parts) > 2 and parts[0] == "services" and parts[1].isdigit():
+                    return self._echo(int(parts[1]))
+                self._send(404, {"detail": "Not Found"})
+
+            def _echo(self, service_id: int):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with registry._counter_lock:
+                    remaining = registry.flaky.get(service_id, 0)
+                    if remaining:
+                        registry.flaky[service_id] = remaining - 1
+                if remaining:
+                    return self._send(503, {"detail": "stand-in unavailable"})
+                registry._count("echoes")
+                time.sleep(registry.echo_delays.get(service_id, registry.echo_delay))
+                path, _, query = self.path.partition("?")
+                self._send(200, {"method": self.command, "path": path, "query": query, "json": body},
+                           registry.cache_control.get(service_id))
+
+            do_POST = do_PUT = do_PATCH = do_DELETE = do_GET
+
+            def _send(self, status: int, body: dict, cache_control: Optional[str] = None):
+                payload = json.dumps(body).encode()
+                etag = f'"{hashlib.sha256(payload).hexdigest()[:16]}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    registry._count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if status == 200:
+                    registry._count("full_responses")
+                self.send_response(status)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                if cache_control:
+                    self.send_header("Cache-Control", cache_control)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StandInRegistry":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInRegistry":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -16,6 +16,7 @@ def read_json_and_get_tags(json_file_path) -> List[Tagstyle]:
             RegexPattern(name=content_name, pattern=content_pattern)
             for content_name, content_pattern in tag_data["contents"].items()
         ]
-        sample_tags.append(Tagstyle(entire_pattern=entire_pattern, contents=contents))
+        sample_tags.append(Tagstyle(entire_pattern=entire_pattern, contents=contents,
+                                    kind=tag_data.get("kind", "regex")))
 
     return sample_tags
\ No newline at end of file
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from resolver import api
+from resolver.api import app, get_parser
+from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
+from resolver.tagparser.tagparser import Parser
+
+
+@pytest.fixture
+def sample_tagstyles():
+    return [
+        (1, Tagstyle(
+            entire_pattern=RegexPattern(name="example_tag", pattern=r"http://example.com/\d+"),
+            contents=[RegexPattern(name="id", pattern=r"http://example.com/(\d+)")]
+        )),
+        (2, Tagstyle(
+            entire_pattern=RegexPattern(name="other_tag", pattern=r"http://example.com/1\d*"),
+            contents=[]
+        )),
+    ]
+
+
+@pytest.fixture
+def client(sample_tagstyles):
+    parser = Parser()
+    app.dependency_overrides[get_parser] = lambda: parser
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=sample_tagstyles):
+        yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_parse_batch_json_array(client):
+    response = client.post("/tags/parse/batch", json=["http://example.com/2345", "http://example.com/12", "nope", 3])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = read_ndjson(response)
+    assert [record["index"] for record in records] == [0, 1, 2, 3]
+    assert records[0]["result"]["entire_pattern"]["name"] == "example_tag"
+    assert records[0]["result"]["contents"] == [{"name": "id", "pattern": "2345"}]
+    assert records[1]["error"]["type"] == "AmbiguousTagError"
+    assert records[2]["error"]["type"] == "InvalidTagError"
+    assert records[3]["error"]["type"] == "InvalidItemError"
+
+
+def test_parse_batch_ndjson(client):
+    body = "\n".join(json.dumps(f"http://example.com/2{i}") for i in range(600)) + "\n{broken\n"
+    response = client.post("/tags/parse/batch", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+    records = read_ndjson(response)
+    assert len(records) == 601
+    assert all("result" in record for record in records[:600])
+    assert records[599]["tag"] == "http://example.com/2599"
+    assert records[600]["error"]["type"] == "InvalidItemError"
+
+
+def test_batch_stream_stops_when_client_disconnects():
+    sent = []
+
+    async def endless():
+        while True:
+            yield b"{}\n"
+            await asyncio.sleep(0.01)
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        body_received = asyncio.Event()
+        body_received.set()
+        await asyncio.wait_for(api.DuplexStreamingResponse(endless(), body_received)({"type": "http"}, receive, send), 1)
+
+    asyncio.run(run())
+    assert 1 < len(sent) < 20
+
+
+def test_parse_batch_stops_when_client_disconnects_during_upload(client):
+    messages = [
+        {"type": "http.request", "body": json.dumps("http://example.com/1").encode() + b"\n", "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/tags/parse/batch", "query_string": b"",
+             "headers": [(b"content-type", b"application/x-ndjson")], "asgi": {"version": "3.0"}}
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), 1))
+    # The client left before the first result, so not even the status line was sent
+    assert sent == []
+
+
+def test_parse_batch_rejects_overlong_ndjson_lines(client):
+    line = json.dumps("x" * api.MAX_NDJSON_LINE)
+    response = client.post("/tags/parse/batch", content=line, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 413
+
+    body = "\n".join(json.dumps(f"http://example.com/2{i}") for i in range(300)) + "\n" + line
+    response = client.post("/tags/parse/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    records = read_ndjson(response)
+    assert len(records) == api.BATCH_CHUNK_SIZE + 1
+    assert records[-1]["error"]["status"] == 413
+
+
+def test_parse_batch_rejects_non_array(client):
+    response = client.post("/tags/parse/batch", json={"tag": "http://example.com/2345"})
+    assert response.status_code == 422
+
+
+def test_import_tags():
+    catalogue = {
+        "sample pattern": {"ENTIRE_PATTERN": r"TE\d+", "contents": {"number": r"TE(\d+)"}},
+        "bare pattern": {"ENTIRE_PATTERN": r"\d+", "contents": {}},
+    }
+    with patch.object(DatabaseManagement, 'add_tags', return_value=True) as add_tags:
+        response = TestClient(app).post("/tags/import", json=catalogue)
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    imported = add_tags.call_args.args[0]
+    assert [tag.entire_pattern.name for tag in imported] == ["sample pattern", "bare pattern"]
+    assert imported[0].contents == [RegexPattern(name="number", pattern=r"TE(\d+)")]
+
+
+def test_add_unsafe_tag_is_rejected():
+    tag = {"entire_pattern": {"name": "unsafe", "pattern": r"(a+)+b"}, "contents": []}
+    response = TestClient(app).post("/tags/", json=tag)
+    assert response.status_code == 422
+    assert "nested quantifier" in response.json()["detail"]
+
+
+def test_lifespan_warms_up_parser(tmp_path, monkeypatch, sample_tagstyles):
+    snapshot_path = tmp_path / "tagstyles.snapshot"
+    monkeypatch.setenv("RESOLVER_SNAPSHOT_PATH", str(snapshot_path))
+    monkeypatch.delenv("RESOLVER_REGISTRY_ENDPOINT", raising=False)
+    monkeypatch.setattr(api, "parser", Parser())
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=sample_tagstyles):
+        with TestClient(app):
+            assert api.parser._snapshot is not None
+        assert snapshot_path.exists()
+        assert Parser().load_snapshot(str(snapshot_path))
+
+
+def test_warm_up_keeps_a_current_snapshot(tmp_path, monkeypatch, sample_tagstyles):
+    monkeypatch.setenv("RESOLVER_SNAPSHOT_PATH", str(tmp_path / "tagstyles.snapshot"))
+    monkeypatch.delenv("RESOLVER_REGISTRY_ENDPOINT", raising=False)
+    monkeypatch.setattr(api, "parser", Parser())
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=sample_tagstyles):
+        api.warm_up()
+        inherited = api.parser._snapshot
+        with patch.object(Parser, 'load_snapshot') as load_snapshot:
+            api.warm_up()
+    load_snapshot.assert_not_called()
+    assert api.parser._snapshot is inherited
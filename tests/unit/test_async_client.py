@@ -0,0 +1,95 @@
+import asyncio
+import json
+import httpx
+import pytest
+from resolver.servicerouter.async_client import AsyncAPIClient
+from resolver.servicerouter.client_generator import APIClient, ClientConfig, Endpoint, EndpointFilterCriteria
+
+with open('resolver/data/openapi.json', 'r') as file:
+    mock_openapi_schema = json.load(file)
+
+NO_BACKOFF = ClientConfig(backoff_factor=0, backoff_jitter=0, retries=2)
+
+
+def make_client(handler, config=NO_BACKOFF) -> AsyncAPIClient:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncAPIClient(mock_openapi_schema, client_id=1, root_address="http://provider.test/",
+                          config=config, http_client=http_client)
+
+
+def test_shares_endpoint_model_with_sync_client():
+    client = make_client(lambda request: httpx.Response(200))
+    sync_client = APIClient(mock_openapi_schema)
+    criteria = EndpointFilterCriteria(tags="example-tag")
+
+    assert [e.path for e in client.filter_endpoints(criteria)] == [e.path for e in sync_client.filter_endpoints(criteria)]
+
+
+def test_get_sends_query_parameters():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={"ok": True})
+
+    client = make_client(handler)
+    response = asyncio.run(client.make_request(None, Endpoint(path="/example", method="get", tags=[]), id="7"))
+
+    assert response.json() == {"ok": True}
+    assert str(seen[0].url) == "http://provider.test/example?id=7"
+
+
+def test_post_sends_json_body():
+    def handler(request):
+        return httpx.Response(200, json={"method": request.method, "body": json.loads(request.content)})
+
+    client = make_client(handler)
+    response = asyncio.run(client.make_request(None, Endpoint(path="/test", method="post", tags=[]),
+                                               data={"name": "a"}))
+
+    assert response.json() == {"method": "POST", "body": {"name": "a"}}
+
+
+def test_idempotent_request_is_retried_on_unavailable():
+    statuses = [503, 502, 200]
+
+    client = make_client(lambda request: httpx.Response(statuses.pop(0)))
+    response = asyncio.run(client.make_request(None, Endpoint(path="/example", method="get", tags=[])))
+
+    assert response.status_code == 200
+    assert statuses == []
+
+
+def test_post_is_not_retried_on_unavailable():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = make_client(handler)
+    with pytest.raises(SystemError, match="503"):
+        asyncio.run(client.make_request(None, Endpoint(path="/test", method="post", tags=[]), data={}))
+    assert len(calls) == 1
+
+
+def test_connect_errors_are_retried_for_any_method():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+    client = make_client(handler)
+    response = asyncio.run(client.make_request(None, Endpoint(path="/test", method="post", tags=[]), data={}))
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_unsupported_method_is_rejected():
+    client = make_client(lambda request: httpx.Response(200))
+    with pytest.raises(ValueError):
+        asyncio.run(client.make_request(None, Endpoint(path="/example", method="trace", tags=[])))
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import pytest
+from resolver.tagparser.async_dbm import AsyncDatabaseManagement
+from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
+
+
+@pytest.fixture
+def async_db(tmp_path):
+    manager = DatabaseManagement(str(tmp_path / "tagstyles.db"))
+    manager.initialize_db()
+    async_db = AsyncDatabaseManagement(manager, max_readers=2)
+    yield async_db
+    async_db.shutdown()
+
+
+@pytest.fixture
+def sample_tag():
+    return Tagstyle(
+        entire_pattern=RegexPattern(name="example_tag", pattern=r"http://example.com/\d+"),
+        contents=[RegexPattern(name="id", pattern=r"http://example.com/(\d+)")]
+    )
+
+
+def test_round_trip(async_db, sample_tag):
+    async def scenario():
+        assert await async_db.add_tag(sample_tag)
+        assert await async_db.retrieve_tag_by_id(1) == sample_tag
+        assert await async_db.retrieve_all_tags_with_ids() == [(1, sample_tag)]
+        assert await async_db.delete_all_tags()
+        return await async_db.retrieve_all_tags_completly()
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_calls_do_not_run_on_event_loop_thread(async_db):
+    loop_thread = threading.get_ident()
+    threads = []
+    original = async_db.manager.retrieve_all_tags_completly
+
+    def recording():
+        threads.append(threading.current_thread().name)
+        assert threading.get_ident() != loop_thread
+        return original()
+
+    async_db.manager.retrieve_all_tags_completly = recording
+    asyncio.run(async_db.retrieve_all_tags_completly())
+    assert threads[0].startswith("tagstyles-read")
+
+
+def test_event_loop_stays_responsive_during_write(async_db, sample_tag):
+    async def scenario():
+        write = asyncio.ensure_future(async_db.add_tags([sample_tag] * 20000))
+        ticks = 0
+        while not write.done():
+            await asyncio.sleep(0)
+            ticks += 1
+        await write
+        return ticks
+
+    assert asyncio.run(scenario()) > 1
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import pytest
+from resolver.tagparser.__main__ import main
+from resolver.tagparser.bulk import bulk_parse, read_tags
+from resolver.tagparser.dbm import RegexPattern, Tagstyle
+from resolver.tagparser.storage import InMemoryTagstyleStorage
+
+CATALOGUE = './resolver/data/tagstyles.json'
+TAGS = ["http://circthread.eu/01/12345678912534/21/1234567", "TE12AB3--12E123456", "nope"] * 7
+
+
+@pytest.fixture
+def storage():
+    return InMemoryTagstyleStorage.from_catalogue(CATALOGUE)
+
+
+def test_read_tags_skips_blank_lines():
+    assert list(read_tags([io.StringIO("a\r\n\nb\n"), io.StringIO("c")])) == ["a", "b", "c"]
+
+
+def test_bulk_parse_ndjson(storage):
+    output = io.StringIO()
+    summary = bulk_parse(TAGS, storage, output, workers=1, chunk_size=4)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["index"] for record in records] == list(range(len(TAGS)))
+    assert records[0]["tagstyle"] == "digital link type"
+    assert records[0]["contents"] == {"GTIN": "1234567891253", "serial_number": "1234567"}
+    assert records[2]["error"]["type"] == "InvalidTagError"
+    assert summary == (21, 14, 7, 0, 0)
+
+
+def test_bulk_parse_csv(storage):
+    output = io.StringIO()
+    bulk_parse(TAGS[:3], storage, output, output_format="csv", workers=1)
+    rows = list(csv.reader(io.StringIO(output.getvalue())))
+    assert rows[0] == ["index", "tag", "tagstyle", "contents", "error"]
+    assert rows[2][2] == "sample pattern"
+    assert json.loads(rows[2][3]) == {"product_model_number": "TE12AB3", "serial_number": "12E123456"}
+    assert rows[3][4] == "InvalidTagError"
+
+
+def test_unexpected_errors_are_reported_per_tag():
+    # A content pattern without a group fails on every tag it extracts from
+    tagstyle = Tagstyle(entire_pattern=RegexPattern(name="groupless", pattern=r"x\d+"),
+                        contents=[RegexPattern(name="id", pattern=r"\d+")])
+    output = io.StringIO()
+    summary = bulk_parse(["x1", "nope", "x2"], InMemoryTagstyleStorage([tagstyle]), output, workers=1)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["error"]["type"] for record in records] == ["IndexError", "InvalidTagError", "IndexError"]
+    assert summary == (3, 0, 1, 0, 2)
+
+
+def test_process_pool_keeps_input_order(storage):
+    expected, output = io.StringIO(), io.StringIO()
+    bulk_parse(TAGS, storage, expected, workers=1)
+    summary = bulk_parse(iter(TAGS), storage, output, workers=2, chunk_size=2, window=2)
+    assert output.getvalue() == expected.getvalue()
+    assert summary.tags == len(TAGS)
+
+
+def test_cli(tmp_path, capsys):
+    source = tmp_path / "tags.txt"
+    source.write_text("\n".join(TAGS[:3]) + "\n")
+    target = tmp_path / "out.csv"
+    assert main([str(source), "--format", "csv", "--output", str(target), "--workers", "1",
+                 "--backend", "memory", "--path", CATALOGUE]) == 0
+    assert len(target.read_text().splitlines()) == 4
+    assert "3 tags" in capsys.readouterr().err
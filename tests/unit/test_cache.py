@@ -0,0 +1,83 @@
+import pytest
+from pydantic import ValidationError
+from unittest.mock import patch, PropertyMock
+from resolver.tagparser.cache import ParseCache
+from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
+from resolver.tagparser.tagparser import Parser, InvalidTagError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sample_tagstyle():
+    entire_pattern = RegexPattern(name="example_tag", pattern=r"http://example.com/\d+")
+    contents = [RegexPattern(name="id", pattern=r"http://example.com/(\d+)")]
+    return Tagstyle(entire_pattern=entire_pattern, contents=contents)
+
+
+def test_lru_eviction():
+    cache = ParseCache(maxsize=2)
+    cache.put("a", 1, 0)
+    cache.put("b", 2, 0)
+    assert cache.get("a", 0) == (True, 1)
+    cache.put("c", 3, 0)
+    assert cache.get("b", 0) == (False, None)
+    assert cache.get("a", 0) == (True, 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = ParseCache(maxsize=10, ttl=5, clock=clock)
+    cache.put("a", 1, 0)
+    clock.now = 4.9
+    assert cache.get("a", 0) == (True, 1)
+    clock.now = 5.0
+    assert cache.get("a", 0) == (False, None)
+    assert cache.stats()["expirations"] == 1
+
+
+def test_generation_change_flushes():
+    cache = ParseCache(maxsize=10)
+    cache.put("a", 1, 0)
+    assert cache.get("a", 1) == (False, None)
+    assert len(cache) == 0
+    assert cache.stats()["flushes"] == 1
+
+
+def test_parser_caches_results_and_errors(sample_tagstyle):
+    parser = Parser(cache_size=16)
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[(1, sample_tagstyle)]), \
+         patch.object(DatabaseManagement, 'generation', new_callable=PropertyMock, return_value=1):
+        first = parser.parse_tag("http://example.com/1")
+        assert parser.parse_tag("http://example.com/1") is first
+        with pytest.raises(ValidationError):
+            first.contents[0].pattern = "changed"
+        for _ in range(2):
+            with pytest.raises(InvalidTagError):
+                parser.parse_tag("invalid")
+        stats = parser.cache_info()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 2
+
+
+def test_parser_cache_flushed_on_store_change(sample_tagstyle):
+    parser = Parser(cache_size=16)
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[]), \
+         patch.object(DatabaseManagement, 'generation', new_callable=PropertyMock) as generation:
+        generation.return_value = 1
+        with pytest.raises(InvalidTagError):
+            parser.parse_tag("http://example.com/1")
+        with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[(1, sample_tagstyle)]):
+            generation.return_value = 2
+            assert parser.parse_tag("http://example.com/1").contents[0].pattern == "1"
+
+
+def test_parser_without_cache():
+    assert Parser(cache_size=0).cache_info() == {"enabled": False}
@@ -1,6 +1,8 @@
+import sqlite3
+import time
 import pytest
 from .example_tags_importer import read_json_and_get_tags
-from resolver.tagparser.dbm import DatabaseManagement, Tagstyle, RegexPattern
+from resolver.tagparser.dbm import DatabaseManagement, Tagstyle, RegexPattern, tagstyles_from_catalogue
 
 @pytest.fixture(scope="module")
 def db_manager():
@@ -74,6 +76,59 @@ def test_delete_tag_by_id(db_manager, sample_tags):
         # Attempt to retrieve the deleted tag
         assert db_manager.retrieve_tag_by_id(index + 1) == None
 
+def test_generation_changes_on_write(db_manager, sample_tags):
+    # Every write to the store advances the generation counter
+    generation = db_manager.generation
+    db_manager.add_tag(sample_tags[0])
+    assert db_manager.generation > generation
+    generation = db_manager.generation
+    db_manager.delete_all_tags()
+    assert db_manager.generation > generation
+
+def test_generation_of_other_writers_is_rechecked_after_ttl(db_manager, sample_tags, monkeypatch):
+    other = DatabaseManagement(db_manager.full_path)
+    clock = [time.monotonic() + 60]
+    monkeypatch.setattr("resolver.tagparser.dbm.time.monotonic", lambda: clock[0])
+    generation = db_manager.generation
+    other.add_tag(sample_tags[0])
+    assert db_manager.generation == generation
+    clock[0] += db_manager.generation_ttl
+    assert db_manager.generation == generation + 1
+
+def test_generation_of_uninitialized_database(tmp_path):
+    assert DatabaseManagement(str(tmp_path / "empty.db")).generation == 0
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    # Schema of databases created before tagstyles had a kind
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tagstyles (id INTEGER PRIMARY KEY, name TEXT NOT NULL, entire_pattern TEXT NOT NULL)")
+        conn.execute("CREATE TABLE contents (id INTEGER PRIMARY KEY, tagstyle_id INTEGER NOT NULL, "
+                     "name TEXT NOT NULL, pattern TEXT NOT NULL)")
+        conn.execute("INSERT INTO tagstyles (name, entire_pattern) VALUES ('old', 'x')")
+    yield path
+    conn.close()
+
+def test_initialize_db_adds_kind_to_existing_databases(baseline_db):
+    manager = DatabaseManagement(baseline_db)
+    assert manager.initialize_db()
+    assert manager.retrieve_tag_by_id(1).kind == "regex"
+
+def test_baseline_databases_are_migrated_when_opened(baseline_db):
+    manager = DatabaseManagement(baseline_db)
+    assert [tagstyle.kind for _, tagstyle in manager.retrieve_all_tags_with_ids()] == ["regex"]
+    assert manager.retrieve_tag_by_id(1).kind == "regex"
+
+def test_retrieve_all_tags_with_ids(db_manager, sample_tags):
+    db_manager.delete_all_tags()
+    for tag in sample_tags:
+        db_manager.add_tag(tag)
+    retrieved = db_manager.retrieve_all_tags_with_ids()
+    assert [tag for _, tag in retrieved] == sample_tags
+    for tagstyle_id, tag in retrieved:
+        assert db_manager.retrieve_tag_by_id(tagstyle_id) == tag
+
 def test_delete_all_tags(db_manager, sample_tags):
     # Add tags first
     for tag in sample_tags:
@@ -82,3 +137,49 @@ def test_delete_all_tags(db_manager, sample_tags):
     assert db_manager.delete_all_tags() == True
     # Attempt to retrieve any tags after deletion
     assert db_manager.retrieve_all_tags_completly() == []
+
+def test_connection_is_reused_per_thread(db_manager):
+    import threading
+    assert db_manager._connection() is DatabaseManagement()._connection()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(DatabaseManagement()._connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not db_manager._connection()
+
+def test_read_while_write_is_active(db_manager, sample_tags):
+    import sqlite3
+    db_manager.add_tag(sample_tags[0])
+    assert db_manager._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    writer = sqlite3.connect(db_manager.full_path)
+    try:
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("DELETE FROM contents")
+        # Readers see the last committed state instead of waiting for the writer
+        assert db_manager.retrieve_all_tags_completly() != []
+    finally:
+        writer.rollback()
+        writer.close()
+
+def test_add_tags_in_bulk(db_manager, sample_tags):
+    db_manager.delete_all_tags()
+    generation = db_manager.generation
+    assert db_manager.add_tags(sample_tags * 50) == True
+    assert db_manager.generation == generation + 1
+    retrieved = db_manager.retrieve_all_tags_completly()
+    assert retrieved == sample_tags * 50
+
+def test_retrieve_tag_without_contents(db_manager):
+    db_manager.delete_all_tags()
+    tag = Tagstyle(entire_pattern=RegexPattern(name="bare", pattern=r"\d+"), contents=[])
+    db_manager.add_tag(tag)
+    assert db_manager.retrieve_all_tags_completly() == [tag]
+
+def test_contents_index_exists(db_manager):
+    indexes = db_manager._connection().execute("PRAGMA index_list(contents)").fetchall()
+    assert "idx_contents_tagstyle_id" in [index[1] for index in indexes]
+
+def test_tagstyles_from_catalogue(sample_tags):
+    import json
+    with open('./resolver/data/tagstyles.json') as file:
+        assert tagstyles_from_catalogue(json.load(file)) == sample_tags
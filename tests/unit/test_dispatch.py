@@ -0,0 +1,76 @@
+import random
+import re
+import pytest
+from resolver.tagparser.dbm import RegexPattern, Tagstyle
+from resolver.tagparser.dispatch import PatternSignature, tag_classes, DIGIT, UPPER, OTHER_ASCII
+from resolver.tagparser.snapshot import TagstyleSnapshot
+
+PIECES = [
+    "https?://", "http://", "id\\.acme\\.com", "/01/", "/21/", "\\d{2}", "\\d{13}", "[A-Z]{2}",
+    "[a-c]", "x?", "(ab|cd)", ".*", "[^/]+", "--", "E", "(?i:te)", "\\w+", "(?:01|10)/", "é",
+]
+TAG_PIECES = [
+    "http://", "https://", "id.acme.com", "/01/", "/21/", "12", "1234567890123", "TE", "te",
+    "a", "b", "x", "ab", "cd", "--", "E", "/", "é", "01/", "10/", "foo",
+]
+
+
+def linear_match(snapshot, tag):
+    matches = {}
+    for tagstyle in snapshot.tagstyles:
+        if tagstyle.entire_pattern.fullmatch(tag):
+            matches[tagstyle.name] = tagstyle.id
+    return matches
+
+
+def make_snapshot(patterns):
+    return TagstyleSnapshot([
+        (index + 1, Tagstyle(entire_pattern=RegexPattern(name=f"style_{index % 7}", pattern=pattern), contents=[]))
+        for index, pattern in enumerate(patterns)
+    ])
+
+
+def test_signature_of_digital_link_pattern():
+    signature = PatternSignature.from_pattern(re.compile(r"https?://([^/]+)/.*/\d{2}/.*"))
+    assert signature.prefixes == {"http://", "https://"}
+    assert signature.min_length == 13
+    assert signature.max_length is None
+
+
+def test_signature_of_fixed_pattern():
+    signature = PatternSignature.from_pattern(re.compile(r"(TE\d{2}[A-Z]{2}\d)--(\d{2}E\d{6})"))
+    assert signature.prefixes == {"TE"}
+    assert signature.min_length == signature.max_length == 18
+    assert signature.fragments == ("--",)
+    assert not signature.admits("TE12AB3--12e123456", 18, tag_classes("TE12AB3--12e123456"))
+
+
+def test_signature_ignores_case():
+    signature = PatternSignature.from_pattern(re.compile(r"(?i)https://acme"))
+    assert signature.prefixes == {""}
+    assert signature.admits("HTTPS://ACME", 12, tag_classes("HTTPS://ACME"))
+
+
+def test_tag_classes():
+    assert tag_classes("AB-12") == DIGIT | UPPER | OTHER_ASCII
+
+
+def test_index_matches_linear_scan():
+    rng = random.Random(4711)
+    patterns = ["".join(rng.choice(PIECES) for _ in range(rng.randint(1, 5))) for _ in range(300)]
+    snapshot = make_snapshot(patterns)
+    tags = ["".join(rng.choice(TAG_PIECES) for _ in range(rng.randint(1, 6))) for _ in range(3000)]
+    tags += [rng.choice(patterns).replace("\\", "") for _ in range(200)]
+    for tag in tags:
+        assert snapshot.match_entire_pattern(tag) == linear_match(snapshot, tag), tag
+
+
+@pytest.mark.parametrize("tag", ["http://circthread.eu/01/12345678912534/21/1234567", "TE12AB3--12E123456", ""])
+def test_index_matches_sample_tagstyles(tag):
+    snapshot = make_snapshot([
+        r"(TE\d{2}[A-Z]{2}\d)--(\d{2}E\d{6})",
+        r"https?://([^/]+)/.*/\d{2}/.*",
+        r"https?://([^/]+)/.*/\d{2}/.*",
+        r".*",
+    ])
+    assert snapshot.match_entire_pattern(tag) == linear_match(snapshot, tag)
@@ -0,0 +1,78 @@
+import itertools
+import pytest
+from resolver.servicerouter.client_generator import APIClient, Endpoint, EndpointFilterCriteria
+from resolver.servicerouter.endpoint_index import PathTemplateTrie
+
+
+def make_schema() -> dict:
+    paths = {}
+    for resource, tag in itertools.product(["products", "parts", "repairs"], ["catalogue", "service"]):
+        base = f"/{tag}/{resource}"
+        paths[base] = {"get": {"tags": [tag]}, "post": {"tags": [tag, "write"]}}
+        paths[base + "/{id}"] = {"get": {"tags": [tag]}, "delete": {"tags": [tag, "write"]}}
+        paths[base + "/{id}/files/{name}.{ext}"] = {"get": {"tags": [tag, "files"]}}
+    return {"openapi": "3.0.0", "paths": paths}
+
+
+def filter_linear(endpoints, criteria: EndpointFilterCriteria):
+    filtered_endpoints = endpoints
+    for key, value in criteria.model_dump(exclude_unset=True).items():
+        values = value if isinstance(value, list) else [value]
+        filtered_endpoints = [endpoint for endpoint in filtered_endpoints
+                              if any(filter_val in getattr(endpoint, key) for filter_val in values)]
+    return filtered_endpoints
+
+
+@pytest.fixture
+def client():
+    return APIClient(make_schema())
+
+
+CRITERIA = [
+    EndpointFilterCriteria(),
+    EndpointFilterCriteria(tags="write"),
+    EndpointFilterCriteria(tags="writ"),
+    EndpointFilterCriteria(tags=["files", "write"]),
+    EndpointFilterCriteria(tags=[]),
+    EndpointFilterCriteria(method="get"),
+    EndpointFilterCriteria(method="e"),
+    EndpointFilterCriteria(method=["post", "delete"]),
+    EndpointFilterCriteria(path="/service/parts"),
+    EndpointFilterCriteria(path="{id}"),
+    EndpointFilterCriteria(path="ts/"),
+    EndpointFilterCriteria(path="s"),
+    EndpointFilterCriteria(path="missing"),
+    EndpointFilterCriteria(path=["repairs/{id}", "products"], method="get"),
+    EndpointFilterCriteria(path="{id}", tags="catalogue", method="delete"),
+    EndpointFilterCriteria(path="files", tags=["write", "service"]),
+]
+
+
+@pytest.mark.parametrize("criteria", CRITERIA)
+def test_filter_endpoints_matches_linear_scan(client, criteria):
+    assert client.filter_endpoints(criteria) == filter_linear(client.endpoints, criteria)
+
+
+def test_index_is_rebuilt_when_endpoints_are_replaced(client):
+    client.filter_endpoints(EndpointFilterCriteria(tags="write"))
+    client.endpoints = [Endpoint(path="/only", method="get", tags=["write"])]
+    assert [endpoint.path for endpoint in client.filter_endpoints(EndpointFilterCriteria(tags="write"))] == ["/only"]
+
+
+def test_match_path_resolves_parameterised_templates(client):
+    matches = client.match_path("/service/parts/42")
+    assert [(endpoint.path, endpoint.method) for endpoint in matches] == [
+        ("/service/parts/{id}", "get"), ("/service/parts/{id}", "delete")]
+    assert [endpoint.method for endpoint in client.match_path("/service/parts/42", method="DELETE")] == ["delete"]
+    assert [endpoint.path for endpoint in client.match_path("/catalogue/products/7/files/manual.pdf?lang=en")] == [
+        "/catalogue/products/{id}/files/{name}.{ext}"]
+    assert client.match_path("/catalogue/products/7/files/manual") == []
+    assert client.match_path("/unknown/7") == []
+
+
+def test_template_trie_returns_literal_and_parameter_matches():
+    trie = PathTemplateTrie()
+    trie.add("/items/{id}", 0)
+    trie.add("/items/latest", 1)
+    assert trie.match("/items/latest") == [0, 1]
+    assert trie.match("/items/3") == [0]
@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
+from resolver.tagparser.gs1 import gtin_check_digit, is_valid_gtin, parse_digital_link
+from resolver.tagparser.snapshot import DIGITAL_LINK_KIND, REGEX_KIND, CompiledTagstyle
+from resolver.tagparser.tagparser import InvalidTagError, Parser
+from .example_tags_importer import read_json_and_get_tags
+
+CATALOGUE = './resolver/data/tagstyles.json'
+
+
+@pytest.fixture
+def catalogue_tags():
+    return list(enumerate(read_json_and_get_tags(CATALOGUE), start=1))
+
+
+def test_parse_digital_link():
+    link = parse_digital_link("https://id.circthread.eu/products/01/09506000134352/10/LOT7/21/42?lang=en")
+    assert link.host == "id.circthread.eu"
+    assert link.prefix == "products"
+    assert link.pairs == [("01", "09506000134352"), ("10", "LOT7"), ("21", "42")]
+    assert link.get("21") == "42"
+    assert link.gtin_valid
+    assert parse_digital_link("https://id.circthread.eu/about") is None
+    assert parse_digital_link("TE12AB3--12E123456") is None
+
+
+def test_gtin_check_digit():
+    assert gtin_check_digit("0950600013435") == 2
+    assert is_valid_gtin("09506000134352")
+    assert is_valid_gtin("4006381333931")
+    assert not is_valid_gtin("09506000134353")
+    assert not is_valid_gtin("0950600013435x")
+
+
+def test_kind_is_stored_with_the_tagstyle(catalogue_tags):
+    assert [tagstyle.kind for _, tagstyle in catalogue_tags] == [REGEX_KIND, DIGITAL_LINK_KIND]
+    pattern = RegexPattern(name="style", pattern=r"https?://([^/]+)/.*/\d{2}/.*")
+    assert CompiledTagstyle(1, Tagstyle(entire_pattern=pattern, contents=[])).kind == REGEX_KIND
+    assert CompiledTagstyle(1, Tagstyle(entire_pattern=pattern, contents=[], kind=DIGITAL_LINK_KIND)).kind == DIGITAL_LINK_KIND
+
+
+def test_parser_dispatches_digital_links(catalogue_tags):
+    parser = Parser()
+    tag = "http://circthread.eu/01/12345678912534/21/1234567"
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=catalogue_tags):
+        link = parser.parse_digital_link(tag)
+        assert link.pairs == [("01", "12345678912534"), ("21", "1234567")]
+        assert link.gtin_valid
+        parsed = parser.parse_tag(tag)
+        assert parsed.kind == DIGITAL_LINK_KIND
+        # parse_tag keeps to the content patterns, which take 13 of the 14 GTIN digits
+        assert parsed.contents[0].pattern == "1234567891253"
+        with pytest.raises(InvalidTagError, match="not a GS1 Digital Link"):
+            parser.parse_digital_link("TE12AB3--12E123456")
@@ -0,0 +1,169 @@
+import asyncio
+import math
+import threading
+import time
+import pytest
+from resolver.servicerouter.health import (
+    CLOSED, HALF_OPEN, OPEN, CircuitOpenError, HealthRegistry, ahedged_call, hedged_call,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+ROOT = "http://provider.example.org/"
+
+
+def test_latency_statistics():
+    health = HealthRegistry(window=10, alpha=0.5, min_calls=5)
+    for latency in [0.1, 0.2, 0.3, 0.4, 1.0]:
+        health.record(ROOT, latency, failed=False)
+
+    stats = health.stats()["http://provider.example.org"]
+    assert stats["ewma"] == pytest.approx(0.65625)
+    assert stats["p50"] == 0.3
+    assert stats["p95"] == 1.0
+    assert health.hedge_delay(ROOT) == 1.0
+    assert health.hedge_delay(ROOT, percentile=80) == 0.4
+
+
+def test_hedge_delay_needs_enough_samples():
+    health = HealthRegistry(min_calls=5)
+    for _ in range(4):
+        health.record(ROOT, 0.1, failed=False)
+    assert health.hedge_delay(ROOT) is None
+
+
+def test_window_bounds_the_error_rate():
+    health = HealthRegistry(window=4, failure_threshold=10, min_calls=100)
+    for failed in [True, True, False, False, False, False]:
+        health.record(ROOT, 0.1, failed)
+    assert health.stats()["http://provider.example.org"]["error_rate"] == 0.0
+    assert health.stats()["http://provider.example.org"]["failures"] == 2
+
+
+def test_consecutive_failures_open_the_circuit():
+    clock = FakeClock()
+    health = HealthRegistry(failure_threshold=3, cooldown=10, clock=clock)
+    for _ in range(2):
+        health.admit(ROOT)
+        health.record(ROOT, 0.1, failed=True)
+    health.record(ROOT, 0.1, failed=False)
+    for _ in range(3):
+        health.record(ROOT, 0.1, failed=True)
+
+    assert health.provider(ROOT).state == OPEN
+    with pytest.raises(CircuitOpenError):
+        health.admit(ROOT)
+    assert not health.available(ROOT)
+
+
+def test_error_rate_opens_the_circuit():
+    health = HealthRegistry(failure_threshold=100, error_rate_threshold=0.5, min_calls=4)
+    for failed in [False, True, False, True]:
+        health.record(ROOT, 0.1, failed)
+    assert health.provider(ROOT).state == OPEN
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    clock = FakeClock()
+    health = HealthRegistry(failure_threshold=1, cooldown=10, clock=clock)
+    health.record(ROOT, 0.1, failed=True)
+
+    clock.now = 10
+    assert health.available(ROOT)
+    health.admit(ROOT)
+    assert health.provider(ROOT).state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        health.admit(ROOT)
+
+    health.record(ROOT, 0.1, failed=True)
+    assert health.provider(ROOT).state == OPEN
+    assert not health.available(ROOT)
+
+    clock.now = 20
+    health.admit(ROOT)
+    health.record(ROOT, 0.1, failed=False)
+    assert health.provider(ROOT).state == CLOSED
+    health.admit(ROOT)
+
+
+def test_rank_prefers_fast_reliable_and_unknown_providers():
+    health = HealthRegistry(failure_threshold=2, min_calls=100)
+    health.record("http://slow", 1.0, failed=False)
+    health.record("http://fast", 0.1, failed=False)
+    health.record("http://flaky", 0.1, failed=False)
+    health.record("http://flaky", 0.1, failed=False)
+    health.record("http://down", 0.01, failed=True)
+    health.record("http://down", 0.01, failed=True)
+    health.record("http://flaky", 0.1, failed=True)
+
+    ranked = health.rank(["http://down", "http://slow", "http://flaky", "http://fast", "http://new"],
+                         lambda root: root)
+    assert ranked == ["http://new", "http://fast", "http://flaky", "http://slow", "http://down"]
+    assert health.score("http://down") == math.inf
+
+
+def test_hedged_call_returns_first_success():
+    assert hedged_call([lambda: 1, lambda: 2]) == 1
+
+
+def test_hedged_call_fails_over_without_delay():
+    calls = []
+
+    def failing():
+        calls.append("first")
+        raise SystemError("down")
+
+    assert hedged_call([failing, lambda: calls.append("second") or 2]) == 2
+    assert calls == ["first", "second"]
+
+
+def test_hedged_call_races_a_slow_attempt():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "slow"
+
+    start = time.monotonic()
+    assert hedged_call([slow, lambda: "hedge"], delay=0.05) == "hedge"
+    assert time.monotonic() - start < 1
+    release.set()
+
+
+def test_hedged_call_raises_the_last_error():
+    def failing(message):
+        def call():
+            raise SystemError(message)
+        return call
+
+    with pytest.raises(SystemError, match="second"):
+        hedged_call([failing("first"), failing("second")], delay=0.01)
+
+
+def test_async_hedged_call_cancels_the_loser():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fast():
+        return "hedge"
+
+    async def scenario():
+        result = await ahedged_call([slow, fast], delay=0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "hedge"
+    assert cancelled == [True]
@@ -1,7 +1,7 @@
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, PropertyMock
 from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
-from resolver.tagparser.tagparser import Parser, AmbiguousTagError, InvalidTagError
+from resolver.tagparser.tagparser import Parser, ParsedTag, AmbiguousTagError, InvalidTagError
 
 @pytest.fixture
 def sample_tagstyle():
@@ -19,41 +19,162 @@ def parser():
 
 def test_match_entire_pattern(parser, sample_tagstyle):
     """Test matching entire pattern."""
-    with patch.object(DatabaseManagement, 'retrieve_all_tagstyles', return_value=[
-        (1, "example_tag", r"http://example.com/\d+")
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
     ]):
         matches = parser.match_entire_pattern("http://example.com/12345")
         assert matches == {"example_tag": 1}
 
 def test_match_contents(parser, sample_tagstyle):
     """Test matching contents."""
-    with patch.object(DatabaseManagement, 'retrieve_tag_by_id', return_value=sample_tagstyle):
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]):
         contents = parser.match_contents(1, "http://example.com/12345")
         assert contents == {"id": "12345"}
 
+def test_match_contents_unknown_tagstyle(parser, sample_tagstyle):
+    """Test matching contents of a tagstyle that is not stored."""
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]):
+        with pytest.raises(InvalidTagError):
+            parser.match_contents(2, "http://example.com/12345")
+
 def test_parse_tag_valid(parser, sample_tagstyle):
     """Test parsing a valid tag."""
-    with patch.object(DatabaseManagement, 'retrieve_all_tagstyles', return_value=[
-        (1, "example_tag", r"http://example.com/\d+")
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
     ]):
-        with patch.object(DatabaseManagement, 'retrieve_tag_by_id', return_value=sample_tagstyle):
-            parsed_tag = parser.parse_tag("http://example.com/12345")
-            assert parsed_tag.entire_pattern.name == "example_tag"
-            assert parsed_tag.entire_pattern.pattern == "http://example.com/12345"
-            assert parsed_tag.contents[0].name == "id"
-            assert parsed_tag.contents[0].pattern == "12345"
-
-def test_parse_tag_ambiguous(parser):
+        parsed_tag = parser.parse_tag("http://example.com/12345")
+        assert parsed_tag.entire_pattern.name == "example_tag"
+        assert parsed_tag.entire_pattern.pattern == "http://example.com/12345"
+        assert parsed_tag.contents[0].name == "id"
+        assert parsed_tag.contents[0].pattern == "12345"
+
+def test_parse_tag_ambiguous(parser, sample_tagstyle):
     """Test parsing an ambiguous tag."""
-    with patch.object(DatabaseManagement, 'retrieve_all_tagstyles', return_value=[
-        (1, "example_tag", r"http://example.com/\d+"),
-        (2, "example_tag_2", r"http://example.com/\d+")
+    other_tagstyle = sample_tagstyle.model_copy(deep=True)
+    other_tagstyle.entire_pattern.name = "example_tag_2"
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle),
+        (2, other_tagstyle)
     ]):
         with pytest.raises(AmbiguousTagError):
             parser.parse_tag("http://example.com/12345")
 
 def test_parse_tag_invalid(parser):
     """Test parsing an invalid tag."""
-    with patch.object(DatabaseManagement, 'retrieve_all_tagstyles', return_value=[]):
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[]):
         with pytest.raises(InvalidTagError):
             parser.parse_tag("http://example.com/12345")
+
+def test_snapshot_is_reused(parser, sample_tagstyle):
+    """Test that the compiled snapshot is only loaded once while the store is unchanged."""
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]) as retrieve:
+        parser.parse_tag("http://example.com/12345")
+        parser.parse_tag("http://example.com/67890")
+        assert retrieve.call_count == 1
+
+def test_snapshot_rebuilt_after_write(parser, sample_tagstyle):
+    """Test that a change of the store generation rebuilds the snapshot."""
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]) as retrieve, patch.object(DatabaseManagement, 'generation', new_callable=PropertyMock) as generation:
+        generation.return_value = 1
+        parser.parse_tag("http://example.com/12345")
+        generation.return_value = 2
+        parser.parse_tag("http://example.com/12345")
+        assert retrieve.call_count == 2
+
+def test_parse_tags(parser, sample_tagstyle):
+    """Test that a batch reports errors per tag without failing the rest."""
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]) as retrieve:
+        results = list(parser.parse_tags(["http://example.com/1", "invalid", "http://example.com/2"]))
+        assert [tag for tag, _ in results] == ["http://example.com/1", "invalid", "http://example.com/2"]
+        assert results[0][1].contents[0].pattern == "1"
+        assert isinstance(results[1][1], InvalidTagError)
+        assert results[2][1].contents[0].pattern == "2"
+        assert retrieve.call_count == 1
+
+def test_parse_tag_fields(parser, sample_tagstyle):
+    """Test the lightweight parse result."""
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]):
+        parsed = parser.parse_tag_fields("http://example.com/12345")
+        assert parsed == ParsedTag("example_tag", {"id": "12345"})
+        with pytest.raises(InvalidTagError):
+            parser.parse_tag_fields("invalid")
+
+def test_extract_matches_separate_searches():
+    """Test that extraction gives the same fields as searching every content pattern."""
+    import re
+    from .example_tags_importer import read_json_and_get_tags
+    from resolver.tagparser.snapshot import CompiledTagstyle
+    tags = [
+        "http://circthread.eu/01/12345678912534/21/1234567",
+        "https://id.example.com/01/12345678912534/10/ABC|123/22/v1/21/7$8",
+        "https://id.example.com/10/01/1234567891253422/x",
+        "TE12AB3--12E123456",
+    ]
+    for tagstyle in read_json_and_get_tags('./resolver/data/tagstyles.json'):
+        compiled = CompiledTagstyle(1, tagstyle)
+        for tag in tags:
+            expected = {}
+            for content in tagstyle.contents:
+                match = re.search(content.pattern, tag)
+                if match:
+                    expected[content.name] = match.group(1)
+            assert compiled.extract(tag) == expected
+
+def test_overlong_tag_is_rejected(sample_tagstyle):
+    """Test that tags beyond the maximum length are refused before matching."""
+    parser = Parser(max_tag_length=32)
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[
+        (1, sample_tagstyle)
+    ]):
+        assert parser.parse_tag("http://example.com/1").contents[0].pattern == "1"
+        with pytest.raises(InvalidTagError, match="maximum length"):
+            parser.parse_tag("http://example.com/" + "1" * 32)
+        with pytest.raises(InvalidTagError, match="maximum length"):
+            parser.match_entire_pattern("http://example.com/" + "1" * 32)
+
+def test_snapshot_file_round_trip(sample_tagstyle, tmp_path):
+    """Test that a saved snapshot is adopted only while the store generation is unchanged."""
+    path = str(tmp_path / "tagstyles.snapshot")
+    with patch.object(DatabaseManagement, 'generation', new_callable=PropertyMock, return_value=7), \
+            patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[(1, sample_tagstyle)]):
+        Parser().save_snapshot(path)
+
+    with patch.object(DatabaseManagement, 'generation', new_callable=PropertyMock, return_value=7), \
+            patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[(1, sample_tagstyle)]):
+        parser = Parser()
+        assert parser.load_snapshot(path)
+        assert parser.has_current_snapshot()
+        assert parser.parse_tag("http://example.com/1").contents[0].pattern == "1"
+
+    with patch.object(DatabaseManagement, 'generation', new_callable=PropertyMock, return_value=8):
+        assert not Parser().load_snapshot(path)
+    assert not Parser().load_snapshot(str(tmp_path / "missing.snapshot"))
+
+def test_snapshot_file_is_not_shared_between_stores(sample_tagstyle, tmp_path):
+    """Test that a snapshot is rejected by another store at the same generation."""
+    path = str(tmp_path / "tagstyles.snapshot")
+    other_tagstyle = Tagstyle(entire_pattern=RegexPattern(name="other_tag", pattern=r"http://other\.com/\d+"),
+                              contents=[RegexPattern(name="id", pattern=r"http://other\.com/(\d+)")])
+    first, second = DatabaseManagement(str(tmp_path / "first.db")), DatabaseManagement(str(tmp_path / "second.db"))
+    for storage, tagstyle in ((first, sample_tagstyle), (second, other_tagstyle)):
+        storage.initialize_db()
+        storage.add_tag(tagstyle)
+    assert first.generation == second.generation
+    Parser(first).save_snapshot(path)
+    assert not Parser(second).load_snapshot(path)
+    assert Parser(DatabaseManagement(first.full_path)).load_snapshot(path)
+
+    with patch.object(DatabaseManagement, 'retrieve_all_tags_with_ids', return_value=[(1, other_tagstyle)]):
+        assert not Parser(first).load_snapshot(path)
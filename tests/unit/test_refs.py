@@ -0,0 +1,92 @@
+import pytest
+from resolver.servicerouter.client_generator import APIClient
+from resolver.servicerouter.refs import RefResolver
+
+SCHEMAS = {
+    "Address": {"type": "object", "properties": {"city": {"type": "string"}}},
+    "Owner": {"type": "object", "properties": {"address": {"$ref": "#/components/schemas/Address"}}},
+    "Part": {"type": "object", "properties": {"subparts": {"type": "array",
+                                                           "items": {"$ref": "#/components/schemas/Part"}}}},
+    "A": {"properties": {"b": {"$ref": "#/components/schemas/B"}}},
+    "B": {"properties": {"a": {"$ref": "#/components/schemas/A"}}},
+    "Alias": {"$ref": "#/components/schemas/Owner"},
+    "Loop": {"$ref": "#/components/schemas/Loop"},
+    "a/b~c": {"type": "string"},
+}
+
+
+@pytest.fixture
+def resolver():
+    return RefResolver({"components": {"schemas": SCHEMAS}})
+
+
+def test_resolve_is_memoized(resolver):
+    first = resolver.resolve("#/components/schemas/Owner")
+    assert first is SCHEMAS["Owner"]
+    assert resolver.resolve("#/components/schemas/Owner") is first
+
+
+def test_resolve_follows_chains_and_decodes_pointer_escapes(resolver):
+    assert resolver.resolve("#/components/schemas/Alias") is SCHEMAS["Owner"]
+    assert resolver.resolve("#/components/schemas/a~1b~0c") == {"type": "string"}
+    assert resolver.resolve("#/components/schemas/a%2Fb~0c") == {"type": "string"}
+
+
+@pytest.mark.parametrize("ref", ["#/components/schemas/Missing", "other.json#/Address", "#/components/schemas/Loop"])
+def test_resolve_rejects_invalid_references(resolver, ref):
+    with pytest.raises(ValueError):
+        resolver.resolve(ref)
+
+
+def test_expand_inlines_nested_references(resolver):
+    expanded = resolver.expand({"$ref": "#/components/schemas/Owner"})
+    assert expanded == {"type": "object", "properties": {"address": SCHEMAS["Address"]}}
+    assert SCHEMAS["Owner"]["properties"]["address"] == {"$ref": "#/components/schemas/Address"}
+
+
+def test_expand_keeps_recursive_references(resolver):
+    part = resolver.expand({"$ref": "#/components/schemas/Part"})
+    assert part["properties"]["subparts"]["items"] == {"$ref": "#/components/schemas/Part"}
+
+    a = resolver.expand({"$ref": "#/components/schemas/A"})
+    assert a == {"properties": {"b": {"properties": {"a": {"$ref": "#/components/schemas/A"}}}}}
+    # The memoized expansion of A is reused inside B
+    b = resolver.expand({"$ref": "#/components/schemas/B"})
+    assert b == {"properties": {"a": a}}
+
+
+def test_endpoints_resolve_schemas_lazily():
+    schema = {
+        "openapi": "3.0.0",
+        "paths": {
+            "/owners/{id}": {
+                "parameters": [{"$ref": "#/components/parameters/Id"}],
+                "summary": "An owner",
+                "put": {
+                    "tags": ["owners"],
+                    "requestBody": {"$ref": "#/components/requestBodies/Owner"},
+                    "responses": {
+                        "200": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Part"}}}},
+                        "204": {"description": "No content"},
+                    },
+                },
+            },
+        },
+        "components": {
+            "schemas": SCHEMAS,
+            "parameters": {"Id": {"name": "id", "in": "path", "required": True}},
+            "requestBodies": {"Owner": {"content": {"application/json": {
+                "schema": {"$ref": "#/components/schemas/Owner"}}}}},
+        },
+    }
+    client = APIClient(schema)
+    endpoint, = client.endpoints
+
+    assert "paths" not in client.openapi_schema
+    assert endpoint._request_body is not None and endpoint._operation is not None
+    assert endpoint.request_body == {"type": "object", "properties": {"address": SCHEMAS["Address"]}}
+    assert endpoint.query_params == [{"name": "id", "in": "path", "required": True}]
+    assert endpoint.responses["200"]["properties"]["subparts"]["items"] == {"$ref": "#/components/schemas/Part"}
+    assert endpoint.responses["204"] is None
+    # Everything is resolved, so the operation is no longer needed
+    assert endpoint._operation is None
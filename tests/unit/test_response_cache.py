@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import pytest
+from types import SimpleNamespace
+from resolver.servicerouter.response_cache import ResponseCache, cache_control, request_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def response(status_code=200, cache_header=None, body=None):
+    headers = {"Cache-Control": cache_header} if cache_header else {}
+    return SimpleNamespace(status_code=status_code, headers=headers, body=body)
+
+
+class Upstream:
+    """Counts calls and returns numbered responses."""
+
+    def __init__(self, cache_header=None):
+        self.calls = 0
+        self.cache_header = cache_header
+
+    def __call__(self):
+        self.calls += 1
+        return response(cache_header=self.cache_header, body=self.calls)
+
+
+KEY = request_key("GET", "http://provider/items/1", {"params": {}})
+
+
+def test_request_key_normalises_parameters():
+    first = request_key("GET", "http://provider/items", {"params": {"b": 2, "a": "x", "c": None}})
+    second = request_key("GET", "http://provider/items", {"params": {"a": ["x"], "b": "2"}})
+    assert first == second
+    assert first != request_key("GET", "http://provider/items", {"params": {"a": "y", "b": "2"}})
+    assert first != request_key("HEAD", "http://provider/items", {"params": {"a": "x", "b": "2"}})
+
+
+def test_cache_control_directives():
+    assert cache_control({"Cache-Control": 'Public, Max-Age=60, stale-while-revalidate="30"'}) == {
+        "public": None, "max-age": "60", "stale-while-revalidate": "30"}
+    assert cache_control({}) == {}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("max-age=60", (60, 5)),
+    ("max-age=60, s-maxage=120, stale-while-revalidate=30", (120, 30)),
+    ("no-store, max-age=60", (0, 0)),
+    ("private, max-age=60", (0, 0)),
+    (None, (10, 5)),
+    ("max-age=0, stale-while-revalidate=30", (0, 30)),
+])
+def test_lifetime_from_cache_control(header, expected):
+    cache = ResponseCache(ttl=10, stale=5)
+    assert cache.lifetime("/items/{id}", response(cache_header=header)) == expected
+
+
+def test_lifetime_per_endpoint_overrides_headers_and_skips_errors():
+    cache = ResponseCache(stale=5, ttls={"/items/{id}": 300})
+    assert cache.lifetime("/items/{id}", response(cache_header="no-store")) == (300, 5)
+    assert cache.lifetime("/items/{id}", response(status_code=404)) == (0, 0)
+    assert cache.lifetime("/other", response()) == (0, 0)
+
+
+def test_fresh_responses_are_served_from_cache():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    upstream = Upstream()
+
+    assert cache.get(KEY, "/items/{id}", upstream).body == 1
+    clock.now = 9.9
+    assert cache.get(KEY, "/items/{id}", upstream).body == 1
+    clock.now = 10.0
+    assert cache.get(KEY, "/items/{id}", upstream).body == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_uncacheable_responses_are_not_stored():
+    cache = ResponseCache()
+    upstream = Upstream()
+    cache.get(KEY, "/items/{id}", upstream)
+    cache.get(KEY, "/items/{id}", upstream)
+    assert upstream.calls == 2
+    assert len(cache) == 0
+
+
+def test_stale_responses_are_served_while_revalidating_once():
+    clock = FakeClock()
+    cache = ResponseCache(clock=clock)
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(None)
+        if len(calls) > 1:
+            release.wait(5)
+        return response(cache_header="max-age=10, stale-while-revalidate=20", body=len(calls))
+
+    cache.get(KEY, "/items/{id}", upstream)
+    clock.now = 15
+    assert [cache.get(KEY, "/items/{id}", upstream).body for _ in range(5)] == [1] * 5
+    release.set()
+    for _ in range(100):
+        if cache.get(KEY, "/items/{id}", upstream).body == 2:
+            break
+        threading.Event().wait(0.01)
+
+    assert len(calls) == 2
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_failed_revalidation_keeps_stale_response_until_it_expires(capsys):
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, stale=20, clock=clock)
+    cache.get(KEY, "/items/{id}", Upstream())
+    clock.now = 15
+
+    def failing():
+        raise SystemError("provider down")
+
+    assert cache.get(KEY, "/items/{id}", failing).body == 1
+    for _ in range(100):
+        if "provider down" in capsys.readouterr().out:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get(KEY, "/items/{id}", failing).body == 1
+    clock.now = 30
+    with pytest.raises(SystemError):
+        cache.get(KEY, "/items/{id}", failing)
+
+
+def test_identical_concurrent_requests_share_one_call():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+    upstream = Upstream()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return upstream()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(KEY, "/items/{id}", slow)))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["coalesced"] < 7:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert upstream.calls == 1
+    assert len({id(result) for result in results}) == 1
+
+
+def test_errors_reach_every_coalesced_caller():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise SystemError("provider down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get(KEY, "/items/{id}", failing)
+        except SystemError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while cache.stats()["coalesced"] < 1:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    # Nothing is left in flight, so the next request calls upstream again
+    assert cache.get(KEY, "/items/{id}", Upstream()).body == 1
+
+
+def test_async_requests_are_coalesced_and_survive_cancelled_callers():
+    cache = ResponseCache(ttl=10)
+    upstream = Upstream()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return upstream()
+
+    async def scenario():
+        impatient = asyncio.ensure_future(cache.aget(KEY, "/items/{id}", slow))
+        await asyncio.sleep(0)
+        waiting = [asyncio.ensure_future(cache.aget(KEY, "/items/{id}", slow)) for _ in range(5)]
+        await asyncio.sleep(0)
+        impatient.cancel()
+        results = await asyncio.gather(*waiting)
+        cached = await cache.aget(KEY, "/items/{id}", slow)
+        return results, cached
+
+    results, cached = asyncio.run(scenario())
+
+    assert upstream.calls == 1
+    assert all(result is cached for result in results)
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2, ttl=10)
+    keys = [request_key("GET", f"http://provider/items/{index}", {}) for index in range(3)]
+    for key in keys:
+        cache.get(key, "/items/{id}", Upstream())
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,91 @@
+import json
+import pytest
+from resolver.tagparser.safety import UnsafePatternError, analyze_pattern, benchmark_pattern, check_pattern
+
+CATALOGUE = './resolver/data/tagstyles.json'
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(a+)+b",
+    r"(\w+\s?)*$",
+    r"(.*/)*x",
+    r"(x+x+)+y",
+    r"(?i)(A+)+",
+    r"(a?){30}a{30}",
+    r"(a|a?)+b",
+    r"(\d+\.?){2,5}x",
+    r"(a|aa)+$",
+])
+def test_nested_quantifiers_are_flagged(pattern):
+    assert "nested quantifier" in analyze_pattern(pattern)[0]
+
+
+@pytest.mark.parametrize("pattern", [r"(a|ab|b)*c", r"(a|ab|b){2,30}c"])
+def test_overlapping_alternations_are_flagged(pattern):
+    assert "overlapping alternation" in analyze_pattern(pattern)[0]
+
+
+def test_overlapping_iterations_are_flagged():
+    assert "across iterations" in analyze_pattern(r"(\s*,\s*)*$")[0]
+
+
+@pytest.mark.parametrize("pattern", [
+    r"([^/]+/)*x",
+    r"(\d{1,3}\.)+\d",
+    r"(?>a+)+b",
+    r"https?://([^/]+)/.*/\d{2}/.*",
+    r"(TE\d{2}[A-Z]{2}\d)--(\d{2}E\d{6})",
+    r"(a|ab)+c",
+    r"(abc|d)*x",
+    r"(,\s*)*$",
+])
+def test_unambiguous_repeats_pass(pattern):
+    assert analyze_pattern(pattern) == []
+
+
+@pytest.mark.parametrize("pattern, search", [
+    (r"a.*b.*c.*d.*e", False),
+    (r"\d+\d+\d+\d+x", False),
+    (r"a.*b.*c", True),
+    (r"\d+\d+x", True),
+])
+def test_overlapping_repeat_runs_are_flagged(pattern, search):
+    assert "power" in analyze_pattern(pattern, search)[-1]
+
+
+@pytest.mark.parametrize("pattern", [r"a.*b.*c", r"\d+\d+x", r"^\d+\d+x", r"[^/]+/[^/]+/.*"])
+def test_quadratic_runs_pass(pattern):
+    assert analyze_pattern(pattern) == []
+    assert analyze_pattern(pattern.replace("x", "x$"), search=pattern.startswith("^")) == []
+
+
+def test_benchmark_catches_polynomial_backtracking():
+    worst, violation = benchmark_pattern(r"\d+\d+\d+\d+x")
+    assert violation is not None
+
+
+def test_benchmark_is_killed_after_timeout():
+    worst, violation = benchmark_pattern(r"(a+)+b", budget=60, timeout=0.5)
+    assert "did not finish" in violation
+
+
+def test_check_pattern_is_static():
+    with pytest.raises(UnsafePatternError, match="power 3"):
+        check_pattern(r"\d+\d+\d+x")
+    check_pattern(r"\d+\d+x")
+    with pytest.raises(UnsafePatternError, match="power 3"):
+        check_pattern(r"\d+\d+x", search=True)
+
+
+def test_check_pattern_rejects_invalid_regex():
+    with pytest.raises(UnsafePatternError, match="invalid regular expression"):
+        check_pattern("(")
+
+
+def test_bundled_catalogue_is_safe():
+    with open(CATALOGUE) as file:
+        catalogue = json.load(file)
+    for definition in catalogue.values():
+        check_pattern(definition["ENTIRE_PATTERN"])
+        for pattern in definition["contents"].values():
+            check_pattern(pattern, search=True)
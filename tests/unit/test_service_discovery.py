@@ -18,7 +18,9 @@ def service_discovery():
 
 def test_fetch_services_from_registry(service_discovery, mock_services):
     with patch('requests.get') as mock_get:
-        mock_get.return_value.json.return_value = mock_services
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(mock_services).encode()
+        mock_get.return_value.headers = {}
         mock_get.return_value.raise_for_status = lambda: None
         
         services = service_discovery.fetch_services()
@@ -31,7 +33,9 @@ def test_fetch_openapi_schema(service_discovery, mock_services):
     service = ServiceAPI(**mock_services["Digital Object Memory Resolver"], serviceName="Digital Object Memory Resolver")
     
     with patch('requests.get') as mock_get:
-        mock_get.return_value.json.return_value = {"openapi": "3.0.0"}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = b'{"openapi": "3.0.0"}'
+        mock_get.return_value.headers = {}
         mock_get.return_value.raise_for_status = lambda: None
         
         schema = service_discovery.fetch_openapi_schema(service)
@@ -0,0 +1,96 @@
+import pytest
+from .example_tags_importer import read_json_and_get_tags
+from resolver.tagparser.dbm import DatabaseManagement, RegexPattern, Tagstyle
+from resolver.tagparser.safety import UnsafePatternError
+from resolver.tagparser.storage import InMemoryTagstyleStorage, create_storage
+from resolver.tagparser.tagparser import Parser, InvalidTagError
+from tests.samples import TAG1
+
+CATALOGUE = './resolver/data/tagstyles.json'
+
+
+@pytest.fixture
+def sample_tags():
+    return read_json_and_get_tags(CATALOGUE)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryTagstyleStorage()
+    storage = DatabaseManagement(str(tmp_path / "tagstyles.db"))
+    storage.initialize_db()
+    return storage
+
+
+def test_backends_behave_alike(storage, sample_tags):
+    generation = storage.generation
+    assert storage.add_tags(sample_tags)
+    assert storage.generation != generation
+    assert storage.retrieve_all_tags_with_ids() == list(enumerate(sample_tags, start=1))
+    assert storage.retrieve_all_tagstyles()[0] == (1, "sample pattern", sample_tags[0].entire_pattern.pattern)
+
+    updated = Tagstyle(entire_pattern=RegexPattern(name="updated", pattern=r"\d+"), contents=[])
+    assert storage.update_tag_by_name(1, updated)
+    assert storage.retrieve_tag_by_id(1) == updated
+    assert storage.delete_tag_by_id(1)
+    assert storage.retrieve_tag_by_id(1) is None
+    assert storage.add_tag(updated)
+    assert [tagid for tagid, _ in storage.retrieve_all_tags_with_ids()] == [2, 3]
+    assert storage.delete_all_tags()
+    assert storage.retrieve_all_tags_completly() == []
+    assert storage.add_tag(updated)
+    assert storage.retrieve_tag_by_id(1) == updated
+
+
+def test_parser_on_memory_catalogue():
+    parser = Parser(InMemoryTagstyleStorage.from_catalogue(CATALOGUE))
+    parsed = parser.parse_tag_fields(TAG1)
+    assert parsed.tagstyle == "digital link type"
+    assert parsed.contents == {"GTIN": "1234567891253", "serial_number": "1234567"}
+    with pytest.raises(InvalidTagError):
+        parser.parse_tag("unknown")
+
+
+def test_memory_store_rebuilds_snapshot_on_write(sample_tags):
+    storage = InMemoryTagstyleStorage()
+    parser = Parser(storage)
+    with pytest.raises(InvalidTagError):
+        parser.parse_tag(TAG1)
+    storage.add_tags(sample_tags)
+    assert parser.parse_tag(TAG1).entire_pattern.name == "digital link type"
+
+
+def test_create_storage(monkeypatch, tmp_path):
+    assert isinstance(create_storage(), DatabaseManagement)
+    assert create_storage("sqlite", str(tmp_path / "other.db")).full_path == str(tmp_path / "other.db")
+    monkeypatch.setenv("RESOLVER_TAGSTYLE_BACKEND", "memory")
+    monkeypatch.setenv("RESOLVER_TAGSTYLE_CATALOGUE", CATALOGUE)
+    storage = create_storage()
+    assert isinstance(storage, InMemoryTagstyleStorage)
+    assert len(storage.retrieve_all_tags_completly()) == 2
+    with pytest.raises(ValueError):
+        create_storage("postgres")
+
+
+def test_retrieved_tags_are_copies(storage, sample_tags):
+    storage.add_tags(sample_tags)
+    storage.retrieve_tag_by_id(1).contents.clear()
+    storage.retrieve_all_tags_with_ids()[0][1].entire_pattern.name = "changed"
+    assert storage.retrieve_tag_by_id(1) == sample_tags[0]
+
+
+def test_backends_reject_unsafe_patterns(storage):
+    unsafe = Tagstyle(entire_pattern=RegexPattern(name="unsafe", pattern=r"(a+)+b"), contents=[])
+    with pytest.raises(UnsafePatternError):
+        storage.add_tag(unsafe)
+    assert storage.retrieve_all_tags_with_ids() == []
+
+    assert storage.add_tag(Tagstyle(entire_pattern=RegexPattern(name="safe", pattern=r"a+b"), contents=[]))
+    unsafe_content = Tagstyle(
+        entire_pattern=RegexPattern(name="safe", pattern=r"a+b"),
+        contents=[RegexPattern(name="field", pattern=r"(\w+\s?)*$")],
+    )
+    with pytest.raises(UnsafePatternError):
+        storage.update_tag_by_name(1, unsafe_content)
+    assert storage.retrieve_tag_by_id(1).contents == []